@@ -0,0 +1,439 @@
+"""Benchmarks of every stage of the node's hot path and of the full loop.
+
+Run from the project root::
+
+    python -m benchmarks                 # run and print the results
+    python -m benchmarks --update        # record this machine's baseline
+    python -m benchmarks --check         # fail on regressions against it
+
+Publishing goes to the test suite's in-process ``FakeBroker`` over a real
+socket, so no RabbitMQ is needed. Each benchmark reports the best time per
+operation over a few repeats; ``--check`` fails when one is more than
+``--tolerance`` times its baseline, or over its absolute budget in
+``BUDGETS``.
+
+Timings only compare on the same hardware, so the baseline is recorded
+per machine and not committed. A baseline recorded on another machine,
+or none at all, leaves only the budgets to check.
+
+``reading_allocations`` and ``reading_memory`` count memory blocks and
+bytes instead of time: what one reading holds while it waits in the bus
+and transmit queues.
+
+``import_node_app`` and ``first_reading`` time a cold start in a fresh
+interpreter: the ``-X importtime`` cost of ``import node.app`` and the wall
+time from launching Python to the node's first reading.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+PROJECT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = {}
+# Seconds per op no machine may exceed, nodes are power-cycled often and
+# time to first reading matters
+BUDGETS = {"import_node_app": 0.5, "first_reading": 3.0}
+
+
+def benchmark(number, unit="s"):
+    """Register ``func(number)``, returning seconds taken for ``number`` ops,
+    or the total in ``unit`` for benchmarks of something else."""
+
+    def register(func):
+        BENCHMARKS[func.__name__] = (func, number, unit)
+        return func
+
+    return register
+
+
+def _format(value, unit):
+    if unit == "s":
+        return f"{value * 1e6:.2f} us/op"
+    return f"{value:.2f} {unit}/op"
+
+
+def _reading(i=0):
+    return {
+        "node_id": "madiwala_01",
+        "timestamp": 1_700_000_000.0 + i,
+        "payload": {"temperature": 24.0 + i % 10 / 10, "ph": 7.0 + i % 7 / 100},
+    }
+
+
+@benchmark(20000)
+def read_gpio_sensors(number):
+    from node.read import read_gpio_sensors
+
+    async def loop():
+        started = time.perf_counter()
+        for _ in range(number):
+            await read_gpio_sensors()
+        return time.perf_counter() - started
+
+    return asyncio.run(loop())
+
+
+def _encode(serializer, number):
+    readings = [_reading(i) for i in range(100)]
+    started = time.perf_counter()
+    for i in range(number):
+        serializer.encode(readings[i % 100])
+    return time.perf_counter() - started
+
+
+@benchmark(50000)
+def serialize_json(number):
+    from node.transmit import JsonSerializer
+
+    return _encode(JsonSerializer(), number)
+
+
+@benchmark(50000)
+def serialize_binary(number):
+    from node.transmit import BinarySerializer
+
+    return _encode(BinarySerializer(), number)
+
+
+@benchmark(2000)
+def serialize_binary_zlib_batch50(number):
+    from node.transmit import BinarySerializer
+
+    serializer = BinarySerializer(compression="zlib")
+    batch = [_reading(i) for i in range(50)]
+    started = time.perf_counter()
+    for _ in range(number):
+        serializer.encode_batch(batch)
+    return time.perf_counter() - started
+
+
+@benchmark(50000)
+def sensor_log(number):
+    from node.logger import sensor_logger
+
+    reading = _reading()
+    started = time.perf_counter()
+    for _ in range(number):
+        sensor_logger.info(reading)
+    return time.perf_counter() - started
+
+
+def _publish(number, confirm):
+    from tests.broker import FakeBroker
+    from node.transmit import RabbitMQPublisher
+
+    with FakeBroker(keep=False) as broker:
+        publisher = RabbitMQPublisher(broker.config(), confirm_delivery=confirm)
+        publisher.connect()
+        reading = _reading()
+        started = time.perf_counter()
+        for _ in range(number):
+            publisher.publish(reading)
+        elapsed = time.perf_counter() - started
+        publisher.close()
+    return elapsed
+
+
+@benchmark(5000)
+def send_to_rabbitmq(number):
+    return _publish(number, confirm=False)
+
+
+@benchmark(2000)
+def send_to_rabbitmq_confirm(number):
+    return _publish(number, confirm=True)
+
+
+@benchmark(50)
+def gui_update_plots(number):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from node.ui.gui import LakewatchGUI, SensorData
+
+    class Span:
+        def get(self):
+            return "1 hour"
+
+    # The plotting half of the GUI, on an off-screen canvas instead of Tk
+    gui = LakewatchGUI.__new__(LakewatchGUI)
+    gui.sensor_data = SensorData()
+    gui.span_var = Span()
+    gui.figure = Figure(figsize=(9, 5), dpi=100)
+    gui.canvas = FigureCanvasAgg(gui.figure)
+    gui.temp_plot = gui.figure.add_subplot(211)
+    gui.ph_plot = gui.figure.add_subplot(212)
+    (gui.temp_line,) = gui.temp_plot.plot([], [], "r-")
+    (gui.ph_line,) = gui.ph_plot.plot([], [], "b-")
+    for plot in (gui.temp_plot, gui.ph_plot):
+        plot.xaxis_date()
+
+    now = time.time()
+    for i in range(3600):
+        gui.sensor_data.add_data(_reading(i)["payload"], now - 3600 + i)
+    started = time.perf_counter()
+    for i in range(number):
+        gui.sensor_data.add_data(_reading(i)["payload"], now + i)
+        gui.update_plots()
+    return time.perf_counter() - started
+
+
+def _hold_readings(number):
+    from node.read import make_reading
+
+    # Values computed up front, as the sensors would have returned them
+    values = [(20.0 + i / number, 7.0 + i / number) for i in range(number)]
+    return [
+        make_reading({"temperature": temperature, "ph": ph}, 1_700_000_000.0 + i)
+        for i, (temperature, ph) in enumerate(values)
+    ]
+
+
+@benchmark(10000, unit="blocks")
+def reading_allocations(number):
+    """Memory blocks allocated and kept per reading made."""
+    before = sys.getallocatedblocks()
+    readings = _hold_readings(number)
+    allocated = sys.getallocatedblocks() - before
+    del readings
+    # Less the list holding them
+    return allocated - 1
+
+
+@benchmark(10000, unit="B")
+def reading_memory(number):
+    """Bytes kept per reading made, the holding list excluded."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        readings = _hold_readings(number)
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return held - sys.getsizeof(readings)
+
+
+@benchmark(5000)
+def full_loop(number):
+    """Read, fan out on the bus, log and transmit until the broker has it."""
+    from node.bus import ReadingBus, consume
+    from node.logger import sensor_logger
+    from node.read import SENSORS, make_reading
+    from tests.broker import FakeBroker
+    from node.transmit import AsyncTransmitter, RabbitMQPublisher, get_serializer
+
+    async def loop(broker):
+        serializer = get_serializer()
+        publisher = RabbitMQPublisher(broker.config(), serializer=serializer)
+        transmitter = AsyncTransmitter(publisher.publish_body, policy="block")
+        transmitter.start()
+
+        async def log_reading(data):
+            sensor_logger.info(data)
+
+        async def transmit(data):
+            await transmitter.put(*serializer.encode(data))
+
+        bus = ReadingBus()
+        tasks = [
+            asyncio.create_task(consume(bus.subscribe(name, policy="block"), handler))
+            for name, handler in (("sensor_log", log_reading), ("transmit", transmit))
+        ]
+        started = time.perf_counter()
+        for _ in range(number):
+            values = await asyncio.gather(*(read() for read in SENSORS.values()))
+            await bus.publish(make_reading(dict(zip(SENSORS, values))))
+        while broker.published < number:
+            await asyncio.sleep(0.001)
+        elapsed = time.perf_counter() - started
+        for task in tasks:
+            task.cancel()
+        await transmitter.stop()
+        publisher.close()
+        return elapsed
+
+    with FakeBroker(keep=False) as broker:
+        return asyncio.run(loop(broker))
+
+
+def _python(code, *flags):
+    path = os.pathsep.join(filter(None, [PROJECT, os.environ.get("PYTHONPATH")]))
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": path},
+    )
+
+
+@benchmark(5)
+def import_node_app(number):
+    """Cumulative ``-X importtime`` of node.app in a fresh interpreter."""
+    total = 0.0
+    for _ in range(number):
+        result = _python("import node.app", "-X", "importtime")
+        for line in result.stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == "node.app":
+                total += int(fields[1]) / 1e6
+    return total
+
+
+FIRST_READING = """
+import asyncio, os
+from node import app
+from node.bus import ReadingBus
+
+class First:
+    name = "first"
+    async def put(self, reading):
+        os._exit(0)
+    def stats(self):
+        return {}
+    def __len__(self):
+        return 0
+    def empty(self):
+        return True
+
+bus = ReadingBus()
+bus.add(First())
+asyncio.run(app.run(bus))
+"""
+
+
+@benchmark(5)
+def first_reading(number):
+    """Wall time from launching Python to the node's first reading."""
+    total = 0.0
+    for _ in range(number):
+        started = time.perf_counter()
+        _python(FIRST_READING)
+        total += time.perf_counter() - started
+    return total
+
+
+def run(names=None, repeat=3, scale=1.0):
+    """Best seconds (or other unit) per operation of each benchmark."""
+    results = {}
+    for name, (func, number, unit) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        number = max(1, int(number * scale))
+        best = min(func(number) for _ in range(repeat))
+        results[name] = best / number
+        print(f"{name:32} {_format(best / number, unit):>20}", file=sys.stderr)
+    return results
+
+
+def check(results, baseline, tolerance):
+    """Names of the benchmarks more than ``tolerance`` times their baseline."""
+    regressions = []
+    for name, value in results.items():
+        budget = BUDGETS.get(name)
+        if budget is not None and value > budget:
+            regressions.append(name)
+            print(
+                f"OVER BUDGET {name}: {_format(value, 's')}, "
+                f"budget {_format(budget, 's')}",
+                file=sys.stderr,
+            )
+            continue
+        expected = baseline.get(name)
+        if expected is not None and value > expected * tolerance:
+            regressions.append(name)
+            unit = BENCHMARKS[name][2]
+            print(
+                f"REGRESSION {name}: {_format(value, unit)}, "
+                f"baseline {_format(expected, unit)}",
+                file=sys.stderr,
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="benchmarks", description=__doc__.split("\n")[0]
+    )
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default all)")
+    parser.add_argument("--check", action="store_true", help="compare to baseline")
+    parser.add_argument("--update", action="store_true", help="write the baseline")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.5,
+        help="allowed slowdown factor against the baseline (default 1.5)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--quick", action="store_true", help="a tenth of the iterations"
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    args.baseline = os.path.abspath(args.baseline)
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    # The node logs relative to the working directory, keep that out of the tree
+    os.chdir(tempfile.mkdtemp(prefix="node-bench-"))
+    from node.logger import init_logging
+
+    init_logging()
+    results = run(args.names, args.repeat, 0.1 if args.quick else 1.0)
+    report = {
+        "machine": {
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.machine(),
+        },
+        "per_op": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update:
+        # Keep this machine's results for benchmarks not run this time
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                previous = json.load(f)
+            if previous.get("machine") == report["machine"]:
+                baseline = previous["per_op"]
+        report["per_op"] = baseline | results
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if args.check:
+        if check(results, _baseline(args.baseline, report["machine"]), args.tolerance):
+            return 1
+    return 0
+
+
+def _baseline(path, machine):
+    """The recorded results to compare to, if recorded on this machine."""
+    if not os.path.exists(path):
+        print(f"No baseline at {path}, run --update first", file=sys.stderr)
+        return {}
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get("machine") != machine:
+        print(
+            f"Baseline {path} is from another machine, only checking budgets",
+            file=sys.stderr,
+        )
+        return {}
+    return baseline["per_op"]
@@ -1,38 +1,281 @@
 import asyncio
 import logging
 import threading
-from node.read import read_gpio_sensors
-from node.transmit import send_to_rabbitmq
+from node.bus import ReadingBus, consume
+from node.logger import init_logging, sensor_logger
+from node.metrics import REGISTRY, MetricsServer, publish_metrics
+from node.read import build_scheduler
+from node.transmit import (
+    AsyncTransmitter,
+    RabbitMQPublisher,
+    Batcher,
+    Outbox,
+    OutboxDrainer,
+    get_serializer,
+)
 from node.settings import CONFIG
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
 
+async def run(bus=None):
+    """Sample the sensors and fan every reading out to the subscribers.
+
+    Readings are acquired once and published on ``bus``; pass a bus that
+    already has subscribers (the GUI) to share the same readings.
+    """
+    bus = ReadingBus() if bus is None else bus
+    serializer = get_serializer()
+    publisher = RabbitMQPublisher(serializer=serializer)
+    batcher = None
+    if CONFIG.get("batch_enabled", False):
+        batcher = Batcher(serializer=serializer)
+    drainer = None
+    if CONFIG.get("outbox_enabled", False):
+        # Everything goes through the disk outbox, published by a background
+        # thread, so readings survive broker outages and restarts.
+        drainer = OutboxDrainer(Outbox(), publisher)
+        send = drainer.submit
+    else:
+        send = publisher.publish_body
+    if CONFIG.get("transmit_backpressure") == "spill" and drainer is None:
+        # Overflow goes to an outbox replayed over a connection of its own
+        drainer = OutboxDrainer(Outbox(), RabbitMQPublisher())
+    if drainer is not None:
+        drainer.start()
+
+    # Publishing happens on a worker thread, the loop only enqueues
+    transmitter = AsyncTransmitter(
+        send, spill=drainer.submit if drainer is not None else None
+    )
+    transmitter.start()
+    # Optional stages are only imported when enabled, they pull in NumPy
+    history = None
+    if CONFIG.get("history_enabled", False):
+        from node.store import HistoryWriter
+
+        history = HistoryWriter()
+    aggregator = None
+    if CONFIG.get("aggregate_enabled", False):
+        from node.process import WindowAggregator
+
+        aggregator = WindowAggregator()
+    send_raw = aggregator is None or CONFIG.get("aggregate_send_raw", False)
+    deadband = None
+    if CONFIG.get("deadband"):
+        from node.process import DeadbandFilter
+
+        deadband = DeadbandFilter()
+    detector = None
+    if CONFIG.get("anomaly_enabled", False):
+        from node.process import AnomalyDetector
+
+        detector = AnomalyDetector()
+
+    REGISTRY.gauge(
+        "node_transmit_queue_depth", "Messages waiting for the transmit thread"
+    ).set_function(transmitter.__len__)
+    if drainer is not None:
+        REGISTRY.gauge(
+            "node_outbox_backlog", "Messages in the outbox waiting to be published"
+        ).set_function(drainer.outbox.__len__)
+        REGISTRY.gauge(
+            "node_outbox_backlog_bytes", "Size of the messages in the outbox"
+        ).set_function(lambda: drainer.outbox.size)
+    if deadband is not None:
+        REGISTRY.counter(
+            "node_deadband_suppressed_total", "Channel values not sent by the deadband"
+        ).set_function(lambda: deadband.suppressed)
+    if detector is not None:
+        REGISTRY.counter(
+            "node_anomalies_flagged_total", "Readings flagged as anomalies"
+        ).set_function(lambda: detector.flagged)
+    metrics_server = None
+    if CONFIG.get("metrics_enabled", False):
+        metrics_server = MetricsServer()
+        await metrics_server.start()
+    query_index = query_server = None
+    if CONFIG.get("query_enabled", False):
+        from node.query import QueryServer, ReadingIndex
+
+        query_index = ReadingIndex()
+        query_server = QueryServer(query_index)
+        await query_server.start()
+    profiler = None
+    if CONFIG.get("profiling_enabled", False):
+        from node.profiling import Profiler
+
+        profiler = Profiler()
+        await profiler.start()
+
+    async def transmit(message, urgent=False):
+        if batcher is None:
+            await transmitter.put(*serializer.encode(message))
+            return
+        for body, properties in batcher.add(message):
+            await transmitter.put(body, properties)
+        if urgent and len(batcher):
+            await transmitter.put(*batcher.flush())
+
+    async def log_reading(data):
+        # Encoded to JSON on the log writer thread
+        sensor_logger.info(data)
+
+    async def store(data):
+        history.append(data)
 
-async def run():
-    while True:
-        data = await read_gpio_sensors()
-        logging.info(f"Read data: {data}")
-        send_to_rabbitmq(data)
-        logging.info("Data sent to RabbitMQ")
-        await asyncio.sleep(1)
+    async def handle(data):
+        logging.info("Read data: %s", data)
+        anomalies = detector.score(data) if detector is not None else None
+        if anomalies:
+            # Outliers always go out, straight away and flagged
+            logging.warning("Anomaly in %s", anomalies)
+            flagged = {**data, "anomaly": anomalies}
+            if deadband is not None:
+                deadband.filter(flagged, force=True)
+            await transmit(flagged, urgent=True)
+        elif send_raw:
+            message = data if deadband is None else deadband.filter(data)
+            if message is not None:
+                await transmit(message)
+
+    async def index(data):
+        query_index.append(data)
+
+    async def aggregate(data):
+        for summary in aggregator.add(data):
+            await transmit(summary)
+
+    subscribers = [("sensor_log", log_reading), ("transmit", handle)]
+    if history is not None:
+        subscribers.append(("history", store))
+    if aggregator is not None:
+        subscribers.append(("aggregate", aggregate))
+    if query_index is not None:
+        subscribers.append(("query", index))
+    subscriptions = [(bus.subscribe(name), handler) for name, handler in subscribers]
+    tasks = [
+        asyncio.create_task(consume(subscription, handler))
+        for subscription, handler in subscriptions
+    ]
+    if batcher is not None:
+        # Flush a partial batch on age even when no more readings come
+        tasks.append(asyncio.create_task(batcher.run(transmitter.put)))
+    metrics_interval = CONFIG.get("metrics_publish_interval", 0)
+    if metrics_interval:
+        tasks.append(
+            asyncio.create_task(publish_metrics(transmitter.put, metrics_interval))
+        )
+
+    block_sampler = None
+    if CONFIG.get("block_channels"):
+        from node.read import build_block_sampler
+
+        # Features go on the bus like any reading, raw blocks straight out
+        block_sampler = build_block_sampler()
+        tasks.append(
+            asyncio.create_task(block_sampler.run(bus.publish, transmitter.put))
+        )
+
+    scheduler = build_scheduler()
+    emit = bus.publish
+    adaptive = None
+    if CONFIG.get("adaptive_sampling"):
+        from node.read import AdaptiveSampler, sampling_message
+
+        def backlog():
+            load = len(transmitter) / transmitter.queue.maxsize
+            if drainer is not None:
+                outbox = CONFIG.get("adaptive_outbox_backlog", 10000)
+                load = max(load, len(drainer.outbox) / outbox)
+            return load
+
+        adaptive = AdaptiveSampler(scheduler, backlog=backlog)
+
+        async def emit(reading):
+            changes = adaptive.observe(reading)
+            await bus.publish(reading)
+            if changes:
+                # Consumers need these to make sense of the reading spacing
+                await transmitter.put(*sampling_message(changes, adaptive.periods()))
+
+    if block_sampler is not None:
+        # Features are stamped with the end of their block, keep the sensor
+        # readings taken meanwhile behind them
+        emit = block_sampler.ordered(emit)
+
+    try:
+        await scheduler.run(emit)
+    finally:
+        logging.info("Sampling stats: %s", scheduler.stats())
+        if adaptive is not None:
+            logging.info("Adaptive sampling stats: %s", adaptive.stats())
+        if block_sampler is not None:
+            logging.info("Block sampling stats: %s", block_sampler.stats())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Let the subscribers catch up with what was already published
+        for subscription, handler in subscriptions:
+            while not subscription.empty():
+                await handler(subscription.get_nowait())
+        logging.info("Bus stats: %s", bus.stats())
+        if metrics_server is not None:
+            await metrics_server.stop()
+        if query_server is not None:
+            await query_server.stop()
+        if profiler is not None:
+            await profiler.stop()
+        if block_sampler is not None:
+            block_sampler.extractor.close()
+        if history is not None:
+            history.close()
+        if aggregator is not None:
+            for summary in aggregator.flush():
+                await transmit(summary)
+        if batcher is not None and len(batcher):
+            await transmitter.put(*batcher.flush())
+        await transmitter.stop(CONFIG.get("transmit_shutdown_timeout", 5.0))
+        if drainer is not None:
+            drainer.stop()
+            drainer.outbox.close()
+            if drainer.publisher is not publisher:
+                drainer.publisher.close()
+        publisher.close()
 
 
 def main():
+    logging.basicConfig(
+        level=CONFIG.get("log_level", "INFO"),
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+    init_logging()
+    gui = None
     try:
-        # Start GUI in a separate thread if enabled
-        if CONFIG.get("gui_enabled", False):
-            from node.ui.gui import start_gui
+        bus = ReadingBus()
+        if CONFIG.get("gui_enabled", False) and CONFIG.get("gui_process", False):
+            # GUI in its own process, fed through shared memory
+            from node.ui import GuiProcess
+
+            gui = GuiProcess()
+            bus.add(gui.subscription)
+            gui.start()
+        elif CONFIG.get("gui_enabled", False):
+            # Start GUI in a separate thread, fed from the bus
+            from node.ui import start_gui
 
-            gui_thread = threading.Thread(target=start_gui, daemon=True)
+            subscription = bus.subscribe("gui", threaded=True)
+            gui_thread = threading.Thread(
+                target=start_gui, kwargs={"data_queue": subscription}, daemon=True
+            )
             gui_thread.start()
             logging.info("GUI started in background")
 
         # Run the main application loop
-        asyncio.run(run())
+        asyncio.run(run(bus))
     except KeyboardInterrupt:
         logging.info("Program terminated by user")
+    finally:
+        if gui is not None:
+            gui.stop()
     return 0
 
 
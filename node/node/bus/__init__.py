@@ -0,0 +1,20 @@
+from .bus import ReadingBus, Subscription, ThreadedSubscription, consume
+
+__all__ = [
+    "ReadingBus",
+    "Subscription",
+    "ThreadedSubscription",
+    "consume",
+    "SharedRing",
+    "RingSubscription",
+    "RingReader",
+]
+
+
+def __getattr__(name):
+    # The shared memory ring is only used by the GUI process, and needs NumPy
+    if name in ("SharedRing", "RingSubscription", "RingReader"):
+        from . import shm
+
+        return getattr(shm, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,174 @@
+import asyncio
+import queue
+import time
+
+from node.logger import ops_logger
+from node.metrics import REGISTRY
+from node.settings import CONFIG
+
+OVERFLOW_POLICIES = ("block", "drop-oldest", "drop-newest")
+
+DROPPED = REGISTRY.counter(
+    "node_bus_dropped_total", "Readings a subscriber was too slow for", ["subscriber"]
+)
+DEPTH = REGISTRY.gauge(
+    "node_bus_depth", "Readings queued for a subscriber", ["subscriber"]
+)
+LAG_SECONDS = REGISTRY.histogram(
+    "node_bus_lag_seconds",
+    "Time a reading waited for its subscriber",
+    ["subscriber"],
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "node_stage_seconds", "Time a subscriber took to handle a reading", ["stage"]
+)
+
+
+class Subscription:
+    """Bounded queue of readings for one subscriber on the event loop.
+
+    When the queue is full the overflow policy applies: ``block`` makes the
+    publisher wait for room, ``drop-oldest`` discards the oldest queued
+    reading and ``drop-newest`` discards the new one. Every reading is
+    queued with its publish time, so ``stats()`` can report how far behind
+    the subscriber is running.
+    """
+
+    def __init__(self, name, maxsize, policy):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.name = name
+        self.policy = policy
+        self.queue = self._make_queue(maxsize)
+        self.delivered = 0
+        self.dropped = 0
+        self.lag = 0.0
+        self.lag_max = 0.0
+
+    def _make_queue(self, maxsize):
+        return asyncio.Queue(maxsize)
+
+    def __len__(self):
+        return self.queue.qsize()
+
+    async def put(self, reading):
+        item = (time.monotonic(), reading)
+        if self.policy == "block":
+            await self.queue.put(item)
+        else:
+            self._put_nowait(item)
+
+    async def get(self):
+        return self._received(await self.queue.get())
+
+    def get_nowait(self):
+        return self._received(self.queue.get_nowait())
+
+    def empty(self):
+        return self.queue.empty()
+
+    def stats(self):
+        return {
+            "depth": len(self),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "lag": self.lag,
+            "lag_max": self.lag_max,
+        }
+
+    def _put_nowait(self, item):
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except (asyncio.QueueFull, queue.Full):
+                self.dropped += 1
+                DROPPED.labels(self.name).inc()
+                if self.dropped % 100 == 1:
+                    ops_logger.warning(
+                        "Subscriber %s is behind, dropped %d readings",
+                        self.name,
+                        self.dropped,
+                    )
+                if self.policy == "drop-newest":
+                    return
+                try:
+                    self.queue.get_nowait()
+                except (asyncio.QueueEmpty, queue.Empty):
+                    pass
+
+    def _received(self, item):
+        published, reading = item
+        self.lag = time.monotonic() - published
+        self.lag_max = max(self.lag_max, self.lag)
+        LAG_SECONDS.labels(self.name).observe(self.lag)
+        self.delivered += 1
+        return reading
+
+
+class ThreadedSubscription(Subscription):
+    """Subscription read from another thread, such as the GUI.
+
+    Backed by a thread-safe ``queue.Queue`` and read with ``get_nowait``
+    (raising ``queue.Empty``), so it can stand in for a plain queue. The
+    publisher cannot wait on another thread, ``block`` is not supported.
+    """
+
+    def __init__(self, name, maxsize, policy):
+        if policy == "block":
+            raise ValueError("Threaded subscribers cannot use the block policy")
+        super().__init__(name, maxsize, policy)
+
+    def _make_queue(self, maxsize):
+        return queue.Queue(maxsize)
+
+    async def get(self):
+        raise TypeError("Read threaded subscriptions with get_nowait()")
+
+
+class ReadingBus:
+    """In-process publish/subscribe fan-out of sensor readings.
+
+    The acquisition loop publishes every reading once and each subscriber
+    (transmitter, sensor log, history, GUI, ...) gets it through its own
+    bounded queue, so a slow subscriber only affects itself unless it uses
+    the ``block`` policy.
+    """
+
+    def __init__(self, config=None):
+        self.config = CONFIG if config is None else config
+        self.subscriptions = []
+
+    def subscribe(self, name, maxsize=None, policy=None, threaded=False):
+        maxsize = maxsize or self.config.get("bus_queue_size", 1000)
+        if policy is None:
+            policies = self.config.get("bus_policies", {})
+            policy = policies.get(name, "drop-oldest")
+        kind = ThreadedSubscription if threaded else Subscription
+        return self.add(kind(name, maxsize, policy))
+
+    def add(self, subscription):
+        """Attach a ready-made subscriber, anything with ``put`` and ``stats``."""
+        self.subscriptions.append(subscription)
+        DEPTH.labels(subscription.name).set_function(subscription.__len__)
+        return subscription
+
+    async def publish(self, reading):
+        for subscription in self.subscriptions:
+            await subscription.put(reading)
+
+    def stats(self):
+        return {sub.name: sub.stats() for sub in self.subscriptions}
+
+
+async def consume(subscription, handler):
+    """Feed every reading of a subscription to ``await handler(reading)``."""
+    stage = STAGE_SECONDS.labels(subscription.name)
+    while True:
+        reading = await subscription.get()
+        started = time.perf_counter()
+        try:
+            await handler(reading)
+        except Exception as e:
+            ops_logger.error("Error in %s subscriber: %r", subscription.name, e)
+        stage.observe(time.perf_counter() - started)
@@ -0,0 +1,176 @@
+import collections
+import json
+import queue
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+from node.reading import Reading
+from node.settings import CONFIG
+
+# count, capacity, channels, metadata length
+HEADER = 4
+META_BYTES = 1024
+
+
+class SharedRing:
+    """Fixed-size ring of readings in shared memory, one writer, any readers.
+
+    Readings are stored as rows of float64 ``[seq, timestamp, *channels]``
+    for a channel list fixed at creation; ``node_id`` and the channel names
+    live in a JSON header. Nothing is pickled or locked: the writer marks a
+    row invalid, fills it in, stamps it with its sequence number and then
+    publishes the new count. A reader that finds a row's sequence number
+    changed while it copied it knows the writer lapped it and drops the row.
+    """
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((HEADER,), np.int64, shm.buf)
+        count, capacity, width, meta_len = self.header
+        self.capacity = int(capacity)
+        meta = bytes(shm.buf[HEADER * 8 : HEADER * 8 + meta_len])
+        meta = json.loads(meta.decode())
+        self.node_id = meta["node_id"]
+        self.channels = meta["channels"]
+        self.rows = np.ndarray(
+            (self.capacity, int(width)),
+            np.float64,
+            shm.buf,
+            offset=HEADER * 8 + META_BYTES,
+        )
+
+    @classmethod
+    def create(cls, channels, capacity=None, node_id=None, config=None):
+        config = CONFIG if config is None else config
+        capacity = capacity or config.get("gui_buffer_size", 4096)
+        meta = json.dumps(
+            {"node_id": node_id or config.get("node_id"), "channels": list(channels)}
+        ).encode()
+        if len(meta) > META_BYTES:
+            raise ValueError("Too many channels for the shared ring header")
+        width = 2 + len(channels)
+        shm = shared_memory.SharedMemory(
+            create=True, size=HEADER * 8 + META_BYTES + capacity * width * 8
+        )
+        np.ndarray((HEADER,), np.int64, shm.buf)[:] = (0, capacity, width, len(meta))
+        shm.buf[HEADER * 8 : HEADER * 8 + len(meta)] = meta
+        ring = cls(shm, owner=True)
+        ring.rows[:, 0] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name, track=False)
+        else:
+            # Child processes share the creator's resource tracker, which
+            # only cleans up after the creator has gone
+            shm = shared_memory.SharedMemory(name)
+        return cls(shm, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def count(self):
+        return int(self.header[0])
+
+    def write(self, reading):
+        payload = reading.get("payload") or {}
+        seq = self.count
+        row = self.rows[seq % self.capacity]
+        row[0] = -1
+        row[1] = reading.get("timestamp", np.nan)
+        for i, name in enumerate(self.channels, 2):
+            value = payload.get(name)
+            row[i] = value if type(value) in (int, float) else np.nan
+        row[0] = seq
+        self.header[0] = seq + 1
+
+    def read(self, cursor):
+        """Readings from sequence number ``cursor`` on.
+
+        Returns ``(readings, next_cursor, lost)`` where ``lost`` counts the
+        readings overwritten before they could be read.
+        """
+        count = self.count
+        lost = max(0, count - cursor - self.capacity)
+        cursor += lost
+        readings = []
+        for seq in range(cursor, count):
+            row = self.rows[seq % self.capacity]
+            before = row[0]
+            values = row.tolist()
+            if before != seq or row[0] != seq:
+                lost += 1
+                continue
+            readings.append(
+                Reading(
+                    self.node_id,
+                    values[1],
+                    {
+                        name: value
+                        for name, value in zip(self.channels, values[2:])
+                        if value == value
+                    },
+                )
+            )
+        return readings, count, lost
+
+    def close(self):
+        # Views into the buffer have to go before it can be closed
+        self.header = self.rows = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class RingSubscription:
+    """Bus subscriber writing every reading straight into a ``SharedRing``.
+
+    Writing never waits, once the ring is full the oldest readings are
+    overwritten.
+    """
+
+    policy = "drop-oldest"
+
+    def __init__(self, name, ring):
+        self.name = name
+        self.ring = ring
+        self.delivered = 0
+
+    def __len__(self):
+        return 0
+
+    async def put(self, reading):
+        self.ring.write(reading)
+        self.delivered += 1
+
+    def empty(self):
+        return True
+
+    def stats(self):
+        return {"depth": 0, "delivered": self.delivered, "dropped": 0}
+
+
+class RingReader:
+    """Read side of a ``SharedRing`` with the ``get_nowait`` of a queue."""
+
+    def __init__(self, ring):
+        self.ring = ring
+        # Start with whatever is still in the ring
+        self.cursor = max(0, ring.count - ring.capacity)
+        self.pending = collections.deque()
+        self.lost = 0
+
+    def get_nowait(self):
+        if not self.pending:
+            readings, self.cursor, lost = self.ring.read(self.cursor)
+            self.pending.extend(readings)
+            self.lost += lost
+        if not self.pending:
+            raise queue.Empty
+        return self.pending.popleft()
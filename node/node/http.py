@@ -0,0 +1,69 @@
+import asyncio
+
+from node.logger import ops_logger
+
+# Seconds a client gets to send its request headers
+REQUEST_TIMEOUT = 5.0
+TOO_LARGE = ("400 Bad Request", "text/plain", b"request too large\n")
+
+
+class HttpServer:
+    """Tiny one-request-per-connection HTTP server on the node's event loop.
+
+    Subclasses implement ``respond(method, target)``, returning ``(status,
+    content_type, body)`` for the request line's method and target, both
+    bytes. ``what`` names the server in the ops log.
+    """
+
+    what = "HTTP"
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        ops_logger.info("Serving %s on %s:%d", self.what, self.host, self.port)
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    def respond(self, method, target):
+        raise NotImplementedError
+
+    def _respond(self, method, target):
+        try:
+            return self.respond(method, target)
+        except Exception:
+            ops_logger.exception("Error answering %s %s", self.what, target)
+            return "500 Internal Server Error", "text/plain", b"internal error\n"
+
+    async def _handle(self, reader, writer):
+        try:
+            try:
+                request = await asyncio.wait_for(
+                    reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT
+                )
+            except asyncio.LimitOverrunError:
+                # Request line or headers beyond the stream's buffer limit
+                status, content_type, body = TOO_LARGE
+            else:
+                method, target = request.split(b" ", 2)[:2]
+                status, content_type, body = self._respond(method, target)
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            pass
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,3 @@
+from .loadgen import VirtualNode, make_nodes, generate, run_load
+
+__all__ = ["VirtualNode", "make_nodes", "generate", "run_load"]
@@ -0,0 +1,61 @@
+import argparse
+import json
+import sys
+
+from .loadgen import run_load
+
+
+def _periods(value):
+    return tuple(float(period) for period in value.split(","))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="loadgen",
+        description="Simulate a fleet of lake nodes publishing to the broker",
+    )
+    parser.add_argument("--nodes", type=int, default=1000, help="virtual nodes")
+    parser.add_argument(
+        "--duration", type=float, default=60, help="seconds to run (default 60)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="processes to shard the nodes over"
+    )
+    parser.add_argument(
+        "--connections", type=int, default=1, help="broker connections per worker"
+    )
+    parser.add_argument(
+        "--periods",
+        type=_periods,
+        default=(1.0,),
+        help="comma separated sample periods in seconds, one picked per node",
+    )
+    parser.add_argument(
+        "--outage-rate", type=float, default=0.0, help="outages per node per hour"
+    )
+    parser.add_argument(
+        "--outage-mean", type=float, default=60.0, help="mean outage length (s)"
+    )
+    parser.add_argument(
+        "--null",
+        action="store_true",
+        help="do not publish, measure the generator and transmit path only",
+    )
+    args = parser.parse_args(argv)
+
+    report = run_load(
+        args.nodes,
+        args.duration,
+        workers=args.workers,
+        connections=args.connections,
+        periods=args.periods,
+        outage_rate=args.outage_rate,
+        outage_mean=args.outage_mean,
+        null=args.null,
+    )
+    sys.stdout.write(json.dumps(report, indent=2) + "\n")
+    return 0 if report["published"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
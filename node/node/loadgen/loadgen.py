@@ -0,0 +1,251 @@
+import asyncio
+import multiprocessing
+import random
+import time
+
+import numpy as np
+from node.logger import ops_logger
+from node.settings import CONFIG
+from node.transmit import AsyncTransmitter, RabbitMQPublisher, get_serializer
+
+LAKES = (
+    "madiwala",
+    "bellandur",
+    "varthur",
+    "hebbal",
+    "ulsoor",
+    "sankey",
+    "agara",
+    "hulimavu",
+    "puttenahalli",
+    "jakkur",
+)
+# Virtual lakes are scattered this far (degrees) around the city centre
+CENTRE = (12.97, 77.59)
+SPREAD = 0.15
+
+
+class VirtualNode:
+    """One simulated lake node with its own id, position, rate and outages.
+
+    Temperature and pH follow slow random walks. Outages start at random,
+    ``outage_rate`` times an hour on average, and last an exponentially
+    distributed ``outage_mean`` seconds; the node sends nothing meanwhile.
+    """
+
+    def __init__(self, node_id, latitude, longitude, period, outage_rate, outage_mean):
+        self.node_id = node_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.period = period
+        self.outage_rate = outage_rate
+        self.outage_mean = outage_mean
+        self.temperature = random.uniform(22.0, 30.0)
+        self.ph = random.uniform(6.5, 8.5)
+        self.readings = 0
+        self.outages = 0
+
+    def reading(self, timestamp):
+        self.temperature += random.gauss(0, 0.05)
+        self.ph = min(14.0, max(0.0, self.ph + random.gauss(0, 0.01)))
+        self.readings += 1
+        return {
+            "node_id": self.node_id,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "timestamp": timestamp,
+            "payload": {"temperature": self.temperature, "ph": self.ph},
+        }
+
+    async def run(self, emit, deadline):
+        # Random phase, so the fleet does not report in lockstep
+        start = time.monotonic() + random.uniform(0, self.period)
+        slot = 0
+        outage_chance = self.outage_rate * self.period / 3600
+        while True:
+            due = start + slot * self.period
+            if due >= deadline:
+                return
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            slot += 1
+            if random.random() < outage_chance:
+                self.outages += 1
+                slot += int(random.expovariate(1 / self.outage_mean) / self.period)
+                continue
+            await emit(self.reading(time.time()))
+
+
+def make_nodes(count, periods=(1.0,), outage_rate=0.0, outage_mean=60.0, first=0):
+    """``count`` virtual nodes numbered from ``first``, spread over the lakes."""
+    nodes = []
+    for i in range(first, first + count):
+        lake = LAKES[i % len(LAKES)]
+        rng = random.Random(i)
+        nodes.append(
+            VirtualNode(
+                f"{lake}_{i // len(LAKES) + 1:04d}",
+                round(CENTRE[0] + rng.uniform(-SPREAD, SPREAD), 6),
+                round(CENTRE[1] + rng.uniform(-SPREAD, SPREAD), 6),
+                rng.choice(periods),
+                outage_rate,
+                outage_mean,
+            )
+        )
+    return nodes
+
+
+class NullPublisher:
+    """Stands in for the broker, to measure the generator itself."""
+
+    def publish_body(self, body, properties=None, node_id=None):
+        return True
+
+    def close(self):
+        pass
+
+
+async def generate(nodes, duration, connections=1, null=False, config=None):
+    """Run ``nodes`` for ``duration`` seconds through the transmit path.
+
+    Every reading is encoded with the configured serializer and queued on an
+    ``AsyncTransmitter`` feeding a ``RabbitMQPublisher``; nodes are spread
+    round-robin over ``connections`` of them. Each message is routed with
+    its virtual node's id. Latency runs from queueing a message until the
+    publisher returned, so it includes time spent queued.
+    """
+    config = CONFIG if config is None else config
+    serializer = get_serializer(config)
+    latencies = []
+    bytes_sent = 0
+
+    def sender(publisher):
+        def send(body, properties, node_id, queued):
+            ok = publisher.publish_body(body, properties, node_id)
+            if ok:
+                latencies.append(time.monotonic() - queued)
+            return ok
+
+        return send
+
+    publishers = [
+        NullPublisher() if null else RabbitMQPublisher(config, serializer=serializer)
+        for _ in range(connections)
+    ]
+    transmitters = [
+        AsyncTransmitter(sender(publisher), config=config) for publisher in publishers
+    ]
+    for transmitter in transmitters:
+        transmitter.start()
+
+    def emitter(transmitter):
+        async def emit(reading):
+            nonlocal bytes_sent
+            body, properties = serializer.encode(reading)
+            bytes_sent += len(body)
+            await transmitter.put(
+                body, properties, reading["node_id"], time.monotonic()
+            )
+
+        return emit
+
+    started = time.monotonic()
+    deadline = started + duration
+    try:
+        await asyncio.gather(
+            *(
+                node.run(emitter(transmitters[i % connections]), deadline)
+                for i, node in enumerate(nodes)
+            )
+        )
+    finally:
+        for transmitter in transmitters:
+            await transmitter.stop(config.get("transmit_shutdown_timeout", 5.0))
+        for publisher in publishers:
+            publisher.close()
+    elapsed = time.monotonic() - started
+
+    return {
+        "nodes": len(nodes),
+        "elapsed": elapsed,
+        "generated": sum(node.readings for node in nodes),
+        "outages": sum(node.outages for node in nodes),
+        "published": sum(t.delivered for t in transmitters),
+        "failed": sum(t.failed for t in transmitters),
+        "dropped": sum(t.dropped for t in transmitters),
+        "bytes": bytes_sent,
+        "latencies": np.asarray(latencies),
+    }
+
+
+def _run_shard(args):
+    first, count, options = args
+    nodes = make_nodes(
+        count,
+        options["periods"],
+        options["outage_rate"],
+        options["outage_mean"],
+        first=first,
+    )
+    return asyncio.run(
+        generate(nodes, options["duration"], options["connections"], options["null"])
+    )
+
+
+def run_load(
+    nodes,
+    duration,
+    workers=1,
+    connections=1,
+    periods=(1.0,),
+    outage_rate=0.0,
+    outage_mean=60.0,
+    null=False,
+):
+    """Simulate ``nodes`` virtual nodes, sharded over ``workers`` processes.
+
+    Each worker runs its share of the nodes in its own event loop with
+    ``connections`` broker connections. Returns the merged report.
+    """
+    options = {
+        "duration": duration,
+        "connections": connections,
+        "periods": tuple(periods),
+        "outage_rate": outage_rate,
+        "outage_mean": outage_mean,
+        "null": null,
+    }
+    shares = [nodes // workers + (i < nodes % workers) for i in range(workers)]
+    firsts = np.cumsum([0] + shares[:-1])
+    shards = [(int(f), n, options) for f, n in zip(firsts, shares) if n]
+    ops_logger.info(
+        "Simulating %d nodes for %ss in %d workers", nodes, duration, len(shards)
+    )
+    if len(shards) == 1:
+        results = [_run_shard(shards[0])]
+    else:
+        with multiprocessing.get_context("spawn").Pool(len(shards)) as pool:
+            results = pool.map(_run_shard, shards)
+    return merge(results)
+
+
+def merge(results):
+    """Combine per-worker results into one report with latency percentiles."""
+    latencies = np.concatenate([r["latencies"] for r in results])
+    elapsed = max(r["elapsed"] for r in results)
+    report = {
+        key: sum(r[key] for r in results)
+        for key in ("nodes", "generated", "outages", "published", "failed", "dropped")
+    }
+    report["elapsed"] = elapsed
+    report["throughput"] = report["published"] / elapsed if elapsed else 0.0
+    report["bytes_per_second"] = (
+        sum(r["bytes"] for r in results) / elapsed if elapsed else 0.0
+    )
+    report["latency_ms"] = {
+        f"p{q}": float(np.percentile(latencies, q)) * 1000 if len(latencies) else None
+        for q in (50, 90, 99, 99.9)
+    }
+    report["latency_ms"]["max"] = (
+        float(latencies.max()) * 1000 if len(latencies) else None
+    )
+    return report
@@ -1,4 +1,5 @@
 from .log import sensor_logger
 from .log import ops_logger
+from .log import init_logging
 
-__all__ = ["sensor_logger", "ops_logger"]
+__all__ = ["sensor_logger", "ops_logger", "init_logging"]
@@ -1,45 +1,189 @@
+import atexit
+import json
 import logging
-from logging.handlers import TimedRotatingFileHandler, RotatingFileHandler
+from logging.handlers import (
+    TimedRotatingFileHandler,
+    RotatingFileHandler,
+    QueueHandler,
+)
 import os
+import queue
+import sys
+import threading
 
-# Ensure log directories exist
-os.makedirs("logs/sensor", exist_ok=True)
-os.makedirs("logs/operations", exist_ok=True)
+from node.reading import Reading
+from node.settings import CONFIG
 
-# Sensor Logger
-sensor_logger = logging.getLogger("sensor_logger")
-sensor_logger.setLevel(logging.INFO)
-sensor_logger.propagate = False  # Prevent logs from propagating to the root logger
 
-sensor_handler = TimedRotatingFileHandler(
-    "logs/sensor/sensor_data.log", when="midnight", interval=30, backupCount=3
-)
-sensor_handler.suffix = "%Y-%m-%d"
-sensor_formatter = logging.Formatter("%(asctime)s - %(message)s")
-sensor_handler.setFormatter(sensor_formatter)
+class JsonFormatter(logging.Formatter):
+    """Formatter that JSON-encodes dict and ``Reading`` messages.
+
+    Lets the sampling path log a reading as is and leaves the encoding to
+    the writer thread. A ``Reading`` keeps its encoding for the transmitter.
+    """
+
+    def format(self, record):
+        if isinstance(record.msg, Reading):
+            record.msg = record.msg.json()
+        elif isinstance(record.msg, dict):
+            record.msg = json.dumps(record.msg)
+        return super().format(record)
+
+
+class LazyQueueHandler(QueueHandler):
+    """QueueHandler that does not format records in the calling thread.
+
+    The stock QueueHandler formats every record before enqueueing it so it
+    can be pickled, our queue never leaves the process so formatting is left
+    to the writer thread. Log arguments must not be mutated after logging.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class _DeferredFlushMixin:
+    # StreamHandler flushes after every record, the writer flushes once per
+    # batch instead
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class BufferedTimedRotatingFileHandler(_DeferredFlushMixin, TimedRotatingFileHandler):
+    pass
+
+
+class BufferedRotatingFileHandler(_DeferredFlushMixin, RotatingFileHandler):
+    pass
+
 
-sensor_logger.handlers = [sensor_handler]  # Ensure no duplicate handlers
+class LogWriter:
+    """Single background thread writing queued records in batches.
 
-# Operations Logger
+    Takes up to ``batch_size`` records off the queue at a time, hands each to
+    the handlers of its logger and flushes every handler once per batch.
+    """
+
+    _sentinel = None
+
+    def __init__(self, log_queue, batch_size=256):
+        self.queue = log_queue
+        self.batch_size = batch_size
+        self.handlers = {}
+        self._thread = None
+
+    def add_handler(self, logger_name, handler):
+        self.handlers.setdefault(logger_name, []).append(handler)
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Write out everything queued so far and stop the thread."""
+        if self._thread is None:
+            return
+        self.queue.put(self._sentinel)
+        self._thread.join()
+        self._thread = None
+        for handlers in self.handlers.values():
+            for handler in handlers:
+                handler.close()
+        self.handlers = {}
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            touched = set()
+            stop = False
+            for record in batch:
+                if record is self._sentinel:
+                    stop = True
+                    continue
+                for handler in self.handlers.get(record.name, ()):
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+                        touched.add(handler)
+            for handler in touched:
+                try:
+                    handler.flush_batch()
+                except OSError as e:
+                    sys.stderr.write(f"Error flushing log file: {e}\n")
+            if stop:
+                return
+
+
+log_queue = queue.SimpleQueue()
+log_writer = LogWriter(log_queue)
+
+# Nothing is written until init_logging() is called, so importing the
+# package has no side effects. Until then warnings go to stderr.
+sensor_logger = logging.getLogger("sensor_logger")
+sensor_logger.propagate = False  # Prevent logs from propagating to the root logger
 ops_logger = logging.getLogger("ops_logger")
-ops_logger.setLevel(logging.INFO)
 ops_logger.propagate = False
 
-ops_handler = RotatingFileHandler(
-    "logs/operations/operations.log", maxBytes=10 * 1024 * 1024, backupCount=4
-)
-ops_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-ops_handler.setFormatter(ops_formatter)
+_lock = threading.Lock()
+
+
+def init_logging(path="logs", config=None):
+    """Set up the sensor and operations log files under ``path``.
+
+    Creates the log directories and starts the background writer thread.
+    Only the first call has any effect; returns the log writer.
+    """
+    config = CONFIG if config is None else config
+    with _lock:
+        if log_writer._thread is not None:
+            return log_writer
+        log_writer.batch_size = config.get("log_batch_size", 256)
+
+        # Ensure log directories exist
+        os.makedirs(os.path.join(path, "sensor"), exist_ok=True)
+        os.makedirs(os.path.join(path, "operations"), exist_ok=True)
 
-ops_logger.handlers = [ops_handler]
+        # Sensor Logger
+        sensor_logger.setLevel(config.get("sensor_log_level", "INFO"))
+        sensor_handler = BufferedTimedRotatingFileHandler(
+            os.path.join(path, "sensor", "sensor_data.log"),
+            when="midnight",
+            interval=30,
+            backupCount=3,
+        )
+        sensor_handler.suffix = "%Y-%m-%d"
+        sensor_handler.setFormatter(JsonFormatter("%(asctime)s - %(message)s"))
+        log_writer.add_handler(sensor_logger.name, sensor_handler)
+        # Ensure no duplicate handlers
+        sensor_logger.handlers = [LazyQueueHandler(log_queue)]
 
-# Test Logging
-sensor_logger.info("Sensor logger initialized.")
-ops_logger.info("Operations logger initialized.")
+        # Operations Logger
+        ops_logger.setLevel(config.get("ops_log_level", "INFO"))
+        ops_handler = BufferedRotatingFileHandler(
+            os.path.join(path, "operations", "operations.log"),
+            maxBytes=10 * 1024 * 1024,
+            backupCount=4,
+        )
+        ops_handler.setFormatter(
+            logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+        )
+        log_writer.add_handler(ops_logger.name, ops_handler)
+        ops_logger.handlers = [LazyQueueHandler(log_queue)]
 
-# Force logs to be written immediately
-for handler in sensor_logger.handlers:
-    handler.flush()
+        log_writer.start()
+        # Write out whatever is still queued on exit
+        atexit.register(log_writer.stop)
 
-for handler in ops_logger.handlers:
-    handler.flush()
+    sensor_logger.info("Sensor logger initialized.")
+    ops_logger.info("Operations logger initialized.")
+    return log_writer
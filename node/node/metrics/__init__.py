@@ -0,0 +1,13 @@
+from .metrics import Counter, Gauge, Histogram, Registry, REGISTRY
+from .server import MetricsServer, metrics_message, publish_metrics
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "REGISTRY",
+    "MetricsServer",
+    "metrics_message",
+    "publish_metrics",
+]
@@ -0,0 +1,298 @@
+import bisect
+import math
+import threading
+
+# Seconds, from a fast in-memory stage up to a broker timeout
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def labels(self, *values, **named):
+        """The child metric for one combination of label values."""
+        if named:
+            values = tuple(named[name] for name in self.label_names)
+        values = tuple(str(value) for value in values)
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}")
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self._child())
+        return child
+
+    def _default(self):
+        # Unlabelled metrics are their own single child
+        if self.label_names:
+            raise ValueError(f"{self.name} needs labels {self.label_names}")
+        return self.labels()
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self.children.items()):
+            lines.extend(child.expose(self.name, self.label_names, values))
+        return lines
+
+    def snapshot(self):
+        if not self.label_names:
+            child = self.children.get(())
+            return child.snapshot() if child is not None else None
+        return {
+            ",".join(f"{n}={v}" for n, v in zip(self.label_names, values)): (
+                child.snapshot()
+            )
+            for values, child in self.children.items()
+        }
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0
+        self.function = None
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def set_function(self, function):
+        """Read the count from ``function()``, a total kept elsewhere that
+        only ever grows, whenever it is collected."""
+        self.function = function
+
+    def get(self):
+        if self.function is not None:
+            try:
+                return self.function()
+            except Exception:
+                return math.nan
+        return self.value
+
+    def expose(self, name, label_names, values):
+        return [
+            f"{name}{_format_labels(label_names, values)} {_format_value(self.get())}"
+        ]
+
+    def snapshot(self):
+        value = self.get()
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        return value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, such as readings taken."""
+
+    kind = "counter"
+    _child = _CounterChild
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+    @property
+    def value(self):
+        return self._default().get()
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        """Read the value from ``function()`` whenever it is collected."""
+        self.function = function
+
+    def get(self):
+        if self.function is not None:
+            try:
+                return self.function()
+            except Exception:
+                return math.nan
+        return self.value
+
+    def expose(self, name, label_names, values):
+        return [
+            f"{name}{_format_labels(label_names, values)} {_format_value(self.get())}"
+        ]
+
+    def snapshot(self):
+        value = self.get()
+        # A failed callback's NaN, or an infinity, has no JSON spelling
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        return value
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, such as a queue depth."""
+
+    kind = "gauge"
+    _child = _GaugeChild
+
+    def set(self, value):
+        self._default().set(value)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+    def get(self):
+        return self._default().get()
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def expose(self, name, label_names, values):
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            labels = _format_labels(label_names, values, [("le", _format_value(bound))])
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _format_labels(label_names, values)
+        lines.append(f"{name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+    def snapshot(self):
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        return {
+            "count": sum(counts),
+            "sum": total,
+            "buckets": dict(
+                zip(map(_format_value, self.buckets + (math.inf,)), counts)
+            ),
+        }
+
+
+class Histogram(_Metric):
+    """Distribution of observed values, latencies in seconds by default."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    @property
+    def count(self):
+        return self._default().count
+
+
+class Registry:
+    """Named collection of metrics, exposed in the Prometheus text format.
+
+    Asking for a metric that already exists returns it, so modules can
+    declare the metrics they update at import time.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get(self, kind, name, help, labels, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = kind(name, help, labels, **kwargs)
+            elif not isinstance(metric, kind):
+                raise ValueError(f"{name} is already a {metric.kind}")
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def expose(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for name in sorted(self.metrics):
+            lines.extend(self.metrics[name].expose())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """All metrics as plain JSON-serialisable values, keyed by labels."""
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+
+REGISTRY = Registry()
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import time
+
+import pika
+from node.http import HttpServer
+from node.logger import ops_logger
+from node.settings import CONFIG
+from .metrics import REGISTRY
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_TYPE = "metrics"
+
+
+class MetricsServer(HttpServer):
+    """Serve a registry over HTTP for Prometheus to scrape.
+
+    A deliberately tiny asyncio server running on the node's own event loop:
+    ``GET /metrics`` returns the text exposition format, anything else a
+    404. Scrapes are cheap, metric values are only formatted on request.
+    """
+
+    what = "metrics"
+
+    def __init__(self, host=None, port=None, registry=None, config=None):
+        config = CONFIG if config is None else config
+        super().__init__(
+            host or config.get("metrics_host", "0.0.0.0"),
+            config.get("metrics_port", 9108) if port is None else port,
+        )
+        self.registry = REGISTRY if registry is None else registry
+
+    def respond(self, method, target):
+        if method == b"GET" and target.split(b"?")[0] in (b"/metrics", b"/"):
+            return "200 OK", CONTENT_TYPE, self.registry.expose().encode()
+        return "404 Not Found", CONTENT_TYPE, b"Not found\n"
+
+
+def metrics_message(registry=None, config=None):
+    """A registry snapshot as a JSON message, ``(body, properties)``."""
+    config = CONFIG if config is None else config
+    registry = REGISTRY if registry is None else registry
+    body = json.dumps(
+        {
+            "node_id": config.get("node_id"),
+            "timestamp": time.time(),
+            "type": METRICS_TYPE,
+            "metrics": registry.snapshot(),
+        }
+    )
+    return body, pika.BasicProperties(
+        content_type="application/json", type=METRICS_TYPE
+    )
+
+
+async def publish_metrics(put, interval, registry=None, config=None):
+    """Every ``interval`` seconds hand a snapshot to ``await put(body, props)``."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await put(*metrics_message(registry, config))
+        except Exception as e:
+            ops_logger.error("Error publishing metrics: %r", e)
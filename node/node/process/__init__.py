@@ -0,0 +1,18 @@
+from .aggregate import RingBuffer, WindowAggregator
+from .anomaly import AnomalyDetector
+from .deadband import DeadbandFilter
+from .downsample import lttb, minmax, DOWNSAMPLERS
+from .features import FeatureExtractor, extract_features, decode_block
+
+__all__ = [
+    "RingBuffer",
+    "WindowAggregator",
+    "AnomalyDetector",
+    "DeadbandFilter",
+    "lttb",
+    "minmax",
+    "DOWNSAMPLERS",
+    "FeatureExtractor",
+    "extract_features",
+    "decode_block",
+]
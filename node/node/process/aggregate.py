@@ -0,0 +1,130 @@
+import numpy as np
+from node.settings import CONFIG
+
+
+class RingBuffer:
+    """Preallocated float64 ring buffer with zero-copy views.
+
+    Once full the oldest values are overwritten, so memory use stays fixed.
+    Every value is written twice, ``capacity`` apart, so the buffered values
+    are always one contiguous slice and ``view()`` never has to copy.
+    """
+
+    def __init__(self, capacity):
+        self.values = np.full(2 * capacity, np.nan)
+        self.capacity = capacity
+        self.count = 0
+        self.position = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, value):
+        self.values[self.position] = value
+        self.values[self.position + self.capacity] = value
+        self.position = (self.position + 1) % self.capacity
+        self.count += 1
+
+    def view(self):
+        """Read-only view of the buffered values, oldest first."""
+        start = self.position if self.count >= self.capacity else 0
+        view = self.values[start : start + len(self)]
+        view.flags.writeable = False
+        return view
+
+    def last(self):
+        return self.values[self.position - 1 + self.capacity] if self.count else None
+
+    def clear(self):
+        self.count = 0
+        self.position = 0
+
+
+class WindowAggregator:
+    """Summarise each payload channel over fixed, clock-aligned windows.
+
+    Readings are buffered per channel until one arrives for a later window,
+    then the finished window is returned as a summary reading with count,
+    min, max, mean, standard deviation and the configured percentiles of
+    every numeric channel. Summaries are stamped with the window start and
+    carry ``"type": "summary"`` and the window length in seconds.
+
+    At most ``capacity`` values per channel are kept for a window. ``count``
+    is every value the window saw, ``sampled`` the most recent ones the
+    statistics were computed over; the two differ only when a window
+    outgrew its buffer.
+    """
+
+    def __init__(self, interval=None, percentiles=None, capacity=None, config=None):
+        config = CONFIG if config is None else config
+        if interval is None:
+            interval = config.get("aggregate_interval", 60)
+        self.interval = interval
+        if percentiles is None:
+            percentiles = config.get("aggregate_percentiles", [50, 90])
+        self.percentiles = list(percentiles)
+        if capacity is None:
+            capacity = config.get("aggregate_capacity", 4096)
+        self.capacity = capacity
+        if self.interval <= 0 or self.capacity < 1:
+            raise ValueError(
+                f"Need a positive interval and capacity, got {interval}, {capacity}"
+            )
+        self.buffers = {}
+        self.window = None
+        self.node_id = None
+
+    def add(self, reading):
+        """Buffer a reading, returns the summaries of windows it closed."""
+        timestamp = reading.get("timestamp")
+        if not isinstance(timestamp, (int, float)):
+            return []
+        window = timestamp // self.interval * self.interval
+        summaries = []
+        if self.window is not None and window != self.window:
+            summaries = self.flush()
+        self.window = window
+        self.node_id = reading.get("node_id")
+
+        for name, value in (reading.get("payload") or {}).items():
+            if type(value) not in (int, float):
+                continue
+            if name not in self.buffers:
+                self.buffers[name] = RingBuffer(self.capacity)
+            self.buffers[name].append(value)
+        return summaries
+
+    def flush(self):
+        """Summarise and reset the current window, empty if nothing buffered."""
+        payload = {}
+        for name, buffer in self.buffers.items():
+            if not len(buffer):
+                continue
+            values = buffer.view()
+            stats = {
+                "count": buffer.count,
+                "sampled": len(buffer),
+                "min": float(values.min()),
+                "max": float(values.max()),
+                "mean": float(values.mean()),
+                "std": float(values.std()),
+            }
+            if self.percentiles:
+                for q, value in zip(
+                    self.percentiles, np.percentile(values, self.percentiles)
+                ):
+                    stats[f"p{q:g}"] = float(value)
+            payload[name] = stats
+            buffer.clear()
+
+        if not payload:
+            return []
+        return [
+            {
+                "node_id": self.node_id,
+                "timestamp": self.window,
+                "type": "summary",
+                "window": self.interval,
+                "payload": payload,
+            }
+        ]
@@ -0,0 +1,49 @@
+import math
+
+from node.settings import CONFIG
+
+
+class AnomalyDetector:
+    """Streaming per-channel outlier detection on an EWMA z-score.
+
+    Keeps an exponentially weighted mean and variance per channel, a value
+    more than ``threshold`` standard deviations from the mean is flagged.
+    Nothing is flagged during the first ``warmup`` samples of a channel.
+    """
+
+    def __init__(self, alpha=None, threshold=None, warmup=None, config=None):
+        config = CONFIG if config is None else config
+        self.alpha = alpha or config.get("anomaly_alpha", 0.05)
+        self.threshold = threshold or config.get("anomaly_threshold", 4.0)
+        if warmup is None:
+            warmup = config.get("anomaly_warmup", 30)
+        self.warmup = warmup
+        # channel -> [samples, mean, variance]
+        self.state = {}
+        self.flagged = 0
+
+    def score(self, reading):
+        """Update the model, returns ``{channel: z-score}`` of outliers."""
+        outliers = {}
+        for name, value in (reading.get("payload") or {}).items():
+            if type(value) not in (int, float) or not math.isfinite(value):
+                continue
+            state = self.state.get(name)
+            if state is None:
+                self.state[name] = [1, value, 0.0]
+                continue
+
+            samples, mean, variance = state
+            deviation = value - mean
+            if samples >= self.warmup and variance > 0:
+                z = deviation / math.sqrt(variance)
+                if abs(z) > self.threshold:
+                    outliers[name] = round(z, 2)
+            # Incremental EWMA mean and variance (Finch, 2009)
+            increment = self.alpha * deviation
+            state[0] = samples + 1
+            state[1] = mean + increment
+            state[2] = (1 - self.alpha) * (variance + deviation * increment)
+
+        self.flagged += len(outliers)
+        return outliers
@@ -0,0 +1,51 @@
+from node.reading import replace
+from node.settings import CONFIG
+
+
+class DeadbandFilter:
+    """Report-by-exception filter for payload channels.
+
+    A channel with a deadband is only passed on when it moved more than its
+    delta away from the last value sent, or when nothing was sent for it in
+    ``heartbeat`` seconds, so a quiet channel still proves it is alive.
+    Channels without a deadband always pass. Readings left with no channels
+    are suppressed entirely.
+    """
+
+    def __init__(self, deltas=None, heartbeat=None, config=None):
+        config = CONFIG if config is None else config
+        self.deltas = config.get("deadband", {}) if deltas is None else deltas
+        self.heartbeat = heartbeat or config.get("deadband_heartbeat", 300)
+        self.last = {}
+        self.suppressed = 0
+
+    def filter(self, reading, force=False):
+        """Return the reading trimmed to the channels worth sending, or None.
+
+        ``force`` passes every channel and resets their deadbands, for
+        readings that must go out such as flagged anomalies.
+        """
+        timestamp = reading.get("timestamp", 0)
+        payload = {}
+        for name, value in (reading.get("payload") or {}).items():
+            delta = self.deltas.get(name)
+            last = self.last.get(name)
+            if (
+                force
+                or delta is None
+                or last is None
+                or type(value) not in (int, float)
+                or abs(value - last[1]) > delta
+                or timestamp - last[0] >= self.heartbeat
+            ):
+                payload[name] = value
+                self.last[name] = (timestamp, value)
+            else:
+                self.suppressed += 1
+
+        if not payload:
+            return None
+        if len(payload) == len(reading.get("payload") or {}):
+            return reading
+        # Never modify the reading in place, the sensor log formats it later
+        return replace(reading, payload=payload)
@@ -0,0 +1,54 @@
+import numpy as np
+
+
+def lttb(x, y, points):
+    """Largest-Triangle-Three-Buckets downsampling to ``points`` points.
+
+    Keeps the first and last point and from every bucket in between the
+    point forming the largest triangle with the previously kept point and
+    the average of the next bucket, which preserves the visual shape of a
+    series far better than striding. See Steinarsson, "Downsampling Time
+    Series for Visual Representation" (2013).
+    """
+    count = len(x)
+    if points >= count or points < 3:
+        return x, y
+    every = (count - 2) / (points - 2)
+    keep = np.empty(points, dtype=np.intp)
+    keep[0], keep[-1] = 0, count - 1
+    kept = 0
+    for bucket in range(points - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        following = slice(end, min(int((bucket + 2) * every) + 1, count))
+        next_x = x[following].mean()
+        next_y = y[following].mean()
+        area = np.abs(
+            (x[kept] - next_x) * (y[start:end] - y[kept])
+            - (x[kept] - x[start:end]) * (next_y - y[kept])
+        )
+        kept = start + int(area.argmax())
+        keep[bucket + 1] = kept
+    return x[keep], y[keep]
+
+
+def minmax(x, y, points):
+    """Keep the minimum and maximum of ``points // 2`` equal buckets.
+
+    Cheaper than LTTB and never hides a spike.
+    """
+    count = len(x)
+    buckets = points // 2
+    if points >= count or buckets < 1:
+        return x, y
+    edges = np.linspace(0, count, buckets + 1).astype(np.intp)
+    keep = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            chunk = y[start:end]
+            keep.extend(sorted((start + chunk.argmin(), start + chunk.argmax())))
+    keep = np.unique(keep)
+    return x[keep], y[keep]
+
+
+DOWNSAMPLERS = {"lttb": lttb, "minmax": minmax}
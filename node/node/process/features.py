@@ -0,0 +1,103 @@
+import asyncio
+import json
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from node.settings import CONFIG
+
+BLOCK_CONTENT_TYPE = "application/vnd.lakewatch.block.v1"
+BLOCK_TYPE = "block.raw"
+FEATURES_TYPE = "features"
+
+
+def band_name(low, high):
+    return f"band_{low:g}_{high:g}"
+
+
+def block_body(block, header):
+    """A raw block as a message body: one JSON header line followed by the
+    samples as little-endian float32, all zlib compressed."""
+    header = {**header, "dtype": "<f4", "samples": len(block)}
+    samples = np.asarray(block, dtype="<f4").tobytes()
+    return zlib.compress(json.dumps(header).encode() + b"\n" + samples)
+
+
+def decode_block(body, properties=None):
+    """Decode a raw block message into ``(header, samples)``."""
+    encoding = properties.content_encoding if properties else "zlib"
+    if encoding == "zlib":
+        body = zlib.decompress(body)
+    elif encoding:
+        raise ValueError(f"Unknown content encoding: {encoding}")
+    header, samples = body.split(b"\n", 1)
+    header = json.loads(header)
+    return header, np.frombuffer(samples, dtype=header["dtype"])
+
+
+def extract_features(block, rate, bands, header=None):
+    """Features of one block of samples taken at ``rate`` Hz.
+
+    Returns ``(features, body)``: mean, RMS, peak (largest absolute
+    sample), the frequency with the most power, and the power in each
+    ``(low, high)`` Hz band of a Hann windowed spectrum, scaled so the
+    bands of the whole spectrum add up to the variance. ``body`` is the
+    block as a compressed message when a ``header`` is given, else None.
+
+    Runs in the worker processes of ``FeatureExtractor``, so it must stay
+    a picklable module level function.
+    """
+    block = np.asarray(block, dtype=np.float64)
+    size = len(block)
+    mean = block.mean()
+    window = np.hanning(size)
+    spectrum = np.fft.rfft((block - mean) * window)
+    power = np.abs(spectrum) ** 2 / (size * np.sum(window**2))
+    # One sided: every bin but DC (and Nyquist, for even sizes) counts twice
+    power[1 : size - size // 2] *= 2
+    frequencies = np.fft.rfftfreq(size, 1 / rate)
+
+    features = {
+        "mean": float(mean),
+        "rms": float(np.sqrt(np.mean(block**2))),
+        "peak": float(np.max(np.abs(block))),
+        "peak_frequency": float(frequencies[np.argmax(power[1:]) + 1]),
+    }
+    for low, high in bands:
+        selected = (frequencies >= low) & (frequencies < high)
+        features[band_name(low, high)] = float(power[selected].sum())
+    body = block_body(block, header) if header is not None else None
+    return features, body
+
+
+class FeatureExtractor:
+    """Run ``extract_features`` on a pool of worker processes.
+
+    The FFTs are the heaviest work on the node, in separate processes they
+    hold neither the event loop nor the GIL the publisher thread needs.
+    Workers are spawned rather than forked, the node has threads running.
+    """
+
+    def __init__(self, bands=None, workers=None, executor=None, config=None):
+        config = CONFIG if config is None else config
+        if bands is None:
+            bands = config.get("block_bands", [])
+        self.bands = [tuple(band) for band in bands]
+        self.owned = executor is None
+        if executor is None:
+            executor = ProcessPoolExecutor(
+                workers or config.get("block_workers", 2),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        self.executor = executor
+
+    async def extract(self, block, rate, header=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, extract_features, block, rate, self.bands, header
+        )
+
+    def close(self):
+        if self.owned:
+            self.executor.shutdown(wait=True, cancel_futures=True)
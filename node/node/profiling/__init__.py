@@ -0,0 +1,15 @@
+from .profiler import (
+    Profiler,
+    ProfileOutput,
+    SamplingProfiler,
+    MemoryProfiler,
+    LoopMonitor,
+)
+
+__all__ = [
+    "Profiler",
+    "ProfileOutput",
+    "SamplingProfiler",
+    "MemoryProfiler",
+    "LoopMonitor",
+]
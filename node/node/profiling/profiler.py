@@ -0,0 +1,372 @@
+import asyncio
+import collections
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+
+from node.logger import ops_logger
+from node.settings import CONFIG
+
+
+def _stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+        )
+        frame = frame.f_back
+    return names[::-1]
+
+
+def _thread_names():
+    return {thread.ident: thread.name for thread in threading.enumerate()}
+
+
+class ProfileOutput:
+    """Directory of profile reports kept under ``max_bytes`` in total.
+
+    A report is cut short at a tenth of the budget, and the oldest reports
+    are deleted whenever a new one would take the directory over it.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.written = 0
+        # Reports come from the loop and from the loop monitor's thread
+        self.lock = threading.Lock()
+
+    def write(self, kind, text, extension="txt"):
+        os.makedirs(self.path, exist_ok=True)
+        data = text.encode()
+        limit = max(1024, self.max_bytes // 10)
+        if len(data) > limit:
+            data = data[:limit] + b"\n... truncated\n"
+        with self.lock:
+            self.written += 1
+            name = f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}-{self.written}"
+            path = os.path.join(self.path, f"{name}.{extension}")
+            with open(path, "wb") as f:
+                f.write(data)
+            self._trim()
+        return path
+
+    def _trim(self):
+        entries = [
+            os.path.join(self.path, name)
+            for name in os.listdir(self.path)
+            if os.path.isfile(os.path.join(self.path, name))
+        ]
+        entries.sort(key=os.path.getmtime)
+        total = sum(map(os.path.getsize, entries))
+        while total > self.max_bytes and len(entries) > 1:
+            oldest = entries.pop(0)
+            total -= os.path.getsize(oldest)
+            os.remove(oldest)
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler of every thread, loop included.
+
+    A background thread snapshots the stack of every other thread every
+    ``interval`` seconds and counts identical stacks. ``report()`` returns
+    the most frequent ones in the folded format flame graph tools read
+    (``thread;outer;...;inner count``). Idle threads show up waiting in
+    their blocking call.
+    """
+
+    def __init__(self, interval=0.01, top=200):
+        self.interval = interval
+        self.top = top
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.started = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self.running:
+            return
+        self.stacks.clear()
+        self.samples = 0
+        self.started = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def report(self):
+        lines = [
+            f"{stack} {count}" for stack, count in self.stacks.most_common(self.top)
+        ]
+        return "\n".join(lines) + "\n"
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = _thread_names()
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = [names.get(ident, str(ident))] + _stack(frame)
+                self.stacks[";".join(stack)] += 1
+            self.samples += 1
+
+
+class MemoryProfiler:
+    """tracemalloc snapshots, reporting the top allocation changes since the
+    previous snapshot."""
+
+    def __init__(self, frames=10, top=50):
+        self.frames = frames
+        self.top = top
+        self.previous = None
+
+    @property
+    def running(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not self.running:
+            tracemalloc.start(self.frames)
+        self.previous = self._snapshot()
+
+    def stop(self):
+        self.previous = None
+        tracemalloc.stop()
+
+    def report(self):
+        if not self.running:
+            self.start()
+        snapshot = self._snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"Traced memory: {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB",
+            f"Top {self.top} changes since the previous snapshot:",
+        ]
+        for stat in snapshot.compare_to(self.previous, "lineno")[: self.top]:
+            lines.append(str(stat))
+        lines.append(f"Top {self.top} allocations:")
+        for stat in snapshot.statistics("lineno")[: self.top]:
+            lines.append(str(stat))
+        self.previous = snapshot
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _snapshot():
+        return tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            )
+        )
+
+
+class LoopMonitor:
+    """Catch callbacks that hold up the event loop, and what they were doing.
+
+    A task on the loop records a heartbeat every ``interval`` seconds. A
+    watchdog thread notices when the heartbeat is more than ``threshold``
+    seconds overdue and captures the loop thread's stack at that moment,
+    which points at the blocking callback, unlike asyncio's debug mode
+    this costs next to nothing while nothing is slow.
+    """
+
+    def __init__(self, threshold=0.1, interval=0.02, on_stall=None):
+        self.threshold = threshold
+        self.interval = interval
+        self.on_stall = on_stall
+        self.stalls = 0
+        self.longest = 0.0
+        self.beat = None
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._task is not None
+
+    def start(self):
+        if self.running:
+            return
+        self.loop_thread = threading.get_ident()
+        self.beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-monitor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        self._task = None
+        self._stop.set()
+        self._thread.join()
+
+    async def _heartbeat(self):
+        while True:
+            self.beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(self.interval):
+            beat = self.beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue < self.threshold or beat == reported:
+                continue
+            # Report each stall once, while it is still going on
+            reported = beat
+            frame = sys._current_frames().get(self.loop_thread)
+            stack = _stack(frame) if frame is not None else []
+            self.stalls += 1
+            self.longest = max(self.longest, overdue)
+            ops_logger.warning("Event loop blocked for over %.3fs", overdue)
+            if self.on_stall is not None:
+                self.on_stall(overdue, stack)
+
+
+class Profiler:
+    """Runtime switchable profiling of a running node.
+
+    Controlled by signals (``SIGUSR1`` starts the CPU profiler and, sent
+    again, stops it and writes its report; ``SIGUSR2`` writes a memory
+    snapshot diff) or by line commands on a local Unix socket, e.g.
+    ``echo "cpu start" | nc -U logs/profile.sock``. Commands: ``cpu
+    start|stop``, ``memory start|snapshot|stop``, ``loop start|stop`` and
+    ``status``. Reports go to ``profile_path`` through ``ProfileOutput``.
+    """
+
+    def __init__(self, path=None, socket_path=None, max_bytes=None, config=None):
+        config = CONFIG if config is None else config
+        self.output = ProfileOutput(
+            path or config.get("profile_path", "logs/profiles"),
+            max_bytes or config.get("profile_max_bytes", 20 * 1024 * 1024),
+        )
+        self.socket_path = socket_path or config.get(
+            "profile_socket", "logs/profile.sock"
+        )
+        top = config.get("profile_top", 50)
+        self.cpu = SamplingProfiler(config.get("profile_interval", 0.01), top * 4)
+        self.memory = MemoryProfiler(top=top)
+        self.loop = LoopMonitor(
+            config.get("profile_slow_callback", 0.1), on_stall=self._stalled
+        )
+        self.server = None
+        self._signals = []
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        for name, handler in (("SIGUSR1", self._toggle_cpu), ("SIGUSR2", self._dump)):
+            signum = getattr(signal, name, None)
+            if signum is not None:
+                loop.add_signal_handler(signum, handler)
+                self._signals.append(signum)
+        if self.socket_path and hasattr(asyncio, "start_unix_server"):
+            directory = os.path.dirname(self.socket_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self.server = await asyncio.start_unix_server(
+                self._client, self.socket_path
+            )
+            # Local control only
+            os.chmod(self.socket_path, 0o600)
+        ops_logger.info("Profiling control on %s and SIGUSR1/2", self.socket_path)
+
+    async def stop(self):
+        loop = asyncio.get_running_loop()
+        for signum in self._signals:
+            loop.remove_signal_handler(signum)
+        self._signals = []
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+        if self.cpu.running:
+            self._finish_cpu()
+        self.loop.stop()
+        if self.memory.running:
+            self.memory.stop()
+
+    def command(self, line):
+        """Run one control command, returns the reply."""
+        words = line.split()
+        target, action = (words + ["", ""])[:2]
+        if target == "cpu" and action == "start":
+            self.cpu.start()
+            return "cpu profiler started"
+        if target == "cpu" and action == "stop":
+            if not self.cpu.running:
+                return "cpu profiler is not running"
+            return f"wrote {self._finish_cpu()}"
+        if target == "memory" and action == "start":
+            self.memory.start()
+            return "tracemalloc started"
+        if target == "memory" and action == "snapshot":
+            return f"wrote {self.output.write('memory', self.memory.report())}"
+        if target == "memory" and action == "stop":
+            self.memory.stop()
+            return "tracemalloc stopped"
+        if target == "loop" and action == "start":
+            self.loop.start()
+            return "loop monitor started"
+        if target == "loop" and action == "stop":
+            self.loop.stop()
+            return "loop monitor stopped"
+        if target == "status":
+            return (
+                f"cpu {'on' if self.cpu.running else 'off'}, "
+                f"memory {'on' if self.memory.running else 'off'}, "
+                f"loop {'on' if self.loop.running else 'off'} "
+                f"({self.loop.stalls} stalls)"
+            )
+        return f"unknown command: {line.strip()}"
+
+    def _finish_cpu(self):
+        self.cpu.stop()
+        return self.output.write("cpu", self.cpu.report(), "folded")
+
+    def _toggle_cpu(self):
+        ops_logger.info(self.command("cpu stop" if self.cpu.running else "cpu start"))
+
+    def _dump(self):
+        ops_logger.info(self.command("memory snapshot"))
+
+    def _stalled(self, seconds, stack):
+        # Called from the monitor thread, file writes only
+        self.output.write(
+            "stall", f"Event loop blocked for {seconds:.3f}s in:\n" + "\n".join(stack)
+        )
+
+    async def _client(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                reply = self.command(line.decode(errors="replace"))
+                writer.write(reply.encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
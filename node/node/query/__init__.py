@@ -0,0 +1,4 @@
+from .index import ReadingIndex
+from .server import QueryServer
+
+__all__ = ["ReadingIndex", "QueryServer"]
@@ -0,0 +1,158 @@
+import math
+
+import numpy as np
+from node.logger import ops_logger
+from node.process import RingBuffer
+from node.settings import CONFIG
+
+TIMESTAMP = "timestamp"
+
+
+class _Channel:
+    """One channel's values plus running totals of everything before each
+    value, so the count, sum and sum of squares of any run of rows is the
+    difference of two entries."""
+
+    def __init__(self, capacity, rows, position):
+        self.values = RingBuffer(capacity)
+        self.before = [RingBuffer(capacity) for _ in range(3)]
+        # Line up with the rows already in the index, absent from them all
+        for buffer in [self.values] + self.before:
+            buffer.count = rows
+            buffer.position = position
+        for buffer in self.before:
+            buffer.values[:] = 0.0
+        self.totals = [0.0, 0.0, 0.0]
+
+    def append(self, value):
+        present = not math.isnan(value)
+        for buffer, total in zip(self.before, self.totals):
+            buffer.append(total)
+        self.values.append(value)
+        if present:
+            self.totals[0] += 1
+            self.totals[1] += value
+            self.totals[2] += value * value
+
+    def cumulative(self, positions):
+        """Totals of the rows before each of ``positions`` (in view order)."""
+        rows = len(self.values)
+        inside = np.minimum(positions, max(rows - 1, 0))
+        return [
+            np.where(positions < rows, buffer.view()[inside] if rows else 0.0, total)
+            for buffer, total in zip(self.before, self.totals)
+        ]
+
+
+class ReadingIndex:
+    """The most recent ``capacity`` readings, in memory, indexed by time.
+
+    Rows are kept in time order in preallocated ring buffers, one per
+    channel plus the timestamps, so a time range is two binary searches
+    and a zero-copy slice. Every channel also keeps running count, sum and
+    sum of squares totals, which turns the count, mean and standard
+    deviation of any window into two lookups. Readings older than the
+    newest one are dropped, like the history store does.
+    """
+
+    def __init__(self, capacity=None, config=None):
+        config = CONFIG if config is None else config
+        self.capacity = capacity or config.get("query_capacity", 21600)
+        self.node_id = config.get("node_id")
+        self.timestamps = RingBuffer(self.capacity)
+        self.channels = {}
+        self.latest = {}
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def append(self, reading):
+        timestamp = reading.get("timestamp")
+        if not isinstance(timestamp, (int, float)):
+            return
+        newest = self.timestamps.last()
+        if newest is not None and timestamp < newest:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                ops_logger.warning(
+                    "Query index timestamp went backwards, dropped %d readings",
+                    self.dropped,
+                )
+            return
+        payload = reading.get("payload") or {}
+        for name, value in payload.items():
+            if type(value) in (int, float) and name not in self.channels:
+                self.channels[name] = _Channel(
+                    self.capacity, self.timestamps.count, self.timestamps.position
+                )
+        for name, channel in self.channels.items():
+            value = payload.get(name)
+            if type(value) not in (int, float):
+                value = math.nan
+            channel.append(value)
+            if not math.isnan(value):
+                self.latest[name] = (timestamp, value)
+        self.timestamps.append(timestamp)
+
+    def _select(self, channels):
+        if channels is None:
+            return list(self.channels)
+        return [name for name in channels if name in self.channels]
+
+    def _find(self, start, end):
+        timestamps = self.timestamps.view()
+        first = int(np.searchsorted(timestamps, start, side="left"))
+        last = int(np.searchsorted(timestamps, end, side="left"))
+        return first, last
+
+    def range(self, start, end, channels=None):
+        """Readings with ``start <= timestamp < end`` as a dict of read-only
+        arrays, ``timestamp`` plus one per channel, NaN where absent."""
+        first, last = self._find(start, end)
+        result = {TIMESTAMP: self.timestamps.view()[first:last]}
+        for name in self._select(channels):
+            result[name] = self.channels[name].values.view()[first:last]
+        return result
+
+    def aggregate(self, start, end, window=None, channels=None):
+        """Statistics of every channel per ``window`` seconds from ``start``.
+
+        Returns ``{"window_start": array, channel: {"count", "min", "max",
+        "mean", "std"}}`` like ``HistoryStore.aggregate``, over the whole
+        span if no window is given. Windows without readings are left out.
+        """
+        if window is None or window <= 0:
+            window = end - start
+        windows = max(1, math.ceil((end - start) / window))
+        edges = np.minimum(start + np.arange(windows + 1) * window, end)
+        positions = np.searchsorted(self.timestamps.view(), edges, side="left")
+        starts, ends = positions[:-1], positions[1:]
+        used = ends > starts
+        result = {"window_start": edges[:-1][used]}
+        starts, ends = starts[used], ends[used]
+        for name in self._select(channels):
+            channel = self.channels[name]
+            before = channel.cumulative(starts)
+            after = channel.cumulative(ends)
+            count, total, squares = (b - a for a, b in zip(before, after))
+            values = channel.values.view()
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = total / count
+                variance = np.maximum(squares / count - mean * mean, 0.0)
+                if len(starts):
+                    # fmin/fmax skip NaN unless the whole window is NaN
+                    offset = starts[0]
+                    part = values[offset : ends[-1]]
+                    low = np.fmin.reduceat(part, starts - offset)
+                    high = np.fmax.reduceat(part, starts - offset)
+                else:
+                    low = high = np.empty(0)
+            result[name] = {
+                "count": count.astype(np.int64),
+                "min": low,
+                "max": high,
+                "mean": mean,
+                "std": np.sqrt(variance),
+            }
+        return result
@@ -0,0 +1,135 @@
+import json
+import math
+import time
+import urllib.parse
+
+import numpy as np
+from node.http import HttpServer
+from node.process import DOWNSAMPLERS
+from node.settings import CONFIG
+from node.timespec import parse_duration, parse_time
+from .index import TIMESTAMP
+
+CONTENT_TYPE = "application/json"
+
+
+def _list(values):
+    return [None if math.isnan(value) else value for value in values.tolist()]
+
+
+class QueryServer(HttpServer):
+    """Answer HTTP/JSON queries from a ``ReadingIndex``.
+
+    Small asyncio server on the node's own event loop, for handheld tools
+    and gateways polling many nodes:
+
+    * ``GET /latest[?channel=ph]``: newest value and time of each channel.
+    * ``GET /range?start=1h[&end=...&channel=...&points=500]``: the
+      readings in a time range, per channel, downsampled to ``points``
+      (at most ``query_max_points``) with ``query_downsample``.
+    * ``GET /aggregate?start=1h[&end=...&window=5m&channel=...]``: count,
+      min, max, mean and std per window, or over the whole range.
+
+    Times are epoch seconds, ISO 8601 or an age like ``90m``; ``channel``
+    may be repeated or comma separated.
+    """
+
+    what = "queries"
+
+    def __init__(self, index, host=None, port=None, config=None):
+        config = CONFIG if config is None else config
+        super().__init__(
+            host or config.get("query_host", "0.0.0.0"),
+            config.get("query_port", 9109) if port is None else port,
+        )
+        self.index = index
+        self.max_points = config.get("query_max_points", 1000)
+        self.downsample = DOWNSAMPLERS[config.get("query_downsample", "lttb")]
+        self.routes = {
+            "/latest": self.latest,
+            "/range": self.range,
+            "/aggregate": self.aggregate,
+        }
+
+    def query(self, path, params):
+        """Answer one request, returns ``(status, document)``."""
+        route = self.routes.get(path)
+        if route is None:
+            return "404 Not Found", {"error": f"unknown path {path}"}
+        try:
+            document = route(params)
+        except (ValueError, KeyError) as e:
+            return "400 Bad Request", {"error": str(e)}
+        return "200 OK", {"node_id": self.index.node_id, **document}
+
+    def latest(self, params):
+        channels = self._channels(params) or list(self.index.latest)
+        return {
+            "channels": {
+                name: dict(zip((TIMESTAMP, "value"), self.index.latest[name]))
+                for name in channels
+                if name in self.index.latest
+            }
+        }
+
+    def range(self, params):
+        start, end = self._span(params)
+        points = min(int(self._one(params, "points", self.max_points)), self.max_points)
+        if points < 3:
+            # The downsamplers return the whole series for fewer
+            raise ValueError("points must be at least 3")
+        data = self.index.range(start, end, self._channels(params))
+        timestamps = data.pop(TIMESTAMP)
+        channels = {}
+        for name, values in data.items():
+            present = ~np.isnan(values)
+            x, y = self.downsample(timestamps[present], values[present], points)
+            channels[name] = {TIMESTAMP: x.tolist(), "value": y.tolist()}
+        return {"start": start, "end": end, "channels": channels}
+
+    def aggregate(self, params):
+        start, end = self._span(params)
+        window = params.get("window")
+        window = parse_duration(window[0]) if window else end - start
+        if window <= 0 or (end - start) / window > self.max_points:
+            raise ValueError(f"window must split the range into 1 to {self.max_points}")
+        result = self.index.aggregate(start, end, window, self._channels(params))
+        return {
+            "start": start,
+            "end": end,
+            "window": window,
+            "window_start": result.pop("window_start").tolist(),
+            "channels": {
+                name: {stat: _list(values) for stat, values in stats.items()}
+                for name, stats in result.items()
+            },
+        }
+
+    @staticmethod
+    def _one(params, name, default=None):
+        values = params.get(name)
+        return values[-1] if values else default
+
+    def _span(self, params):
+        start = parse_time(self._one(params, "start", "1h"))
+        end = self._one(params, "end")
+        end = parse_time(end) if end else time.time()
+        if end <= start:
+            raise ValueError("end must be after start")
+        return start, end
+
+    @staticmethod
+    def _channels(params):
+        names = [
+            name for value in params.get("channel", []) for name in value.split(",")
+        ]
+        return [name for name in names if name] or None
+
+    def respond(self, method, target):
+        if method != b"GET":
+            status, document = "405 Method Not Allowed", {"error": "GET only"}
+        else:
+            url = urllib.parse.urlsplit(target.decode("latin-1"))
+            params = urllib.parse.parse_qs(url.query)
+            status, document = self.query(url.path.rstrip("/"), params)
+        return status, CONTENT_TYPE, json.dumps(document).encode()
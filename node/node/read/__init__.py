@@ -1,3 +1,26 @@
-from .read import read_gpio_sensors
+from .read import read_gpio_sensors, make_reading, SENSORS
+from .scheduler import SensorScheduler, build_scheduler
+from .adaptive import AdaptiveSampler, SAMPLING_TYPE, sampling_message
 
-__all__ = ["read_gpio_sensors"]
+__all__ = [
+    "read_gpio_sensors",
+    "make_reading",
+    "SENSORS",
+    "SensorScheduler",
+    "build_scheduler",
+    "AdaptiveSampler",
+    "SAMPLING_TYPE",
+    "sampling_message",
+    "BlockSampler",
+    "BLOCK_SENSORS",
+    "build_block_sampler",
+]
+
+
+def __getattr__(name):
+    # Block sampling needs NumPy and a process pool, only load it when used
+    if name in ("BlockSampler", "BLOCK_SENSORS", "build_block_sampler"):
+        from . import block
+
+        return getattr(block, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
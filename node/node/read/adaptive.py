@@ -0,0 +1,216 @@
+import collections
+import json
+import math
+import time
+
+import pika
+from node.logger import ops_logger
+from node.metrics import REGISTRY
+from node.settings import CONFIG
+
+SAMPLING_TYPE = "sampling"
+
+PERIOD = REGISTRY.gauge(
+    "node_sample_period_seconds", "Current sampling period", ["sensor"]
+)
+PERIOD_CHANGES = REGISTRY.counter(
+    "node_sample_period_changes_total", "Sampling period changes", ["sensor"]
+)
+
+
+class ChannelActivity:
+    """How much one channel is moving, and the period that calls for.
+
+    A sample that moved more than ``step`` from the previous one, or an
+    EWMA standard deviation above ``step``, halves the period. Once the
+    channel has stayed within half a step for ``settle`` samples in a row
+    the period doubles. Both stop at the channel's bounds.
+    """
+
+    def __init__(self, step, min_period, max_period, period, alpha=0.2, settle=10):
+        if not 0 < min_period <= max_period:
+            raise ValueError(
+                f"Need 0 < min_period <= max_period, got {min_period}, {max_period}"
+            )
+        self.step = step
+        self.min_period = min_period
+        self.max_period = max_period
+        self.period = min(max(period, min_period), max_period)
+        self.alpha = alpha
+        self.settle = settle
+        self.last = None
+        self.mean = None
+        self.variance = 0.0
+        self.quiet = 0
+
+    def update(self, value):
+        """Feed one value, returns why the period changed or None."""
+        if self.last is None:
+            self.last = self.mean = value
+            return None
+        change = abs(value - self.last)
+        self.last = value
+        deviation = value - self.mean
+        self.mean += self.alpha * deviation
+        self.variance = (1 - self.alpha) * (
+            self.variance + self.alpha * deviation * deviation
+        )
+        spread = math.sqrt(self.variance)
+
+        if change > self.step or spread > self.step:
+            self.quiet = 0
+            if self.period > self.min_period:
+                self.period = max(self.min_period, self.period / 2)
+                return "active"
+        elif change < self.step / 2 and spread < self.step / 2:
+            self.quiet += 1
+            if self.quiet >= self.settle and self.period < self.max_period:
+                self.quiet = 0
+                self.period = min(self.max_period, self.period * 2)
+                return "steady"
+        else:
+            self.quiet = 0
+        return None
+
+
+class AdaptiveSampler:
+    """Adjust a ``SensorScheduler``'s periods to what the signals are doing.
+
+    Channels listed in ``channels`` (``{name: {"step", "min_period",
+    "max_period"}}``) are sampled faster while they move and slower while
+    they are steady, see ``ChannelActivity``. On top of that the period of
+    every scheduled channel is stretched up to ``adaptive_max_throttle``
+    times, in powers of two, while ``backlog()`` (the fraction of the
+    transmit capacity in use) is over ``adaptive_backlog_start``: never
+    beyond an adaptive channel's max_period, and from its configured period
+    for a fixed rate channel.
+
+    Every change is kept in ``history`` and returned by ``observe`` so it
+    can be published: readings of a channel are ``period`` seconds apart
+    from the change's ``timestamp`` on.
+    """
+
+    def __init__(self, scheduler, channels=None, backlog=None, config=None):
+        config = CONFIG if config is None else config
+        channels = config.get("adaptive_sampling", {}) if channels is None else channels
+        self.scheduler = scheduler
+        self.backlog = backlog
+        self.backlog_start = config.get("adaptive_backlog_start", 0.25)
+        self.max_throttle = config.get("adaptive_max_throttle", 8)
+        self.throttle = 1
+        self.history = collections.deque(maxlen=config.get("adaptive_history", 1000))
+        self.channels = {}
+        # Channels sampled at a fixed rate, only throttled, with their period
+        self.fixed = {
+            name: sensor.period
+            for name, sensor in scheduler.sensors.items()
+            if name not in channels
+        }
+        for name, bounds in channels.items():
+            sensor = scheduler.sensors.get(name)
+            if sensor is None:
+                ops_logger.warning("No sensor %s to sample adaptively", name)
+                continue
+            channel = ChannelActivity(
+                bounds["step"],
+                bounds.get("min_period", sensor.period),
+                bounds.get("max_period", sensor.period),
+                sensor.period,
+                config.get("adaptive_alpha", 0.2),
+                config.get("adaptive_settle", 10),
+            )
+            # Start within the bounds
+            scheduler.set_period(name, channel.period)
+            self.channels[name] = channel
+            PERIOD.labels(name).set(channel.period)
+
+    def periods(self):
+        """Current period of every scheduled channel."""
+        return {
+            name: self.scheduler.sensors[name].period
+            for name in (*self.channels, *self.fixed)
+        }
+
+    def stats(self):
+        return {
+            "throttle": self.throttle,
+            "periods": self.periods(),
+            "changes": len(self.history),
+        }
+
+    def _throttle(self):
+        load = self.backlog() if self.backlog is not None else 0.0
+        if load <= self.backlog_start:
+            # Only let go once the backlog has clearly drained, not the
+            # moment it dips under the threshold
+            if load > self.backlog_start / 2:
+                return self.throttle
+            return 1
+        fraction = min(1.0, (load - self.backlog_start) / (1 - self.backlog_start))
+        levels = max(1, math.ceil(math.log2(self.max_throttle)))
+        return min(self.max_throttle, 2 ** math.ceil(fraction * levels))
+
+    def observe(self, reading):
+        """Feed a reading, apply and return the period changes it calls for."""
+        reasons = {}
+        for name, value in (reading.get("payload") or {}).items():
+            channel = self.channels.get(name)
+            if channel is not None and type(value) in (int, float):
+                reason = channel.update(value)
+                if reason is not None:
+                    reasons[name] = reason
+        throttle = self._throttle()
+        if throttle != self.throttle:
+            self.throttle = throttle
+            reasons = {
+                **dict.fromkeys((*self.channels, *self.fixed), "backlog"),
+                **reasons,
+            }
+
+        changes = []
+        for name, reason in reasons.items():
+            channel = self.channels.get(name)
+            sensor = self.scheduler.sensors[name]
+            if channel is None:
+                period = self.fixed[name] * self.throttle
+            else:
+                period = min(channel.max_period, channel.period * self.throttle)
+            if math.isclose(period, sensor.period):
+                continue
+            change = {
+                "timestamp": reading.get("timestamp"),
+                "channel": name,
+                "period": period,
+                "previous": sensor.period,
+                "reason": reason,
+            }
+            self.scheduler.set_period(name, period)
+            self.history.append(change)
+            changes.append(change)
+            PERIOD.labels(name).set(period)
+            PERIOD_CHANGES.labels(name).inc()
+            ops_logger.info(
+                "Sampling %s every %gs (was %gs): %s",
+                name,
+                period,
+                change["previous"],
+                reason,
+            )
+        return changes
+
+
+def sampling_message(changes, periods, config=None):
+    """Period changes as a JSON message, ``(body, properties)``."""
+    config = CONFIG if config is None else config
+    body = json.dumps(
+        {
+            "node_id": config.get("node_id"),
+            "timestamp": time.time(),
+            "type": SAMPLING_TYPE,
+            "periods": periods,
+            "changes": changes,
+        }
+    )
+    return body, pika.BasicProperties(
+        content_type="application/json", type=SAMPLING_TYPE
+    )
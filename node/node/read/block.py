@@ -0,0 +1,271 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+import numpy as np
+import pika
+from node.logger import ops_logger
+from node.metrics import REGISTRY
+from node.process.features import (
+    BLOCK_CONTENT_TYPE,
+    BLOCK_TYPE,
+    FEATURES_TYPE,
+    FeatureExtractor,
+)
+from node.settings import CONFIG
+from .read import make_reading
+
+BLOCKS = REGISTRY.counter("node_blocks_total", "Sample blocks read", ["channel"])
+BLOCKS_DROPPED = REGISTRY.counter(
+    "node_blocks_dropped_total",
+    "Sample blocks dropped because feature extraction fell behind",
+    ["channel"],
+)
+FEATURE_SECONDS = REGISTRY.histogram(
+    "node_feature_seconds", "Time taken to extract the features of a block"
+)
+
+_rng = np.random.default_rng()
+
+
+# Like the scalar sensors these are simulated: a real driver would return
+# the block the ADC filled by DMA over the last size / rate seconds
+async def read_hydrophone(size, rate):
+    t = np.arange(size) / rate
+    return 0.5 * np.sin(2 * np.pi * 50 * t + _rng.uniform(0, 2 * np.pi)) + (
+        _rng.normal(0, 0.1, size)
+    )
+
+
+async def read_vibration(size, rate):
+    t = np.arange(size) / rate
+    return 0.2 * np.sin(2 * np.pi * 120 * t) + _rng.normal(0, 0.05, size)
+
+
+# Block channel -> async function returning its next block of samples
+BLOCK_SENSORS = {
+    "hydrophone": read_hydrophone,
+    "vibration": read_vibration,
+}
+
+
+class BlockChannel:
+    def __init__(self, name, read, rate, size):
+        self.name = name
+        self.read = read
+        self.rate = rate
+        self.size = size
+        self.duration = size / rate
+        self.slot = 0
+        self.blocks = 0
+        self.dropped = 0
+        self.missed = 0
+
+
+class BlockSampler:
+    """Read high rate channels a fixed-size block of samples at a time.
+
+    Blocks are due on a monotonic deadline grid, like the scalar sensors,
+    one block duration (``size / rate`` seconds) apart. Each block is
+    handed to a ``FeatureExtractor`` and only its features are emitted, as
+    a reading with ``"type": "features"`` stamped with the time of the
+    block's last sample and channels named ``<channel>_<feature>``. With
+    ``send_raw`` the compressed block itself is also passed to
+    ``await raw(body, properties)``.
+
+    At most ``max_pending`` blocks are processed at a time; blocks read
+    while extraction is that far behind are dropped and counted.
+
+    Features come out of the process pool after readings stamped later
+    have been taken, so they are held back, together with whatever
+    ``ordered(emit)`` passes on for the scalar sensors, until every block
+    that ends earlier is done. Readings then go out in timestamp order,
+    delayed by at most the extraction time and only while a block is in
+    flight.
+    """
+
+    def __init__(self, extractor, send_raw=None, max_pending=None, config=None):
+        config = CONFIG if config is None else config
+        self.extractor = extractor
+        self.node_id = config.get("node_id")
+        if send_raw is None:
+            send_raw = config.get("block_send_raw", False)
+        self.send_raw = send_raw
+        self.max_pending = max_pending or 2 * config.get("block_workers", 2)
+        self.channels = {}
+        self.pending = set()
+        # End stamps of the blocks being read or processed, and the readings
+        # waiting for them as (timestamp, sequence, reading, emit)
+        self.inflight = []
+        self.held = []
+        self._sequence = itertools.count()
+        self.origin = None
+        self.wall_origin = None
+
+    def register(self, name, read, rate, size):
+        if rate <= 0 or size < 2:
+            raise ValueError(f"Bad block channel {name}: rate {rate}, size {size}")
+        self.channels[name] = BlockChannel(name, read, rate, size)
+
+    def deadline(self, channel):
+        # A block is ready once its last sample has been taken
+        return self.origin + (channel.slot + 1) * channel.duration
+
+    def stats(self):
+        return {
+            name: {
+                "rate": channel.rate,
+                "size": channel.size,
+                "blocks": channel.blocks,
+                "dropped": channel.dropped,
+                "missed": channel.missed,
+            }
+            for name, channel in self.channels.items()
+        }
+
+    def ordered(self, emit):
+        """``emit`` for readings to keep in order with the features, readings
+        stamped after a block still in flight wait for its features."""
+
+        async def emit_in_order(reading):
+            if self.inflight and reading["timestamp"] > min(self.inflight):
+                self._hold(reading, emit)
+            else:
+                await emit(reading)
+
+        return emit_in_order
+
+    def _hold(self, reading, emit):
+        heapq.heappush(
+            self.held, (reading["timestamp"], next(self._sequence), reading, emit)
+        )
+
+    async def _done(self, end):
+        """The block ending at ``end`` is finished with, release the readings
+        no block in flight is earlier than."""
+        self.inflight.remove(end)
+        watermark = min(self.inflight, default=None)
+        while self.held and (watermark is None or self.held[0][0] <= watermark):
+            _, _, reading, emit = heapq.heappop(self.held)
+            await emit(reading)
+
+    async def run(self, emit, raw=None):
+        """Sample forever, awaiting ``emit(reading)`` for every block's
+        features and ``raw(body, properties)`` for the blocks themselves."""
+        if not self.channels:
+            raise RuntimeError("No block channels registered")
+        self.origin = time.monotonic()
+        self.wall_origin = time.time()
+        try:
+            while True:
+                await self.tick(emit, raw)
+        finally:
+            for task in self.pending:
+                task.cancel()
+            await asyncio.gather(*self.pending, return_exceptions=True)
+            # Nothing is coming to release the rest
+            self.inflight.clear()
+            while self.held:
+                _, _, reading, emit = heapq.heappop(self.held)
+                await emit(reading)
+
+    async def tick(self, emit, raw=None):
+        """Wait for the next block to be complete and start processing it."""
+        channel = min(self.channels.values(), key=self.deadline)
+        due_at = self.deadline(channel)
+        delay = due_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        end = self.wall_origin + (due_at - self.origin)
+        # From here on, readings stamped after this block wait for it
+        self.inflight.append(end)
+        try:
+            block = await channel.read(channel.size, channel.rate)
+        except Exception as e:
+            ops_logger.error("Error reading block from %s: %r", channel.name, e)
+            block = None
+        channel.slot += 1
+        behind = time.monotonic() - self.deadline(channel)
+        skipped = int(behind // channel.duration) if behind > 0 else 0
+        if skipped:
+            channel.slot += skipped
+            channel.missed += skipped
+            ops_logger.warning(
+                "Block channel %s fell behind, skipped %d blocks",
+                channel.name,
+                skipped,
+            )
+        if block is None:
+            await self._done(end)
+            return
+        channel.blocks += 1
+        BLOCKS.labels(channel.name).inc()
+        if len(self.pending) >= self.max_pending:
+            channel.dropped += 1
+            BLOCKS_DROPPED.labels(channel.name).inc()
+            ops_logger.warning("Feature extraction behind, dropped a block")
+            await self._done(end)
+            return
+        task = asyncio.create_task(self._process(channel, block, end, emit, raw))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def _process(self, channel, block, end, emit, raw):
+        header = None
+        if self.send_raw and raw is not None:
+            header = {
+                "node_id": self.node_id,
+                "channel": channel.name,
+                # Of the first sample, sample i was taken at timestamp + i / rate
+                "timestamp": end - (channel.size - 1) / channel.rate,
+                "rate": channel.rate,
+            }
+        started = time.monotonic()
+        try:
+            features, body = await self.extractor.extract(block, channel.rate, header)
+        except Exception as e:
+            ops_logger.error("Error extracting %s features: %r", channel.name, e)
+            await self._done(end)
+            return
+        FEATURE_SECONDS.observe(time.monotonic() - started)
+        reading = make_reading(
+            {f"{channel.name}_{name}": value for name, value in features.items()},
+            end,
+            type=FEATURES_TYPE,
+            channel=channel.name,
+            rate=channel.rate,
+            samples=channel.size,
+        )
+        self._hold(reading, emit)
+        await self._done(end)
+        if body is not None:
+            await raw(
+                body,
+                pika.BasicProperties(
+                    content_type=BLOCK_CONTENT_TYPE,
+                    content_encoding="zlib",
+                    type=BLOCK_TYPE,
+                ),
+            )
+
+
+def build_block_sampler(extractor=None, config=None):
+    """Sampler reading every configured block channel, or None if there are
+    none."""
+    config = CONFIG if config is None else config
+    channels = config.get("block_channels", {})
+    if not channels:
+        return None
+    extractor = FeatureExtractor(config=config) if extractor is None else extractor
+    sampler = BlockSampler(extractor, config=config)
+    for name, options in channels.items():
+        if name not in BLOCK_SENSORS:
+            raise ValueError(f"Unknown block channel: {name}")
+        sampler.register(
+            name,
+            BLOCK_SENSORS[name],
+            options.get("rate", 1000),
+            options.get("size", 1024),
+        )
+    return sampler
@@ -1,25 +1,42 @@
 import random
 import asyncio
-import json
 import time
 from node.logger import sensor_logger
+from node.reading import Reading
 from node.settings import CONFIG
 
 
-# The below function is just for testing and passing random values
-async def read_gpio_sensors():
+# The below functions are just for testing and passing random values
+async def read_temperature():
     # Simulate reading a sensor
-    temp = random.uniform(20, 100)
-    ph = random.uniform(6.5, 8.5)
-    data = {
-        "node_id": CONFIG["node_id"],
-        # "latitude": CONFIG["latitude"],
-        # "longitude": CONFIG["longitude"],
-        # "temperature": temp,
-        # "ph": ph
-        "timestamp": time.time(),
-        "payload": {"temperature": temp, "ph": ph},
-    }
-
-    sensor_logger.info(json.dumps(data))
+    return random.uniform(20, 100)
+
+
+async def read_ph():
+    return random.uniform(6.5, 8.5)
+
+
+# Payload channel -> async function returning its current value
+SENSORS = {
+    "temperature": read_temperature,
+    "ph": read_ph,
+}
+
+
+def make_reading(payload, timestamp=None, **extra):
+    """A ``Reading`` of this node, ``extra`` keys (e.g. ``type``) included."""
+    return Reading(
+        CONFIG["node_id"],
+        time.time() if timestamp is None else timestamp,
+        payload,
+        extra or None,
+    )
+
+
+async def read_gpio_sensors():
+    """Read every sensor once, concurrently."""
+    values = await asyncio.gather(*(read() for read in SENSORS.values()))
+    data = make_reading(dict(zip(SENSORS, values)))
+    # Encoded to JSON on the log writer thread
+    sensor_logger.info(data)
     return data
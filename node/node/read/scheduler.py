@@ -0,0 +1,178 @@
+import asyncio
+import time
+
+from node.logger import ops_logger
+from node.metrics import REGISTRY
+from node.settings import CONFIG
+from .read import SENSORS, make_reading
+
+READS = REGISTRY.counter("node_reads_total", "Sensor reads", ["sensor"])
+READ_ERRORS = REGISTRY.counter(
+    "node_read_errors_total", "Sensor reads that raised", ["sensor"]
+)
+MISSED = REGISTRY.counter(
+    "node_samples_missed_total", "Sample slots skipped after overruns", ["sensor"]
+)
+READ_SECONDS = REGISTRY.histogram(
+    "node_read_seconds", "Time taken by one sensor read", ["sensor"]
+)
+LATENESS_SECONDS = REGISTRY.histogram(
+    "node_sample_lateness_seconds", "How late after its deadline a tick started"
+)
+
+
+async def _timed(sensor):
+    started = time.perf_counter()
+    try:
+        return await sensor.read()
+    finally:
+        sensor.read_seconds.observe(time.perf_counter() - started)
+
+
+class ScheduledSensor:
+    def __init__(self, name, read, period):
+        self.name = name
+        self.read = read
+        self.period = period
+        # Deadlines are origin + slot * period, never accumulated, so
+        # rounding errors and late reads cannot drift the grid. The origin
+        # moves when the period changes.
+        self.origin = None
+        self.slot = 0
+        self.samples = 0
+        self.errors = 0
+        self.overruns = 0
+        self.missed = 0
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+        # Looked up once, labels() builds a key on every call
+        self.reads = READS.labels(name)
+        self.read_seconds = READ_SECONDS.labels(name)
+
+    def stats(self):
+        return {
+            "period": self.period,
+            "samples": self.samples,
+            "errors": self.errors,
+            "overruns": self.overruns,
+            "missed": self.missed,
+            "jitter_mean": self.jitter_total / self.samples if self.samples else 0.0,
+            "jitter_max": self.jitter_max,
+        }
+
+
+class SensorScheduler:
+    """Sample each sensor on its own period against a monotonic deadline grid.
+
+    All sensors share one origin, so sensors whose periods line up are due
+    at the same instant. Those are read concurrently with ``asyncio.gather``
+    and merged into a single reading, stamped with the nominal grid time
+    rather than whenever the read happened to finish. A tick that overruns
+    the next deadline makes that sample late; whole periods that passed
+    are skipped, not made up in a burst. ``set_period`` changes a sensor's
+    period while running, from its last deadline on.
+
+    ``stats()`` reports per sensor how late reads started (jitter), how
+    often a tick overran and how many slots were missed.
+    """
+
+    def __init__(self):
+        self.sensors = {}
+        self.origin = None
+        self.wall_origin = None
+
+    def register(self, name, read, period):
+        if period <= 0:
+            raise ValueError(f"Sensor period must be positive, got {period}")
+        self.sensors[name] = ScheduledSensor(name, read, period)
+
+    def deadline(self, sensor):
+        return sensor.origin + sensor.slot * sensor.period
+
+    def set_period(self, name, period):
+        """Sample ``name`` every ``period`` seconds from its last deadline."""
+        if period <= 0:
+            raise ValueError(f"Sensor period must be positive, got {period}")
+        sensor = self.sensors[name]
+        if sensor.origin is not None and sensor.slot:
+            sensor.origin = self.deadline(sensor) - sensor.period
+            sensor.slot = 1
+        sensor.period = period
+
+    def stats(self):
+        return {name: sensor.stats() for name, sensor in self.sensors.items()}
+
+    async def run(self, emit):
+        """Sample forever, awaiting ``emit(reading)`` for every reading."""
+        if not self.sensors:
+            raise RuntimeError("No sensors registered")
+        self.origin = time.monotonic()
+        self.wall_origin = time.time()
+        for sensor in self.sensors.values():
+            sensor.origin = self.origin
+        while True:
+            await emit(await self.tick())
+
+    async def tick(self):
+        """Wait for the next deadline and read every sensor due at it."""
+        due_at = min(self.deadline(sensor) for sensor in self.sensors.values())
+        delay = due_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        started = time.monotonic()
+        # Deadlines computed from different periods can differ by a rounding
+        # error while meaning the same instant
+        due = [
+            sensor
+            for sensor in self.sensors.values()
+            if self.deadline(sensor) <= due_at + 1e-6
+        ]
+        values = await asyncio.gather(
+            *(_timed(sensor) for sensor in due), return_exceptions=True
+        )
+        LATENESS_SECONDS.observe(max(0.0, started - due_at))
+
+        payload = {}
+        for sensor, value in zip(due, values):
+            lateness = started - self.deadline(sensor)
+            sensor.jitter_total += lateness
+            sensor.jitter_max = max(sensor.jitter_max, lateness)
+            sensor.samples += 1
+            sensor.reads.inc()
+            if isinstance(value, Exception):
+                sensor.errors += 1
+                READ_ERRORS.labels(sensor.name).inc()
+                ops_logger.error("Error reading sensor %s: %r", sensor.name, value)
+            else:
+                payload[sensor.name] = value
+            sensor.slot += 1
+
+        finished = time.monotonic()
+        for sensor in due:
+            behind = finished - self.deadline(sensor)
+            if behind > 0:
+                sensor.overruns += 1
+                skipped = int(behind // sensor.period)
+                if skipped:
+                    sensor.slot += skipped
+                    sensor.missed += skipped
+                    MISSED.labels(sensor.name).inc(skipped)
+                    ops_logger.warning(
+                        "Sensor %s overran its period, skipped %d samples",
+                        sensor.name,
+                        skipped,
+                    )
+
+        return make_reading(payload, self.wall_origin + (due_at - self.origin))
+
+
+def build_scheduler(config=None):
+    """Scheduler sampling every known sensor at its configured period."""
+    config = CONFIG if config is None else config
+    periods = config.get("sensor_periods", {})
+    default = config.get("sample_period", 1.0)
+    scheduler = SensorScheduler()
+    for name, read in SENSORS.items():
+        scheduler.register(name, read, periods.get(name, default))
+    return scheduler
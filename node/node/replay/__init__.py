@@ -0,0 +1,3 @@
+from .replay import LogReader, Watermark, Replayer, log_files, paced
+
+__all__ = ["LogReader", "Watermark", "Replayer", "log_files", "paced"]
@@ -0,0 +1,93 @@
+import argparse
+import json
+import sys
+
+from node.settings import CONFIG
+from node.timespec import parse_time
+from node.transmit import RabbitMQPublisher, get_serializer
+from .replay import LogReader, Replayer, Watermark, log_files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="replay",
+        description="Re-publish the readings in the node's sensor logs",
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=["logs/sensor"],
+        help="log files or directories (default logs/sensor)",
+    )
+    parser.add_argument("--start", help="only readings from this time on")
+    parser.add_argument("--end", help="only readings before this time")
+    pace = parser.add_mutually_exclusive_group()
+    pace.add_argument("--rate", type=float, help="max readings per second")
+    pace.add_argument("--speed", type=float, help="replay at this many times real time")
+    parser.add_argument("--batch", type=int, help="readings per message")
+    parser.add_argument(
+        "--compression", choices=("zlib", "lzma"), help="compress every batch"
+    )
+    parser.add_argument(
+        "--watermark",
+        default=CONFIG.get("replay_watermark", "logs/replay/watermark.json"),
+        help=(
+            "file recording what earlier replays sent; readings published "
+            "live are not in it, use --start to skip those"
+        ),
+    )
+    parser.add_argument(
+        "--no-watermark",
+        action="store_true",
+        help="send everything, without reading or updating the watermark",
+    )
+    parser.add_argument(
+        "--no-confirm",
+        action="store_true",
+        help="do not wait for broker confirms (faster, may lose a batch)",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only count what would be sent"
+    )
+    args = parser.parse_args(argv)
+
+    files = [name for path in args.paths for name in log_files(path)]
+    reader = LogReader(
+        files,
+        parse_time(args.start) if args.start else None,
+        parse_time(args.end) if args.end else None,
+    )
+    watermark = Watermark(
+        None if args.no_watermark else args.watermark,
+        CONFIG.get("replay_reorder_seconds", 60),
+    )
+    config = CONFIG
+    if args.compression:
+        config = {**CONFIG, "serializer_compression": args.compression}
+    publisher = None
+    if not args.dry_run:
+        publisher = RabbitMQPublisher(confirm_delivery=not args.no_confirm)
+    replayer = Replayer(
+        publisher,
+        watermark,
+        get_serializer(config),
+        batch_readings=args.batch,
+        config=config,
+    )
+    try:
+        stats = replayer.run(reader, args.rate, args.speed)
+    finally:
+        if publisher is not None:
+            publisher.close()
+    report = {
+        "files": len(files),
+        "lines": reader.lines,
+        "malformed": reader.malformed,
+        **stats,
+    }
+    sys.stdout.write(json.dumps(report, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
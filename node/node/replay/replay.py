@@ -0,0 +1,246 @@
+import collections
+import glob
+import json
+import math
+import os
+import time
+
+from node.settings import CONFIG
+from node.transmit import Batcher, get_serializer
+
+LOG_NAME = "sensor_data.log"
+
+
+def log_files(path):
+    """Sensor log files under ``path``, oldest first.
+
+    A directory yields its rotated logs (``sensor_data.log.<date>``, which
+    sort by date) and then the current one; a file is returned as is.
+    """
+    if os.path.isfile(path):
+        return [path]
+    current = os.path.join(path, LOG_NAME)
+    files = sorted(glob.glob(glob.escape(current) + ".*"))
+    if os.path.exists(current):
+        files.append(current)
+    return files
+
+
+class LogReader:
+    """Stream the readings in sensor log files, one line at a time.
+
+    Lines look like ``<asctime> - {json reading}``; other messages, such as
+    the logger's start up line, are skipped and lines that do not parse
+    (one cut short by a power loss, say) are counted as ``malformed``.
+    """
+
+    def __init__(self, paths, start=None, end=None):
+        self.paths = list(paths)
+        self.start = -math.inf if start is None else start
+        self.end = math.inf if end is None else end
+        self.lines = 0
+        self.malformed = 0
+
+    def __iter__(self):
+        for path in self.paths:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    self.lines += 1
+                    message = line.partition(" - ")[2]
+                    if not message.startswith("{"):
+                        continue
+                    try:
+                        reading = json.loads(message)
+                        timestamp = reading["timestamp"]
+                    except (ValueError, TypeError, KeyError):
+                        self.malformed += 1
+                        continue
+                    if type(timestamp) not in (int, float):
+                        self.malformed += 1
+                        continue
+                    if self.start <= timestamp < self.end:
+                        yield reading
+
+
+class Watermark:
+    """Which readings have been published, per node, in constant memory.
+
+    Keeps the newest published timestamp of every node, persisted to
+    ``path`` so a later replay skips everything at or before it. Readings
+    logged out of order by up to ``reorder`` seconds are still told apart
+    by ``(node_id, timestamp)``; older ones are treated as already sent.
+
+    ``record`` marks a reading as taken care of in this run, ``confirm``
+    once the broker has it; only confirmed readings are saved.
+
+    Only earlier replays are known, readings the node published live are
+    not, so replaying a period the broker already received sends those
+    again.
+    """
+
+    def __init__(self, path=None, reorder=60.0):
+        self.path = path
+        self.reorder = reorder
+        self.high = {}
+        # Loaded from disk, everything at or before these was sent before
+        self.floor = {}
+        self.recent = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.floor = json.load(f)
+            self.high = dict(self.floor)
+        self.confirmed = dict(self.floor)
+
+    def seen(self, node_id, timestamp):
+        if timestamp <= self.floor.get(node_id, -math.inf):
+            return True
+        high = self.high.get(node_id)
+        if high is None or timestamp > high:
+            return False
+        if timestamp <= high - self.reorder:
+            return True
+        return timestamp in self.recent[node_id][1]
+
+    def record(self, node_id, timestamp):
+        order, keys = self.recent.setdefault(node_id, (collections.deque(), set()))
+        order.append(timestamp)
+        keys.add(timestamp)
+        high = max(timestamp, self.high.get(node_id, -math.inf))
+        self.high[node_id] = high
+        while order and order[0] <= high - self.reorder:
+            keys.discard(order.popleft())
+
+    def confirm(self, node_id, timestamp):
+        self.confirmed[node_id] = max(timestamp, self.confirmed.get(node_id, -math.inf))
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.confirmed, f)
+        os.replace(temporary, self.path)
+
+
+def paced(readings, rate=None, speed=None):
+    """Yield ``readings`` at most ``rate`` per second, or ``speed`` times as
+    fast as they were originally taken."""
+    if not rate and not speed:
+        yield from readings
+        return
+    started = time.monotonic()
+    first = None
+    for count, reading in enumerate(readings):
+        if rate:
+            due = started + count / rate
+        else:
+            if first is None:
+                first = reading["timestamp"]
+            due = started + (reading["timestamp"] - first) / speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        yield reading
+
+
+class Replayer:
+    """Publish logged readings in large batches over one connection.
+
+    Duplicates are dropped against the ``Watermark``, which is saved after
+    every batch the broker accepted, so an interrupted replay resumes
+    where it stopped. A failed publish is retried with the publisher's
+    backoff, giving up after ``max_failures`` failures in a row. Without a
+    publisher batches are only counted, a dry run.
+    """
+
+    def __init__(
+        self,
+        publisher,
+        watermark=None,
+        serializer=None,
+        batch_readings=None,
+        batch_bytes=None,
+        max_failures=10,
+        config=None,
+    ):
+        config = CONFIG if config is None else config
+        self.publisher = publisher
+        self.watermark = Watermark() if watermark is None else watermark
+        self.batcher = Batcher(
+            max_readings=batch_readings or config.get("replay_batch_readings", 1000),
+            max_bytes=batch_bytes or config.get("replay_batch_bytes", 1024 * 1024),
+            serializer=serializer or get_serializer(config),
+            config=config,
+        )
+        self.max_failures = max_failures
+        self.readings = 0
+        self.duplicates = 0
+        self.published = 0
+        self.batches = 0
+        self.bytes = 0
+
+    def run(self, readings, rate=None, speed=None):
+        """Publish every new reading, returns the stats."""
+        started = time.monotonic()
+        # (node_id, timestamp) of the readings in the batcher, in order
+        pending = []
+        for reading in paced(self._new(readings), rate, speed):
+            key = (reading.get("node_id"), reading["timestamp"])
+            self.watermark.record(*key)
+            pending.append(key)
+            ready = self.batcher.add(reading)
+            if ready:
+                for message in ready:
+                    self._send(message)
+                # The reading just added may still be waiting in the batcher
+                sent = len(pending) - len(self.batcher)
+                self._commit(pending[:sent])
+                del pending[:sent]
+        if len(self.batcher):
+            self._send(self.batcher.flush())
+        self._commit(pending)
+        return self.stats(time.monotonic() - started)
+
+    def stats(self, seconds=None):
+        stats = {
+            "readings": self.readings,
+            "duplicates": self.duplicates,
+            "published": self.published,
+            "batches": self.batches,
+            "bytes": self.bytes,
+        }
+        if seconds is not None:
+            stats["seconds"] = round(seconds, 3)
+            stats["readings_per_second"] = round(self.published / max(seconds, 1e-9))
+        return stats
+
+    def _new(self, readings):
+        for reading in readings:
+            self.readings += 1
+            if self.watermark.seen(reading.get("node_id"), reading["timestamp"]):
+                self.duplicates += 1
+                continue
+            yield reading
+
+    def _send(self, message):
+        body, properties = message
+        failures = 0
+        while self.publisher is not None and not self.publisher.publish_body(
+            body, properties
+        ):
+            failures += 1
+            if failures >= self.max_failures:
+                raise RuntimeError(f"Giving up after {failures} failed publishes")
+            time.sleep(max(0.1, self.publisher.next_attempt - time.monotonic()))
+        self.batches += 1
+        self.bytes += len(body)
+
+    def _commit(self, sent):
+        self.published += len(sent)
+        if self.publisher is not None:
+            for key in sent:
+                self.watermark.confirm(*key)
+            self.watermark.save()
@@ -2,10 +2,177 @@ CONFIG = {
     "node_id": "madiwala_01",
     "latitude": 12.8944,
     "longitude": 77.6205,
+    # Part of the routing key, must not contain dots
+    "region": "bengaluru",
     "rabbitmq_host": "localhost",
     "rabbitmq_port": 5672,
     "rabbitmq_queue": "node_data",
     "rabbitmq_user": "guest",
     "rabbitmq_password": "guest",
-    "gui_enabled": True,
+    # Brokers to publish to, each {"host", "port"} plus optionally "priority"
+    # (lowest first), "user" and "password"; empty means rabbitmq_host. With
+    # "priority" selection the first healthy broker is used, with "hash"
+    # nodes are spread over them by a consistent hash of node_id. A failed
+    # broker is skipped for rabbitmq_failback_interval seconds, then the
+    # node moves back to it
+    "rabbitmq_brokers": [],
+    "rabbitmq_broker_selection": "priority",
+    "rabbitmq_failback_interval": 300,
+    # Publish to this topic exchange rather than straight to rabbitmq_queue
+    # (which is bound to it with "#"), routed by rabbitmq_routing_key filled
+    # in with {region}, {node_id} and {metric}: readings, metrics or blocks
+    "rabbitmq_exchange": "",
+    "rabbitmq_routing_key": "{region}.{node_id}.{metric}",
+    # Wait for broker acks on every publish (slower, but no silent loss)
+    "rabbitmq_confirm_delivery": False,
+    # Jittered exponential backoff between reconnect attempts, in seconds
+    "rabbitmq_reconnect_initial_delay": 1.0,
+    "rabbitmq_reconnect_max_delay": 60.0,
+    # Seconds between samples, per sensor channel in sensor_periods
+    "sample_period": 1.0,
+    "sensor_periods": {"temperature": 1.0, "ph": 1.0},
+    # Adaptive sampling: channel -> {"step", "min_period", "max_period"}, e.g.
+    # {"temperature": {"step": 0.2, "min_period": 0.25, "max_period": 30}}.
+    # A channel moving more than step per sample, or with an EWMA (weight
+    # adaptive_alpha) standard deviation above it, is sampled twice as often;
+    # one within half a step for adaptive_settle samples half as often.
+    # All periods, fixed rate channels' included, stretch up to
+    # adaptive_max_throttle times while the transmit queue is over
+    # adaptive_backlog_start full, or the outbox holds that share of
+    # adaptive_outbox_backlog messages. Every change is published
+    # as a "sampling" message; the last adaptive_history are kept in memory
+    "adaptive_sampling": {},
+    "adaptive_alpha": 0.2,
+    "adaptive_settle": 10,
+    "adaptive_backlog_start": 0.25,
+    "adaptive_outbox_backlog": 10000,
+    "adaptive_max_throttle": 8,
+    "adaptive_history": 1000,
+    # High rate channels read a block at a time, e.g.
+    # {"hydrophone": {"rate": 1000, "size": 1024}}; only each block's features
+    # (mean, RMS, peak, peak frequency and the power in every block_bands Hz
+    # band) are sent, computed by block_workers processes, plus the
+    # compressed raw block with block_send_raw
+    "block_channels": {},
+    "block_bands": [[0, 10], [10, 100], [100, 500]],
+    "block_workers": 2,
+    "block_send_raw": False,
+    # Send per-window summaries (count/min/max/mean/std/percentiles) of every
+    # channel instead of raw readings, or alongside them with aggregate_send_raw
+    "aggregate_enabled": False,
+    "aggregate_interval": 60,
+    "aggregate_percentiles": [50, 90],
+    # Values kept per channel and window, statistics of busier windows cover
+    # the most recent this many
+    "aggregate_capacity": 4096,
+    "aggregate_send_raw": False,
+    # Report by exception: channel -> smallest change worth sending, e.g.
+    # {"temperature": 0.1, "ph": 0.02}; unchanged channels are still sent
+    # every deadband_heartbeat seconds
+    "deadband": {},
+    "deadband_heartbeat": 300,
+    # Flag readings more than anomaly_threshold EWMA standard deviations
+    # from the mean and send them immediately, bypassing deadband and batching
+    "anomaly_enabled": False,
+    "anomaly_alpha": 0.05,
+    "anomaly_threshold": 4.0,
+    "anomaly_warmup": 30,
+    # Wire format: "json" or "binary" (compact, float32 values unless
+    # serializer_float64), optionally compressed with "zlib" or "lzma"
+    "serializer": "json",
+    "serializer_compression": None,
+    "serializer_compress_min_bytes": 256,
+    "serializer_float64": False,
+    # Send readings in batches, flushed at whichever threshold is hit first
+    "batch_enabled": False,
+    "batch_max_readings": 50,
+    "batch_max_bytes": 64 * 1024,
+    "batch_max_delay_ms": 5000,
+    # Write every message to a disk outbox first and publish it from there
+    "outbox_enabled": True,
+    "outbox_path": "logs/outbox/outbox.db",
+    "outbox_max_bytes": 256 * 1024 * 1024,
+    # "always", "normal" (fsync on checkpoints) or "never"
+    "outbox_fsync": "normal",
+    # Messages per replay chunk, and max messages per second while a backlog
+    # is being replayed (0 = unlimited)
+    "outbox_replay_chunk": 500,
+    "outbox_replay_rate": 200,
+    # Times a message the broker rejects is tried before it is dropped
+    "outbox_max_rejections": 3,
+    # Messages waiting for the transmit thread, and what to do when full:
+    # "drop-oldest", "block" (slows sampling down) or "spill" (to the outbox)
+    "transmit_queue_size": 1000,
+    "transmit_backpressure": "drop-oldest",
+    "transmit_shutdown_timeout": 5.0,
+    # Readings are fanned out to each subscriber through a bounded queue;
+    # when one is full its policy applies: "block" (slows sampling down),
+    # "drop-oldest" or "drop-newest". Unlisted subscribers drop the oldest
+    "bus_queue_size": 1000,
+    "bus_policies": {
+        "transmit": "block",
+        "sensor_log": "block",
+        "history": "block",
+        "aggregate": "block",
+        "query": "block",
+        "gui": "drop-oldest",
+    },
+    # `poetry run replay` re-publishes the sensor logs after an outage, in
+    # batches of up to replay_batch_readings readings or replay_batch_bytes;
+    # what was sent is kept in replay_watermark so no reading goes out twice
+    "replay_batch_readings": 1000,
+    "replay_batch_bytes": 1024 * 1024,
+    "replay_watermark": "logs/replay/watermark.json",
+    # Readings logged out of order by up to this many seconds are still sent
+    "replay_reorder_seconds": 60,
+    # Columnar sensor history, one segment directory per history_segment_seconds,
+    # query it with `poetry run history`. Off by default, it loads NumPy at
+    # boot and writes from the event loop
+    "history_enabled": False,
+    "history_path": "logs/history",
+    "history_segment_seconds": 86400,
+    "history_flush_rows": 60,
+    # Local HTTP/JSON query API on http://<node>:query_port/ (/latest, /range
+    # and /aggregate), answered from the last query_capacity readings held in
+    # memory; ranges are downsampled to at most query_max_points points
+    "query_enabled": False,
+    "query_host": "0.0.0.0",
+    "query_port": 9109,
+    "query_capacity": 21600,
+    "query_max_points": 1000,
+    "query_downsample": "lttb",
+    # Log levels of the console, ops log and sensor log; per-message lines
+    # are logged at INFO, raise these to WARNING to silence them
+    "log_level": "INFO",
+    "ops_log_level": "INFO",
+    "sensor_log_level": "INFO",
+    # Records written per batch by the background log writer
+    "log_batch_size": 256,
+    # Prometheus metrics on http://<node>:metrics_port/metrics, and/or a
+    # snapshot published to RabbitMQ every metrics_publish_interval seconds
+    # (0 = never)
+    "metrics_enabled": False,
+    "metrics_host": "0.0.0.0",
+    "metrics_port": 9108,
+    "metrics_publish_interval": 0,
+    # Profiling switched on at runtime with SIGUSR1 (CPU), SIGUSR2 (memory)
+    # or commands on profile_socket, e.g. `echo "cpu start" | nc -U ...`;
+    # reports go to profile_path, kept under profile_max_bytes in total
+    "profiling_enabled": False,
+    "profile_socket": "logs/profile.sock",
+    "profile_path": "logs/profiles",
+    "profile_max_bytes": 20 * 1024 * 1024,
+    "profile_interval": 0.01,
+    "profile_top": 50,
+    # Seconds the event loop may be blocked before the loop monitor reports it
+    "profile_slow_callback": 0.1,
+    # Headless by default, the GUI and matplotlib are only loaded when enabled
+    "gui_enabled": False,
+    # Run the GUI in its own process, reading the last gui_buffer_size
+    # readings from shared memory, instead of a thread of the node
+    "gui_process": False,
+    "gui_buffer_size": 4096,
+    # Points per plotted line, history is downsampled with "lttb" or "minmax"
+    "gui_plot_points": 500,
+    "gui_downsample": "lttb",
 }
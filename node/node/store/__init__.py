@@ -0,0 +1,3 @@
+from .store import HistoryWriter, HistoryStore
+
+__all__ = ["HistoryWriter", "HistoryStore"]
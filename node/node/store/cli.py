@@ -0,0 +1,62 @@
+import argparse
+import csv
+import json
+import sys
+import time
+
+import numpy as np
+from node.timespec import parse_duration, parse_time
+from .store import HistoryStore, TIMESTAMP
+
+
+def _rows(columns):
+    names = list(columns)
+    for row in zip(*(columns[name] for name in names)):
+        yield dict(zip(names, (None if np.isnan(v) else float(v) for v in row)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="history", description="Query the node's sensor history store"
+    )
+    parser.add_argument("--path", help="history directory (default from settings)")
+    parser.add_argument("--start", default="1d", help="start time (default 1d ago)")
+    parser.add_argument("--end", help="end time (default now)")
+    parser.add_argument(
+        "--channel",
+        action="append",
+        dest="channels",
+        help="channel to return, may be repeated (default all)",
+    )
+    parser.add_argument(
+        "--window", help="aggregate per window, e.g. 60, 15m or 1h, instead of raw"
+    )
+    parser.add_argument("--format", choices=("json", "csv"), default="json")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.path)
+    start = parse_time(args.start)
+    end = parse_time(args.end) if args.end else time.time()
+
+    if args.window:
+        result = store.aggregate(start, end, parse_duration(args.window), args.channels)
+        columns = {"window_start": result.pop("window_start")}
+        for name, stats in result.items():
+            for stat, values in stats.items():
+                columns[f"{name}_{stat}"] = values
+    else:
+        columns = store.range(start, end, args.channels)
+        columns = {TIMESTAMP: columns.pop(TIMESTAMP), **columns}
+
+    if args.format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=list(columns))
+        writer.writeheader()
+        writer.writerows(_rows(columns))
+    else:
+        for row in _rows(columns):
+            sys.stdout.write(json.dumps(row) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+import math
+import os
+
+import numpy as np
+from node.logger import ops_logger
+from node.settings import CONFIG
+
+TIMESTAMP = "timestamp"
+COLUMN_SUFFIX = ".f8"
+INDEX_FILE = "_index.f8"
+# One index entry per this many rows of a segment
+INDEX_STRIDE = 4096
+
+
+def _segment_name(start):
+    return f"seg-{int(start):012d}"
+
+
+def _segment_start(name):
+    return int(name.split("-", 1)[1])
+
+
+class HistoryWriter:
+    """Append readings to columnar, fixed-width segment files.
+
+    Each segment covers ``segment_seconds`` of time and is a directory with
+    one little-endian float64 file per column (``timestamp.f8`` plus one per
+    payload channel), all appended in lockstep so row ``i`` of every column
+    belongs to the same reading. A channel missing from a reading is stored
+    as NaN. ``_index.f8`` keeps every ``INDEX_STRIDE``-th timestamp so a
+    query finds its rows with two binary searches instead of a scan.
+    Timestamps must not go backwards within a segment; such readings are
+    dropped.
+    """
+
+    def __init__(self, path=None, segment_seconds=None, flush_rows=None, config=None):
+        config = CONFIG if config is None else config
+        self.path = path or config.get("history_path", "logs/history")
+        self.segment_seconds = segment_seconds or config.get(
+            "history_segment_seconds", 86400
+        )
+        self.flush_rows = flush_rows or config.get("history_flush_rows", 60)
+        os.makedirs(self.path, exist_ok=True)
+
+        self.segment = None
+        self.files = {}
+        self.rows = 0
+        self.last_timestamp = -math.inf
+        self.pending = 0
+        self.dropped = 0
+
+    def append(self, reading):
+        timestamp = reading.get("timestamp")
+        payload = reading.get("payload") or {}
+        if not isinstance(timestamp, (int, float)):
+            return False
+
+        start = timestamp // self.segment_seconds * self.segment_seconds
+        if start != self.segment:
+            self._open_segment(start)
+        if timestamp < self.last_timestamp:
+            self.dropped += 1
+            ops_logger.warning(
+                "History timestamp went backwards, dropped %d readings", self.dropped
+            )
+            return False
+
+        for name, value in payload.items():
+            if name not in self.files and isinstance(value, (int, float)):
+                self._add_column(name)
+        for name, column in self.files.items():
+            if name == TIMESTAMP:
+                value = timestamp
+            else:
+                value = payload.get(name)
+                if not isinstance(value, (int, float)):
+                    value = math.nan
+            column.write(np.float64(value).tobytes())
+
+        if self.rows % INDEX_STRIDE == 0:
+            self.index.write(np.float64(timestamp).tobytes())
+        self.rows += 1
+        self.last_timestamp = timestamp
+        self.pending += 1
+        if self.pending >= self.flush_rows:
+            self.flush()
+        return True
+
+    def flush(self):
+        for column in self.files.values():
+            column.flush()
+        if self.segment is not None:
+            self.index.flush()
+        self.pending = 0
+
+    def close(self):
+        if self.segment is not None:
+            self.flush()
+            for column in self.files.values():
+                column.close()
+            self.index.close()
+        self.files = {}
+        self.segment = None
+
+    def _open_segment(self, start):
+        self.close()
+        directory = os.path.join(self.path, _segment_name(start))
+        os.makedirs(directory, exist_ok=True)
+        self.segment = start
+        self.directory = directory
+
+        # Reopening after a restart or crash, trim columns to the rows
+        # every column has
+        names = [
+            entry[: -len(COLUMN_SUFFIX)]
+            for entry in os.listdir(directory)
+            if entry.endswith(COLUMN_SUFFIX) and entry != INDEX_FILE
+        ]
+        rows = min(
+            (os.path.getsize(self._column_path(name)) // 8 for name in names),
+            default=0,
+        )
+        for name in names:
+            with open(self._column_path(name), "r+b") as f:
+                f.truncate(rows * 8)
+        index_path = os.path.join(directory, INDEX_FILE)
+        with open(index_path, "a+b") as f:
+            f.truncate(-(-rows // INDEX_STRIDE) * 8)
+
+        self.rows = rows
+        self.last_timestamp = -math.inf
+        if rows:
+            with open(self._column_path(TIMESTAMP), "rb") as f:
+                f.seek((rows - 1) * 8)
+                self.last_timestamp = float(np.frombuffer(f.read(8), "<f8")[0])
+        self.files = {name: open(self._column_path(name), "ab") for name in names}
+        if TIMESTAMP not in self.files:
+            self.files[TIMESTAMP] = open(self._column_path(TIMESTAMP), "ab")
+        self.index = open(index_path, "ab")
+
+    def _add_column(self, name):
+        column = open(self._column_path(name), "ab")
+        # Earlier rows of this segment did not have the channel
+        column.write(np.full(self.rows, np.nan, "<f8").tobytes())
+        self.files[name] = column
+
+    def _column_path(self, name):
+        return os.path.join(self.directory, name + COLUMN_SUFFIX)
+
+
+class HistoryStore:
+    """Read side of the history store.
+
+    Columns are memory-mapped, so a query only touches the pages holding
+    the rows it returns.
+    """
+
+    def __init__(self, path=None, config=None):
+        config = CONFIG if config is None else config
+        self.path = path or config.get("history_path", "logs/history")
+
+    def segments(self):
+        """Start times of the stored segments, oldest first."""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            _segment_start(entry)
+            for entry in os.listdir(self.path)
+            if entry.startswith("seg-")
+        )
+
+    def channels(self):
+        names = set()
+        for start in self.segments():
+            names.update(self._segment_columns(start))
+        names.discard(TIMESTAMP)
+        return sorted(names)
+
+    def range(self, start, end, channels=None):
+        """Readings with ``start <= timestamp < end`` as a dict of arrays.
+
+        Always includes ``timestamp``; ``channels`` defaults to every stored
+        channel. Channels a segment does not have come back as NaN.
+        """
+        channels = self.channels() if channels is None else list(channels)
+        parts = [
+            self._segment_range(segment, start, end, channels)
+            for segment in self._overlapping(start, end)
+        ]
+        parts = [part for part in parts if len(part[TIMESTAMP])]
+        if len(parts) == 1:
+            return parts[0]
+        return {
+            name: (
+                np.concatenate([part[name] for part in parts]) if parts else np.empty(0)
+            )
+            for name in [TIMESTAMP] + channels
+        }
+
+    def aggregate(self, start, end, window, channels=None):
+        """Per-window statistics of every channel between start and end.
+
+        Returns ``{"window_start": array, channel: {"count", "min", "max",
+        "mean"}}``; empty windows are left out, NaN samples are ignored.
+        """
+        data = self.range(start, end, channels)
+        timestamps = data.pop(TIMESTAMP)
+        if not len(timestamps):
+            return {"window_start": np.empty(0)} | {
+                name: {stat: np.empty(0) for stat in ("count", "min", "max", "mean")}
+                for name in data
+            }
+
+        bins = np.floor((timestamps - start) / window).astype(np.int64)
+        # Rows are sorted by time, so windows are contiguous runs of rows
+        starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+        result = {"window_start": start + bins[starts] * window}
+        for name, values in data.items():
+            present = ~np.isnan(values)
+            count = np.add.reduceat(present, starts)
+            total = np.add.reduceat(np.where(present, values, 0.0), starts)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result[name] = {
+                    "count": count,
+                    # fmin/fmax skip NaN unless the whole window is NaN
+                    "min": np.fmin.reduceat(values, starts),
+                    "max": np.fmax.reduceat(values, starts),
+                    "mean": total / count,
+                }
+        return result
+
+    def _overlapping(self, start, end):
+        segments = self.segments()
+        if not segments:
+            return []
+        # Segments are contiguous time buckets, so the last segment starting
+        # at or before ``start`` is the first one that can overlap
+        first = max(0, int(np.searchsorted(segments, start, side="right")) - 1)
+        return [segment for segment in segments[first:] if segment < end]
+
+    def _segment_columns(self, start):
+        directory = os.path.join(self.path, _segment_name(start))
+        return [
+            entry[: -len(COLUMN_SUFFIX)]
+            for entry in os.listdir(directory)
+            if entry.endswith(COLUMN_SUFFIX) and entry != INDEX_FILE
+        ]
+
+    def _segment_range(self, segment, start, end, channels):
+        directory = os.path.join(self.path, _segment_name(segment))
+        columns = self._segment_columns(segment)
+        rows = min(
+            os.path.getsize(os.path.join(directory, name + COLUMN_SUFFIX)) // 8
+            for name in columns
+        )
+        if not rows:
+            return {name: np.empty(0) for name in [TIMESTAMP] + channels}
+
+        timestamps = self._map(directory, TIMESTAMP, rows)
+        index = np.fromfile(os.path.join(directory, INDEX_FILE), "<f8")
+        first = self._find(timestamps, index, start)
+        last = self._find(timestamps, index, end)
+
+        result = {TIMESTAMP: timestamps[first:last]}
+        for name in channels:
+            if name in columns:
+                result[name] = self._map(directory, name, rows)[first:last]
+            else:
+                result[name] = np.full(last - first, np.nan)
+        return result
+
+    @staticmethod
+    def _find(timestamps, index, value):
+        # Narrow down to one stride with the sparse index, then search it
+        block = max(0, int(np.searchsorted(index, value, side="left")) - 1)
+        low = block * INDEX_STRIDE
+        high = min(len(timestamps), low + INDEX_STRIDE + 1)
+        return low + int(np.searchsorted(timestamps[low:high], value, side="left"))
+
+    @staticmethod
+    def _map(directory, name, rows):
+        return np.memmap(
+            os.path.join(directory, name + COLUMN_SUFFIX),
+            dtype="<f8",
+            mode="r",
+            shape=(rows,),
+        )
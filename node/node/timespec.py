@@ -0,0 +1,20 @@
+import datetime
+import time
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value):
+    """Epoch seconds, an ISO 8601 datetime or an age like ``90m`` / ``7d``."""
+    if value[-1] in UNITS and value[:-1].replace(".", "", 1).isdigit():
+        return time.time() - parse_duration(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def parse_duration(value):
+    if value[-1] in UNITS:
+        return float(value[:-1]) * UNITS[value[-1]]
+    return float(value)
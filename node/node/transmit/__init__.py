@@ -1,3 +1,30 @@
-from .transmit import send_to_rabbitmq
+from .async_transmit import AsyncTransmitter
+from .batcher import Batcher
+from .outbox import Outbox, OutboxDrainer
+from .publisher import REJECTED, RabbitMQPublisher
+from .routing import BrokerSelector, Endpoint, routing_key
+from .serializer import (
+    JsonSerializer,
+    BinarySerializer,
+    get_serializer,
+    decode_message,
+)
+from .transmit import send_to_rabbitmq, get_publisher
 
-__all__ = ["send_to_rabbitmq"]
+__all__ = [
+    "AsyncTransmitter",
+    "Batcher",
+    "Outbox",
+    "OutboxDrainer",
+    "RabbitMQPublisher",
+    "REJECTED",
+    "BrokerSelector",
+    "Endpoint",
+    "routing_key",
+    "JsonSerializer",
+    "BinarySerializer",
+    "get_serializer",
+    "decode_message",
+    "send_to_rabbitmq",
+    "get_publisher",
+]
@@ -0,0 +1,128 @@
+import asyncio
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from node.logger import ops_logger
+from node.metrics import REGISTRY
+from node.settings import CONFIG
+
+BACKPRESSURE_POLICIES = ("drop-oldest", "block", "spill")
+
+DROPPED = REGISTRY.counter(
+    "node_transmit_dropped_total", "Messages dropped from a full transmit queue"
+)
+SPILLED = REGISTRY.counter(
+    "node_transmit_spilled_total", "Messages spilled from a full transmit queue"
+)
+
+
+class AsyncTransmitter:
+    """Hand messages from the event loop to a blocking sender thread.
+
+    Messages wait in a bounded ``asyncio.Queue`` and are passed one at a time
+    to ``send(body, properties)`` on a single worker thread, so a slow broker,
+    DNS lookup or TCP timeout never blocks the event loop. When the queue is
+    full the backpressure policy decides what happens to a new message:
+
+    * ``drop-oldest`` discards the oldest queued message
+    * ``block`` makes ``put`` wait for room
+    * ``spill`` hands the message straight to ``spill(body, properties)``,
+      typically ``OutboxDrainer.submit``
+
+    Spilling runs on a thread of its own, an outbox write is disk I/O. A
+    spilled message bypasses the queue, so it may be delivered before
+    messages that were queued earlier.
+    """
+
+    def __init__(self, send, maxsize=None, policy=None, spill=None, config=None):
+        config = CONFIG if config is None else config
+        maxsize = maxsize or config.get("transmit_queue_size", 1000)
+        policy = policy or config.get("transmit_backpressure", "drop-oldest")
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        if policy == "spill" and spill is None:
+            raise ValueError("The spill policy needs a spill target")
+
+        self.send = send
+        self.spill = spill
+        self.policy = policy
+        self.queue = asyncio.Queue(maxsize)
+        # A single thread, the publisher's connection is not thread-safe
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="transmit")
+        # One thread too, so spilled messages keep their order
+        self.spill_executor = None
+        if policy == "spill":
+            self.spill_executor = ThreadPoolExecutor(1, thread_name_prefix="spill")
+        self.delivered = 0
+        self.failed = 0
+        self.dropped = 0
+        self.spilled = 0
+        self._task = None
+
+    def __len__(self):
+        return self.queue.qsize()
+
+    def start(self):
+        self._task = asyncio.create_task(self._worker())
+
+    async def put(self, body, properties=None, *extra):
+        """Queue one message, applying the backpressure policy when full.
+
+        Any ``extra`` arguments are passed on to ``send`` after the
+        properties; a spilled message goes without them.
+        """
+        if self.policy == "block" or not self.queue.full():
+            await self.queue.put((body, properties, extra))
+        elif self.policy == "drop-oldest":
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+            DROPPED.inc()
+            if self.dropped % 100 == 1:
+                ops_logger.warning(
+                    "Transmit queue full, dropped %d messages so far", self.dropped
+                )
+            self.queue.put_nowait((body, properties, extra))
+        else:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                self.spill_executor, self.spill, body, properties
+            )
+            self.spilled += 1
+            SPILLED.inc()
+
+    async def stop(self, timeout=None):
+        """Send what is still queued, waiting at most ``timeout`` seconds."""
+        if self.spill_executor is not None:
+            self.spill_executor.shutdown(wait=True)
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            ops_logger.warning(
+                "Transmitter stopped with %d messages still queued", len(self)
+            )
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        self.executor.shutdown(wait=True)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            body, properties, extra = await self.queue.get()
+            try:
+                ok = await loop.run_in_executor(
+                    self.executor, self.send, body, properties, *extra
+                )
+            except Exception as e:
+                ops_logger.error("Error transmitting message: %s", e)
+                ok = False
+            finally:
+                self.queue.task_done()
+            if ok:
+                self.delivered += 1
+            else:
+                self.failed += 1
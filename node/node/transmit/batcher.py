@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+from node.settings import CONFIG
+from .serializer import get_serializer
+
+# Shortest wait, in seconds, between two checks for an aged batch
+MIN_POLL = 0.01
+
+
+class Batcher:
+    """Collect readings and emit them as one batch message.
+
+    A batch is flushed as soon as it holds ``max_readings`` readings, its
+    encoded size would grow past ``max_bytes`` or its oldest reading is
+    ``max_delay_ms`` old, whichever comes first. Readings are prepared by the
+    serializer once on the way in, the JSON serializer for instance encodes
+    each reading once and stitches the batch body together from those
+    fragments.
+
+    ``add`` only sees the age threshold when a reading arrives; ``run``
+    flushes a batch that ages out while no more readings come in.
+    """
+
+    def __init__(
+        self,
+        max_readings=None,
+        max_bytes=None,
+        max_delay_ms=None,
+        serializer=None,
+        config=None,
+    ):
+        config = CONFIG if config is None else config
+        self.max_readings = max_readings or config.get("batch_max_readings", 50)
+        self.max_bytes = max_bytes or config.get("batch_max_bytes", 64 * 1024)
+        if max_delay_ms is None:
+            max_delay_ms = config.get("batch_max_delay_ms", 5000)
+        self.max_delay = max_delay_ms / 1000
+        self.serializer = serializer or get_serializer(config)
+
+        self._items = []
+        self._size = 0
+        self._deadline = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, data):
+        """Add one reading, returns the list of ``(body, properties)`` ready
+        to send."""
+        item, size = self.serializer.prepare(data)
+        ready = []
+        if self._items and self._size + size > self.max_bytes:
+            ready.append(self.flush())
+
+        if not self._items:
+            self._deadline = time.monotonic() + self.max_delay
+        self._items.append(item)
+        self._size += size
+
+        if len(self._items) >= self.max_readings or self._size >= self.max_bytes:
+            ready.append(self.flush())
+        else:
+            ready.extend(self.poll())
+        return ready
+
+    def poll(self):
+        """Flush the pending batch if its time threshold has passed."""
+        if self._items and time.monotonic() >= self._deadline:
+            return [self.flush()]
+        return []
+
+    async def run(self, put):
+        """Hand batches that reached ``max_delay_ms`` to ``await put(body,
+        properties)``, until cancelled."""
+        while True:
+            if self._deadline is None:
+                delay = self.max_delay
+            else:
+                delay = self._deadline - time.monotonic()
+            # Never spin, even with a zero max_delay_ms
+            await asyncio.sleep(max(delay, MIN_POLL))
+            for body, properties in self.poll():
+                await put(body, properties)
+
+    def flush(self):
+        """Return the pending readings as one ``(body, properties)`` batch and
+        start a new batch.
+
+        Returns None when nothing is pending.
+        """
+        if not self._items:
+            return None
+        message = self.serializer.encode_batch(self._items)
+        self._items = []
+        self._size = 0
+        self._deadline = None
+        return message
@@ -0,0 +1,291 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pika
+from node.logger import ops_logger
+from node.metrics import REGISTRY
+from node.settings import CONFIG
+from .publisher import REJECTED
+
+# How often SQLite fsyncs, see https://www.sqlite.org/pragma.html#pragma_synchronous
+FSYNC_POLICIES = {
+    # fsync on every commit, survives power loss
+    "always": "FULL",
+    # fsync on WAL checkpoints only, survives process crashes
+    "normal": "NORMAL",
+    # leave it to the OS
+    "never": "OFF",
+}
+
+DROPPED = REGISTRY.counter(
+    "node_outbox_dropped_total", "Messages evicted from a full outbox"
+)
+REJECTED_DROPPED = REGISTRY.counter(
+    "node_outbox_rejected_total", "Messages dropped after the broker rejected them"
+)
+# Seconds between repeats of a warning that would otherwise fire per message
+WARN_INTERVAL = 60.0
+
+
+class Outbox:
+    """Disk-backed FIFO of encoded messages waiting to be published.
+
+    Backed by SQLite in WAL mode. Disk usage is bounded by ``max_bytes`` of
+    message bodies; once full the oldest messages are dropped to make room,
+    so a node that stays offline keeps its most recent history.
+    """
+
+    def __init__(self, path=None, max_bytes=None, fsync=None, config=None):
+        config = CONFIG if config is None else config
+        self.path = path or config.get("outbox_path", "logs/outbox/outbox.db")
+        self.max_bytes = max_bytes or config.get("outbox_max_bytes", 256 * 1024**2)
+        fsync = fsync or config.get("outbox_fsync", "normal")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown outbox fsync policy: {fsync}")
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(f"PRAGMA synchronous={FSYNC_POLICIES[fsync]}")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "body BLOB NOT NULL, "
+            "content_type TEXT, "
+            "content_encoding TEXT, "
+            "type TEXT, "
+            "created REAL NOT NULL)"
+        )
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(outbox)")]
+        if "content_encoding" not in columns:
+            # Outboxes written before compression support
+            self.db.execute("ALTER TABLE outbox ADD COLUMN content_encoding TEXT")
+        self.db.commit()
+
+        self.dropped = 0
+        self._warned = None
+        self._count, self._size = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM outbox"
+        ).fetchone()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def size(self):
+        """Total size of the pending message bodies in bytes."""
+        return self._size
+
+    def append(self, body, properties=None):
+        if isinstance(body, str):
+            body = body.encode()
+        if properties is None:
+            properties = pika.BasicProperties()
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO outbox "
+                "(body, content_type, content_encoding, type, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    body,
+                    properties.content_type,
+                    properties.content_encoding,
+                    properties.type,
+                    time.time(),
+                ),
+            )
+            self._count += 1
+            self._size += len(body)
+            if self._size > self.max_bytes:
+                self._evict()
+            self.db.commit()
+
+    def peek(self, limit):
+        """Return up to ``limit`` of the oldest messages.
+
+        Each message is an ``(id, body, properties)`` tuple, messages stay in
+        the outbox until they are acked.
+        """
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT id, body, content_type, content_encoding, type FROM outbox "
+                "ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            (
+                id,
+                body,
+                (
+                    pika.BasicProperties(
+                        content_type=content_type,
+                        content_encoding=content_encoding,
+                        type=type,
+                    )
+                    if content_type or content_encoding or type
+                    else None
+                ),
+            )
+            for id, body, content_type, content_encoding, type in rows
+        ]
+
+    def ack(self, ids):
+        """Remove published messages from the outbox."""
+        if not ids:
+            return
+        with self.lock:
+            placeholders = ", ".join("?" * len(ids))
+            count, size = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM outbox "
+                f"WHERE id IN ({placeholders})",
+                ids,
+            ).fetchone()
+            self.db.execute(f"DELETE FROM outbox WHERE id IN ({placeholders})", ids)
+            self.db.commit()
+            self._count -= count
+            self._size -= size
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def _evict(self):
+        # Drop the oldest messages in chunks until we are back under budget
+        while self._size > self.max_bytes and self._count:
+            rows = self.db.execute(
+                "SELECT id, LENGTH(body) FROM outbox ORDER BY id LIMIT 100"
+            ).fetchall()
+            freed = 0
+            last_id = None
+            for last_id, length in rows:
+                freed += length
+                if self._size - freed <= self.max_bytes:
+                    break
+            evicted = self.db.execute(
+                "DELETE FROM outbox WHERE id <= ?", (last_id,)
+            ).rowcount
+            self._count -= evicted
+            self._size -= freed
+            self.dropped += evicted
+            DROPPED.inc(evicted)
+        # Once full, every append evicts, warn once a minute rather than each time
+        now = time.monotonic()
+        if self._warned is None or now - self._warned >= WARN_INTERVAL:
+            self._warned = now
+            ops_logger.warning("Outbox full, dropped %d messages so far", self.dropped)
+
+
+class OutboxDrainer(threading.Thread):
+    """Background thread publishing the outbox in FIFO order.
+
+    Live messages are submitted through the drainer and land in the outbox
+    first, so a broker outage only grows the backlog. Once the publisher
+    reconnects the backlog is replayed in chunks of ``chunk_size``, capped at
+    ``rate`` messages per second (0 for no limit). The cap only applies
+    while a backlog remains; live messages arriving during a replay queue
+    behind it and go out at the same rate. The publisher is used from this
+    thread only.
+
+    A message the broker rejects, rather than one lost with the connection,
+    is retried ``max_rejections`` times in all and then dropped, so it
+    cannot hold up the rest of the outbox.
+    """
+
+    def __init__(
+        self,
+        outbox,
+        publisher,
+        chunk_size=None,
+        rate=None,
+        max_rejections=None,
+        config=None,
+    ):
+        super().__init__(name="outbox-drainer", daemon=True)
+        config = CONFIG if config is None else config
+        self.outbox = outbox
+        self.publisher = publisher
+        self.chunk_size = chunk_size or config.get("outbox_replay_chunk", 500)
+        if rate is None:
+            rate = config.get("outbox_replay_rate", 200)
+        self.rate = rate
+        self.max_rejections = max_rejections or config.get("outbox_max_rejections", 3)
+        self.idle_interval = config.get("outbox_retry_interval", 1.0)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._unavailable = False
+        # Outbox id -> times the broker rejected that message
+        self._rejections = {}
+
+    def submit(self, body, properties=None):
+        """Store a message in the outbox and wake the drainer."""
+        self.outbox.append(body, properties)
+        self._wake.set()
+        return True
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wake.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stopping.is_set():
+            if not self.drain_once():
+                self._wake.wait(self.idle_interval)
+                self._wake.clear()
+
+    def drain_once(self):
+        """Publish one chunk of the outbox, returns how many were sent."""
+        messages = self.outbox.peek(self.chunk_size)
+        started = time.monotonic()
+        sent = []
+        dropped = []
+        rejected = False
+        for id, body, properties in messages:
+            if self._stopping.is_set():
+                break
+            ok = self.publisher.publish_body(body, properties)
+            if ok is REJECTED:
+                if self._give_up(id):
+                    dropped.append(id)
+                    continue
+                rejected = True
+                break
+            if not ok:
+                break
+            sent.append(id)
+            if self._rejections:
+                self._rejections.pop(id, None)
+        self.outbox.ack(sent + dropped)
+
+        if len(sent) + len(dropped) < len(messages) and not self._stopping.is_set():
+            if not rejected and not self._unavailable:
+                self._unavailable = True
+                ops_logger.info(
+                    "Broker unavailable, %d messages queued", len(self.outbox)
+                )
+            return 0
+        if self._unavailable and sent:
+            self._unavailable = False
+            ops_logger.info(
+                "Broker available again, replaying %d messages", len(self.outbox)
+            )
+        if self.rate and sent and len(self.outbox):
+            # Spread replay out so catching up does not swamp the broker
+            self._stopping.wait(len(sent) / self.rate - (time.monotonic() - started))
+        return len(sent)
+
+    def _give_up(self, id):
+        """Count a rejection of message ``id``, True once it is to be dropped."""
+        count = self._rejections.pop(id, 0) + 1
+        if count < self.max_rejections:
+            self._rejections[id] = count
+            return False
+        REJECTED_DROPPED.inc()
+        ops_logger.error(
+            "Dropping outbox message %d, the broker rejected it %d times", id, count
+        )
+        return True
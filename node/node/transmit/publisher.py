@@ -0,0 +1,277 @@
+import random
+import time
+
+import pika
+from node.logger import ops_logger
+from node.metrics import REGISTRY
+from node.settings import CONFIG
+from .routing import BrokerSelector, routing_key
+from .serializer import get_serializer
+
+PUBLISHED = REGISTRY.counter("node_published_total", "Messages published to RabbitMQ")
+PUBLISH_FAILURES = REGISTRY.counter(
+    "node_publish_failures_total", "Messages RabbitMQ did not accept"
+)
+RECONNECTS = REGISTRY.counter(
+    "node_reconnects_total", "Connections re-established after a failure"
+)
+CONNECTED = REGISTRY.gauge("node_broker_connected", "1 while connected to RabbitMQ")
+FAILOVERS = REGISTRY.counter(
+    "node_broker_failovers_total", "Connections made to a broker not preferred"
+)
+PUBLISH_SECONDS = REGISTRY.histogram(
+    "node_publish_seconds", "Time to publish one message, including confirms"
+)
+
+
+class _Rejected:
+    """What ``publish_body`` returns when the broker refused the message
+    itself, as opposed to a connection failure. False like a failure, but
+    publishing the same message again will not help."""
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "REJECTED"
+
+
+REJECTED = _Rejected()
+
+
+class RabbitMQPublisher:
+    """Long-lived RabbitMQ publisher owning a single connection and channel.
+
+    The queue is declared once per connection instead of once per message.
+    When the broker goes away the connection is dropped and re-opened on a
+    later publish, with a jittered exponential backoff between attempts so
+    a dead broker never blocks the sampling loop in connect timeouts.
+
+    With several brokers configured the ``BrokerSelector`` decides which
+    one to use: a broker that fails is marked down and the next one tried
+    straight away, and once the preferred broker is due to be tried again
+    the publisher moves back to it. With ``rabbitmq_exchange`` set messages
+    go to that topic exchange, routed by ``rabbitmq_routing_key``.
+    """
+
+    def __init__(self, config=None, confirm_delivery=None, serializer=None):
+        self.config = CONFIG if config is None else config
+        self.serializer = serializer or get_serializer(self.config)
+        if confirm_delivery is None:
+            confirm_delivery = self.config.get("rabbitmq_confirm_delivery", False)
+        self.confirm_delivery = confirm_delivery
+        self.initial_backoff = self.config.get("rabbitmq_reconnect_initial_delay", 1.0)
+        self.max_backoff = self.config.get("rabbitmq_reconnect_max_delay", 60.0)
+
+        self.selector = BrokerSelector.from_config(self.config)
+        self.exchange = self.config.get("rabbitmq_exchange") or ""
+        self.routing_keys = {}
+
+        self.endpoint = None
+        self.connection = None
+        self.channel = None
+        self.failures = 0
+        self.reconnects = 0
+        self.next_attempt = 0.0
+
+    @property
+    def is_connected(self):
+        return (
+            self.connection is not None
+            and self.connection.is_open
+            and self.channel is not None
+            and self.channel.is_open
+        )
+
+    def _parameters(self, endpoint):
+        user = endpoint.user or self.config["rabbitmq_user"]
+        password = endpoint.password or self.config["rabbitmq_password"]
+        if user and password:
+            credentials = pika.PlainCredentials(user, password)
+        else:
+            credentials = pika.PlainCredentials("guest", "guest")
+        return pika.ConnectionParameters(
+            host=endpoint.host,
+            port=endpoint.port,
+            credentials=credentials,
+            heartbeat=self.config.get("rabbitmq_heartbeat", 60),
+            connection_attempts=1,
+            socket_timeout=self.config.get("rabbitmq_socket_timeout", 5.0),
+            blocked_connection_timeout=self.config.get(
+                "rabbitmq_blocked_timeout", 30.0
+            ),
+        )
+
+    def connect(self):
+        """Ensure the connection is open, returns True when ready to publish.
+
+        Returns False without touching the network while a reconnect backoff
+        is still pending.
+        """
+        if self.is_connected:
+            if (
+                len(self.selector.order) > 1
+                and self.endpoint is not self.selector.preferred()
+            ):
+                self._failback()
+            return True
+        if time.monotonic() < self.next_attempt:
+            return False
+
+        self._drop()
+        for endpoint in self.selector.candidates():
+            try:
+                self.connection, self.channel = self._open(endpoint)
+            except (pika.exceptions.AMQPError, OSError) as e:
+                ops_logger.error(
+                    "RabbitMQ connection error on %s: %r", endpoint.name, e
+                )
+                self.selector.mark_down(endpoint)
+                continue
+            self._connected(endpoint)
+            return True
+        self._schedule_retry()
+        return False
+
+    def _open(self, endpoint):
+        ops_logger.info("Connecting to RabbitMQ at %s", endpoint.name)
+        connection = pika.BlockingConnection(self._parameters(endpoint))
+        try:
+            channel = connection.channel()
+            if self.confirm_delivery:
+                channel.confirm_delivery()
+            queue = self.config.get("rabbitmq_queue")
+            if self.exchange:
+                channel.exchange_declare(
+                    exchange=self.exchange, exchange_type="topic", durable=True
+                )
+            if queue:
+                channel.queue_declare(queue=queue, durable=True)
+                if self.exchange:
+                    # The catch-all consumer keeps receiving everything
+                    channel.queue_bind(
+                        queue=queue, exchange=self.exchange, routing_key="#"
+                    )
+        except BaseException:
+            if connection.is_open:
+                connection.close()
+            raise
+        return connection, channel
+
+    def _connected(self, endpoint):
+        self.selector.mark_up(endpoint)
+        if endpoint is not self.selector.order[0]:
+            FAILOVERS.inc()
+        if self.failures:
+            self.reconnects += 1
+            RECONNECTS.inc()
+        self.endpoint = endpoint
+        CONNECTED.set(1)
+        self.failures = 0
+        self.next_attempt = 0.0
+        ops_logger.info("Connected to RabbitMQ at %s", endpoint.name)
+
+    def _failback(self):
+        """Move to the preferred broker if it is reachable again."""
+        endpoint = self.selector.preferred()
+        try:
+            connection, channel = self._open(endpoint)
+        except (pika.exceptions.AMQPError, OSError) as e:
+            ops_logger.warning("RabbitMQ %s still unavailable: %r", endpoint.name, e)
+            self.selector.mark_down(endpoint)
+            return
+        self._drop()
+        self.connection, self.channel = connection, channel
+        self._connected(endpoint)
+
+    def publish(self, data):
+        """Publish one reading, returns True once the broker has it.
+
+        With publisher confirms enabled True means the broker acknowledged
+        the message, otherwise that it was written to the socket. A message
+        the broker nacked or could not route returns ``REJECTED``.
+        """
+        return self.publish_body(*self.serializer.encode(data))
+
+    def publish_body(self, body, properties=None, node_id=None):
+        """Publish an already encoded message body, see publish().
+
+        ``node_id`` routes the message as that node's rather than this
+        one's, for tools publishing on behalf of other nodes.
+        """
+        started = time.perf_counter()
+        ok = self._publish_body(body, properties, node_id)
+        if ok:
+            PUBLISHED.inc()
+            PUBLISH_SECONDS.observe(time.perf_counter() - started)
+        else:
+            PUBLISH_FAILURES.inc()
+        return ok
+
+    def _publish_body(self, body, properties, node_id=None):
+        for attempt in range(2):
+            if not self.connect():
+                return False
+            try:
+                self.channel.basic_publish(
+                    exchange=self.exchange,
+                    routing_key=self._routing_key(properties, node_id),
+                    body=body,
+                    properties=properties,
+                )
+                return True
+            except (
+                pika.exceptions.UnroutableError,
+                pika.exceptions.NackError,
+            ) as e:
+                ops_logger.error("RabbitMQ rejected message: %r", e)
+                return REJECTED
+            except (pika.exceptions.AMQPError, OSError) as e:
+                ops_logger.error("RabbitMQ publish error: %r", e)
+                if attempt:
+                    self._schedule_retry()
+                else:
+                    # The connection may simply have gone stale, reconnect
+                    # straight away once before backing off.
+                    self._drop()
+        return False
+
+    def _routing_key(self, properties, node_id=None):
+        if not self.exchange:
+            return self.config["rabbitmq_queue"]
+        kind = properties.type if properties is not None else None
+        key = self.routing_keys.get((kind, node_id))
+        if key is None:
+            template = self.config.get(
+                "rabbitmq_routing_key", "{region}.{node_id}.{metric}"
+            )
+            config = self.config
+            if node_id is not None:
+                config = {**config, "node_id": node_id}
+            key = self.routing_keys[kind, node_id] = routing_key(template, kind, config)
+        return key
+
+    def close(self):
+        self._drop()
+        ops_logger.info("Closed RabbitMQ connection")
+
+    def _schedule_retry(self):
+        self._drop()
+        self.failures += 1
+        ceiling = min(self.max_backoff, self.initial_backoff * 2 ** (self.failures - 1))
+        # Full jitter keeps a fleet of nodes from reconnecting in lockstep
+        # after a broker restart.
+        delay = random.uniform(0, ceiling)
+        self.next_attempt = time.monotonic() + delay
+        ops_logger.warning("Retrying RabbitMQ connection in %.1fs", delay)
+
+    def _drop(self):
+        connection, self.connection, self.channel = self.connection, None, None
+        if connection is None:
+            return
+        CONNECTED.set(0)
+        try:
+            if connection.is_open:
+                connection.close()
+        except Exception as e:
+            ops_logger.error("Error closing RabbitMQ connection: %s", e)
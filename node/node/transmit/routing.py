@@ -0,0 +1,120 @@
+import bisect
+import hashlib
+import time
+
+from node.settings import CONFIG
+
+# First word of a message's type -> the metric in its routing key
+METRICS = {"reading": "readings", "batch": "readings", "block": "blocks"}
+SELECTIONS = ("priority", "hash")
+# Points per broker on the hash ring, enough to spread nodes evenly
+RING_POINTS = 64
+
+
+def metric(message_type):
+    """The routing key metric of a message type, e.g. ``batch.v1`` ->
+    ``readings``."""
+    word = (message_type or "reading").split(".")[0]
+    return METRICS.get(word, word)
+
+
+def routing_key(template, message_type, config=None):
+    """``template`` filled in with this node's ``node_id`` and ``region``
+    and the ``metric`` of the message type."""
+    config = CONFIG if config is None else config
+    return template.format(
+        node_id=config.get("node_id"),
+        region=config.get("region"),
+        metric=metric(message_type),
+    )
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class Endpoint:
+    def __init__(self, host, port=5672, priority=0, user=None, password=None):
+        self.host = host
+        self.port = port
+        self.priority = priority
+        self.user = user
+        self.password = password
+        self.down_until = 0.0
+
+    @property
+    def name(self):
+        return f"{self.host}:{self.port}"
+
+    def __repr__(self):
+        return f"Endpoint({self.name})"
+
+
+class BrokerSelector:
+    """The order in which this node tries its brokers.
+
+    With ``"priority"`` that is ascending ``priority``, list order breaking
+    ties. With ``"hash"`` it is the order the brokers come up walking a
+    consistent hash ring from ``key`` (the node id), which spreads a fleet
+    evenly over the brokers and, when one is added or removed, only moves
+    the nodes that hashed to it.
+
+    A broker marked down is tried after all the others until ``down_time``
+    has passed, so a node fails over to the next one and comes back on its
+    own once that time is up.
+    """
+
+    def __init__(self, endpoints, selection="priority", key="", down_time=300.0):
+        if not endpoints:
+            raise ValueError("No brokers configured")
+        if selection not in SELECTIONS:
+            raise ValueError(f"Unknown broker selection: {selection}")
+        self.endpoints = list(endpoints)
+        self.selection = selection
+        self.down_time = down_time
+        if selection == "priority":
+            self.order = sorted(self.endpoints, key=lambda e: e.priority)
+        else:
+            self.order = self._ring_order(key)
+
+    @classmethod
+    def from_config(cls, config=None):
+        config = CONFIG if config is None else config
+        brokers = config.get("rabbitmq_brokers") or [
+            {"host": config["rabbitmq_host"], "port": config["rabbitmq_port"]}
+        ]
+        return cls(
+            [Endpoint(**broker) for broker in brokers],
+            config.get("rabbitmq_broker_selection", "priority"),
+            str(config.get("node_id", "")),
+            config.get("rabbitmq_failback_interval", 300.0),
+        )
+
+    def _ring_order(self, key):
+        ring = sorted(
+            (_hash(f"{endpoint.name}#{point}"), index)
+            for index, endpoint in enumerate(self.endpoints)
+            for point in range(RING_POINTS)
+        )
+        start = bisect.bisect(ring, (_hash(key), len(self.endpoints)))
+        order = []
+        for offset in range(len(ring)):
+            endpoint = self.endpoints[ring[(start + offset) % len(ring)][1]]
+            if endpoint not in order:
+                order.append(endpoint)
+        return order
+
+    def candidates(self):
+        """Brokers to try, healthy ones first, each group in order."""
+        now = time.monotonic()
+        up = [endpoint for endpoint in self.order if endpoint.down_until <= now]
+        return up + [endpoint for endpoint in self.order if endpoint not in up]
+
+    def preferred(self):
+        return self.candidates()[0]
+
+    def mark_down(self, endpoint):
+        endpoint.down_until = time.monotonic() + self.down_time
+
+    def mark_up(self, endpoint):
+        endpoint.down_until = 0.0
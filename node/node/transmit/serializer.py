@@ -0,0 +1,353 @@
+import json
+import lzma
+import math
+import struct
+import zlib
+
+import pika
+from node.reading import Reading, dumps
+from node.settings import CONFIG
+
+READING_TYPE = "reading"
+BATCH_TYPE = "batch"
+BATCH_VERSION = 1
+
+# content_encoding -> (compress, decompress)
+COMPRESSORS = {
+    "zlib": (zlib.compress, zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+
+class Serializer:
+    """Turns readings into message bodies and back.
+
+    Subclasses implement ``prepare``, ``dump``, ``dump_batch`` and
+    ``load``; this class adds optional compression and the AMQP properties
+    (content type, message type, content encoding) consumers need to decode
+    a message with ``decode_message``.
+    """
+
+    content_type = None
+
+    def __init__(self, compression=None, compress_min_bytes=256):
+        if compression is not None and compression not in COMPRESSORS:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+
+    def prepare(self, reading):
+        """Return ``(item, size)``, the batchable form of a reading and its
+        approximate encoded size in bytes."""
+        raise NotImplementedError
+
+    def dump(self, reading):
+        raise NotImplementedError
+
+    def dump_batch(self, items):
+        raise NotImplementedError
+
+    def load(self, body):
+        """Decode an uncompressed body into a list of readings."""
+        raise NotImplementedError
+
+    def encode(self, reading):
+        """Encode a single reading, returns ``(body, properties)``."""
+        return self._finish(self.dump(reading), READING_TYPE)
+
+    def encode_batch(self, items):
+        """Encode prepared items as one batch, returns ``(body, properties)``."""
+        return self._finish(self.dump_batch(items), f"{BATCH_TYPE}.v{BATCH_VERSION}")
+
+    def _finish(self, body, message_type):
+        encoding = None
+        if self.compression and len(body) >= self.compress_min_bytes:
+            compressed = COMPRESSORS[self.compression][0](body)
+            # Tiny or high-entropy bodies can grow, send those as they are
+            if len(compressed) < len(body):
+                body, encoding = compressed, self.compression
+        return body, pika.BasicProperties(
+            content_type=self.content_type,
+            content_encoding=encoding,
+            type=message_type,
+        )
+
+
+class JsonSerializer(Serializer):
+    """The original JSON format, batches wrapped in a JSON envelope.
+
+    Readings are encoded once in ``prepare`` and batches are stitched
+    together from those fragments. A ``Reading`` the sensor log already
+    encoded is not encoded again.
+    """
+
+    content_type = "application/json"
+
+    def prepare(self, reading):
+        encoded = dumps(reading)
+        # +2 for the separator between readings
+        return encoded, len(encoded) + 2
+
+    def dump(self, reading):
+        if isinstance(reading, Reading):
+            return reading.encoded()
+        return json.dumps(reading).encode()
+
+    def dump_batch(self, items):
+        return (
+            f'{{"type": "{BATCH_TYPE}", "version": {BATCH_VERSION}, '
+            f'"count": {len(items)}, '
+            f'"readings": [{", ".join(items)}]}}'
+        ).encode()
+
+    def load(self, body):
+        message = json.loads(body)
+        if isinstance(message, dict) and message.get("type") == BATCH_TYPE:
+            return message["readings"]
+        return [message]
+
+
+class BinarySerializer(Serializer):
+    """Compact, versioned binary format.
+
+    Node ids and channel names are written once per message in lookup
+    tables. Timestamps are stored as zigzag varint deltas in microseconds
+    and float channel values as packed float32 (or float64), with a presence
+    bitmap per reading. Anything else a reading carries (non-float values,
+    extra keys) travels as a small JSON blob so every reading round-trips.
+
+    Layout::
+
+        "LW" version:u8 flags:u8
+        ids:    varint count, then varint length + utf-8 per id
+        names:  varint count, then varint length + utf-8 per channel
+        varint reading count, then per reading:
+            has:u8 (1 = timestamp, 2 = extras)
+            varint id index (0 = no node_id)
+            [zigzag varint timestamp delta in microseconds]
+            channel presence bitmap, packed values of present channels
+            [varint length + JSON extras]
+    """
+
+    content_type = "application/vnd.lakewatch.readings.v1"
+    MAGIC = b"LW"
+    VERSION = 1
+    FLAG_FLOAT64 = 0x01
+    HAS_TIMESTAMP = 0x01
+    HAS_EXTRAS = 0x02
+
+    def __init__(self, compression=None, compress_min_bytes=256, float64=False):
+        super().__init__(compression, compress_min_bytes)
+        self.float64 = float64
+        self.value_format = "<d" if float64 else "<f"
+        self.value_size = 8 if float64 else 4
+
+    def prepare(self, reading):
+        payload = reading.get("payload")
+        channels = len(payload) if isinstance(payload, dict) else 0
+        return reading, 8 + channels * self.value_size
+
+    def dump(self, reading):
+        return self.dump_batch([reading])
+
+    def dump_batch(self, items):
+        ids = {}
+        names = {}
+        for reading in items:
+            node_id = reading.get("node_id")
+            if isinstance(node_id, str):
+                ids.setdefault(node_id, len(ids) + 1)
+            payload = reading.get("payload")
+            if isinstance(payload, dict):
+                for name, value in payload.items():
+                    if type(value) is float:
+                        names.setdefault(name, len(names))
+
+        out = bytearray(self.MAGIC)
+        out.append(self.VERSION)
+        out.append(self.FLAG_FLOAT64 if self.float64 else 0)
+        for table in (ids, names):
+            _write_varint(out, len(table))
+            for key in table:
+                _write_bytes(out, key.encode())
+        _write_varint(out, len(items))
+
+        bitmap_size = (len(names) + 7) // 8
+        previous = 0
+        for reading in items:
+            extras = {}
+            for key, value in reading.items():
+                if key not in ("node_id", "timestamp", "payload"):
+                    extras[key] = value
+
+            node_id = reading.get("node_id")
+            index = ids.get(node_id, 0) if isinstance(node_id, str) else 0
+            if "node_id" in reading and not index:
+                extras["node_id"] = node_id
+
+            timestamp = reading.get("timestamp")
+            has_timestamp = type(timestamp) in (int, float) and math.isfinite(timestamp)
+            if "timestamp" in reading and not has_timestamp:
+                extras["timestamp"] = timestamp
+
+            bitmap = bytearray(bitmap_size)
+            values = bytearray()
+            payload = reading.get("payload")
+            if isinstance(payload, dict):
+                other = {}
+                for name, value in payload.items():
+                    if type(value) is float:
+                        position = names[name]
+                        bitmap[position // 8] |= 1 << (position % 8)
+                    else:
+                        other[name] = value
+                for name, position in names.items():
+                    if bitmap[position // 8] & (1 << (position % 8)):
+                        values += struct.pack(self.value_format, payload[name])
+                # An empty payload still has to come back as {}
+                if other or not payload:
+                    extras["payload"] = other
+            elif "payload" in reading:
+                extras["payload"] = payload
+
+            out.append(
+                (self.HAS_TIMESTAMP if has_timestamp else 0)
+                | (self.HAS_EXTRAS if extras else 0)
+            )
+            _write_varint(out, index)
+            if has_timestamp:
+                micros = round(timestamp * 1_000_000)
+                _write_varint(out, _zigzag(micros - previous))
+                previous = micros
+            out += bitmap
+            out += values
+            if extras:
+                _write_bytes(out, json.dumps(extras).encode())
+        return bytes(out)
+
+    def load(self, body):
+        view = memoryview(body)
+        if bytes(view[:2]) != self.MAGIC:
+            raise ValueError("Not a Lakewatch binary message")
+        if view[2] != self.VERSION:
+            raise ValueError(f"Unsupported binary format version {view[2]}")
+        value_format, value_size = (
+            ("<d", 8) if view[3] & self.FLAG_FLOAT64 else ("<f", 4)
+        )
+        pos = 4
+
+        tables = []
+        for _ in range(2):
+            count, pos = _read_varint(view, pos)
+            table = []
+            for _ in range(count):
+                raw, pos = _read_bytes(view, pos)
+                table.append(bytes(raw).decode())
+            tables.append(table)
+        ids, names = tables
+        count, pos = _read_varint(view, pos)
+
+        bitmap_size = (len(names) + 7) // 8
+        previous = 0
+        readings = []
+        for _ in range(count):
+            has = view[pos]
+            pos += 1
+            reading = {}
+            index, pos = _read_varint(view, pos)
+            if index:
+                reading["node_id"] = ids[index - 1]
+            if has & self.HAS_TIMESTAMP:
+                delta, pos = _read_varint(view, pos)
+                previous += _unzigzag(delta)
+                reading["timestamp"] = previous / 1_000_000
+            bitmap = view[pos : pos + bitmap_size]
+            pos += bitmap_size
+            payload = {}
+            for position, name in enumerate(names):
+                if bitmap[position // 8] & (1 << (position % 8)):
+                    (payload[name],) = struct.unpack_from(value_format, view, pos)
+                    pos += value_size
+            if payload:
+                reading["payload"] = payload
+            if has & self.HAS_EXTRAS:
+                raw, pos = _read_bytes(view, pos)
+                extras = json.loads(bytes(raw))
+                if isinstance(extras.get("payload"), dict) and payload:
+                    payload.update(extras.pop("payload"))
+                reading.update(extras)
+            readings.append(reading)
+        return readings
+
+
+SERIALIZERS = {"json": JsonSerializer, "binary": BinarySerializer}
+
+
+def get_serializer(config=None):
+    """Build the serializer selected in the config."""
+    config = CONFIG if config is None else config
+    name = config.get("serializer", "json")
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown serializer: {name}")
+    kwargs = {
+        "compression": config.get("serializer_compression"),
+        "compress_min_bytes": config.get("serializer_compress_min_bytes", 256),
+    }
+    if name == "binary":
+        kwargs["float64"] = config.get("serializer_float64", False)
+    return SERIALIZERS[name](**kwargs)
+
+
+def decode_message(body, properties=None):
+    """Decode any message published by a node into a list of readings.
+
+    Uses the content type and encoding from the message properties, messages
+    without properties are treated as plain JSON.
+    """
+    content_type = properties.content_type if properties else None
+    encoding = properties.content_encoding if properties else None
+    if content_type == "application/vnd.lakewatch.block.v1":
+        raise ValueError("Raw sample blocks are decoded with process.decode_block")
+    if encoding:
+        if encoding not in COMPRESSORS:
+            raise ValueError(f"Unknown content encoding: {encoding}")
+        body = COMPRESSORS[encoding][1](body)
+    if content_type and content_type.startswith("application/vnd.lakewatch."):
+        return BinarySerializer().load(body)
+    return JsonSerializer().load(body)
+
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def _write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(view, pos):
+    result = shift = 0
+    while True:
+        byte = view[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_bytes(out, raw):
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _read_bytes(view, pos):
+    length, pos = _read_varint(view, pos)
+    return view[pos : pos + length], pos + length
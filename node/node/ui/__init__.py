@@ -1,3 +1,15 @@
-from .gui import start_gui
+__all__ = ["start_gui", "GuiProcess"]
 
-__all__ = ["start_gui"]
+
+def __getattr__(name):
+    # Imported on first use, so a node running the GUI in its own process
+    # never loads Tk and matplotlib itself
+    if name == "start_gui":
+        from .gui import start_gui
+
+        return start_gui
+    if name == "GuiProcess":
+        from .process import GuiProcess
+
+        return GuiProcess
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
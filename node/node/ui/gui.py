@@ -2,39 +2,139 @@ import tkinter as tk
 from tkinter import ttk
 import threading
 import queue
-import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.animation as animation
 from matplotlib.figure import Figure
 import datetime
-import json
+import math
 import time
-from collections import deque
-from node.logger import ops_logger
+import numpy as np
+from node.logger import init_logging, ops_logger
+from node.process import RingBuffer, DOWNSAMPLERS
+
+# (seconds per point, points kept): raw samples for the last hour or so at
+# 1 Hz, then one-minute means for a week and hourly means for a year
+HISTORY_TIERS = ((0, 4096), (60, 7 * 24 * 60), (3600, 365 * 24))
+PLOT_CHANNELS = ("temperature", "ph")
+PLOT_SPANS = {
+    "10 minutes": 600,
+    "1 hour": 3600,
+    "24 hours": 86400,
+    "7 days": 7 * 86400,
+    "1 year": 365 * 86400,
+}
+
+
+class HistoryTier:
+    """One resolution of the plot history, in preallocated ring buffers.
+
+    Tiers with a resolution keep the mean of each bucket of that many
+    seconds, updated incrementally as samples arrive. Values are passed in
+    channel order, one per channel.
+    """
+
+    def __init__(self, resolution, capacity, channels):
+        self.resolution = resolution
+        self.times = RingBuffer(capacity)
+        self.buffers = [RingBuffer(capacity) for _ in channels]
+        self.values = dict(zip(channels, self.buffers))
+        self.bucket = None
+        self.sums = [0.0] * len(channels)
+        self.counts = [0] * len(channels)
+
+    def covers(self, start):
+        """Whether this tier holds everything since ``start``."""
+        times = self.times
+        return len(times) < times.capacity or times.view()[0] <= start
+
+    def add(self, timestamp, values):
+        if not self.resolution:
+            self.times.append(timestamp)
+            for buffer, value in zip(self.buffers, values):
+                buffer.append(value)
+            return
+
+        bucket = timestamp // self.resolution
+        if self.bucket is not None and bucket != self.bucket:
+            self._close_bucket()
+        self.bucket = bucket
+        sums, counts = self.sums, self.counts
+        for i, value in enumerate(values):
+            if value == value:  # not NaN
+                sums[i] += value
+                counts[i] += 1
+
+    def _close_bucket(self):
+        self.times.append(self.bucket * self.resolution)
+        for i, buffer in enumerate(self.buffers):
+            count = self.counts[i]
+            buffer.append(self.sums[i] / count if count else math.nan)
+            self.sums[i] = 0.0
+            self.counts[i] = 0
 
 
 # Data storage for plots
 class SensorData:
-    def __init__(self, max_points=100):
-        self.max_points = max_points
-        self.timestamps = deque(maxlen=max_points)
-        self.temperature = deque(maxlen=max_points)
-        self.ph = deque(maxlen=max_points)
+    """Multi-resolution plot history with a fixed point budget.
+
+    Samples go into NumPy ring buffers at several resolutions, so memory is
+    fixed and reads are zero-copy views. ``get_data`` picks the finest tier
+    covering the requested span and downsamples it to at most
+    ``max_points`` points per channel.
+    """
+
+    def __init__(self, max_points=None, method=None, tiers=HISTORY_TIERS):
+        from node.settings import CONFIG
+
+        self.max_points = max_points or CONFIG.get("gui_plot_points", 500)
+        self.downsample = DOWNSAMPLERS[method or CONFIG.get("gui_downsample", "lttb")]
+        self.tiers = [
+            HistoryTier(resolution, capacity, PLOT_CHANNELS)
+            for resolution, capacity in tiers
+        ]
+        self.values = [math.nan] * len(PLOT_CHANNELS)
         self.lock = threading.Lock()
 
-    def add_data(self, data):
+    def add_data(self, data, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
         with self.lock:
-            self.timestamps.append(datetime.datetime.now())
-            self.temperature.append(data.get("temperature", 0))
-            self.ph.append(data.get("ph", 0))
-
-    def get_data(self):
+            # Reused for every sample, the tiers copy the values out
+            values = self.values
+            for i, name in enumerate(PLOT_CHANNELS):
+                value = data.get(name)
+                values[i] = value if isinstance(value, (int, float)) else math.nan
+            for tier in self.tiers:
+                tier.add(timestamp, values)
+
+    def get_data(self, span=None):
+        """``{channel: (times, values)}`` for the last ``span`` seconds.
+
+        Times are epoch seconds. Without a span every raw sample is returned.
+        """
         with self.lock:
-            return {
-                "timestamps": list(self.timestamps),
-                "temperature": list(self.temperature),
-                "ph": list(self.ph),
-            }
+            raw = self.tiers[0]
+            if not len(raw.times):
+                return {name: (np.empty(0), np.empty(0)) for name in PLOT_CHANNELS}
+            latest = raw.times.last()
+            tier = raw
+            if span is not None:
+                start = latest - span
+                tier = next(
+                    (tier for tier in self.tiers if tier.covers(start)),
+                    self.tiers[-1],
+                )
+            times = tier.times.view()
+            first = 0 if span is None else int(np.searchsorted(times, start))
+
+            data = {}
+            for name in PLOT_CHANNELS:
+                x = times[first:]
+                y = tier.values[name].view()[first:]
+                missing = np.isnan(y)
+                if missing.any():
+                    x, y = x[~missing], y[~missing]
+                data[name] = self.downsample(x, y, self.max_points)
+            return data
 
 
 class LakewatchGUI:
@@ -139,6 +239,13 @@ class LakewatchGUI:
         self.ph_plot.set_xlabel("Time")
         self.ph_plot.grid(True)
 
+        # The lines are created once and only get new data on updates
+        (self.temp_line,) = self.temp_plot.plot([], [], "r-")
+        (self.ph_line,) = self.ph_plot.plot([], [], "b-")
+        for plot in [self.temp_plot, self.ph_plot]:
+            plot.xaxis_date()
+            plot.tick_params(axis="x", rotation=45, labelsize=8)
+
         # Canvas
         self.canvas = FigureCanvasTkAgg(self.figure, master=self.graphs_frame)
         self.canvas.draw()
@@ -154,6 +261,19 @@ class LakewatchGUI:
         )
         self.clear_btn.pack(side=tk.LEFT, padx=5)
 
+        # History span
+        ttk.Label(self.control_frame, text="Show last:").pack(side=tk.LEFT, padx=5)
+        self.span_var = tk.StringVar(value="1 hour")
+        self.span_box = ttk.Combobox(
+            self.control_frame,
+            textvariable=self.span_var,
+            values=list(PLOT_SPANS),
+            state="readonly",
+            width=12,
+        )
+        self.span_box.bind("<<ComboboxSelected>>", lambda event: self.update_plots())
+        self.span_box.pack(side=tk.LEFT, padx=5)
+
         # Exit button
         self.exit_btn = ttk.Button(
             self.control_frame, text="Exit", command=self.root.quit
@@ -171,44 +291,57 @@ class LakewatchGUI:
 
     def update_plots(self):
         # Get data
-        data = self.sensor_data.get_data()
-
-        # Clear plots
-        self.temp_plot.clear()
-        self.ph_plot.clear()
-
-        # Set titles and grid
-        self.temp_plot.set_title("Temperature History")
-        self.temp_plot.set_ylabel("Temperature (°C)")
-        self.temp_plot.grid(True)
-
-        self.ph_plot.set_title("pH History")
-        self.ph_plot.set_ylabel("pH Level")
-        self.ph_plot.set_xlabel("Time")
-        self.ph_plot.grid(True)
-
-        # Plot data if available
-        if data["timestamps"]:
-            self.temp_plot.plot(data["timestamps"], data["temperature"], "r-")
-            self.ph_plot.plot(data["timestamps"], data["ph"], "b-")
-
-            # Format x-axis labels
-            for plot in [self.temp_plot, self.ph_plot]:
-                plot.tick_params(axis="x", rotation=45)
-                plt.setp(plot.get_xticklabels(), fontsize=8)
-
-        # Update canvas
-        self.canvas.draw()
+        data = self.sensor_data.get_data(PLOT_SPANS.get(self.span_var.get()))
+
+        for line, plot, name in [
+            (self.temp_line, self.temp_plot, "temperature"),
+            (self.ph_line, self.ph_plot, "ph"),
+        ]:
+            times, values = data[name]
+            if len(times):
+                # Epoch seconds to Matplotlib dates, shown in local time
+                offset = time.localtime(times[-1]).tm_gmtoff
+                times = (times + offset) / 86400
+                self._set_limits(plot, times, values)
+            line.set_data(times, values)
+
+        # Redraw once, when Tk is idle
+        self.canvas.draw_idle()
+
+    @staticmethod
+    def _set_limits(plot, times, values):
+        xlim = (
+            (times[0], times[-1])
+            if times[-1] > times[0]
+            else (times[0] - 1e-4, times[0] + 1e-4)
+        )
+        low, high = float(values.min()), float(values.max())
+        margin = (high - low) * 0.05 or 0.5
+        ylim = (low - margin, high + margin)
+        # Only touch the axes when the limits actually change
+        if tuple(plot.get_xlim()) != xlim:
+            plot.set_xlim(xlim)
+        if tuple(plot.get_ylim()) != ylim:
+            plot.set_ylim(ylim)
 
     def update_data(self):
         try:
-            # Check for new data
-            has_received_data = False
-            while not self.data_queue.empty():
-                data = self.data_queue.get_nowait()
-                has_received_data = True
+            # Drain everything queued since the last tick first
+            received = []
+            while True:
+                try:
+                    received.append(self.data_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for data in received:
+                # Extract data correctly from payload if available
+                payload = data.get("payload", {})
+                self.sensor_data.add_data(payload, data.get("timestamp"))
 
-                # Update metadata
+            if received:
+                # Labels only need the newest values
+                data = received[-1]
                 self.node_id_var.set(f"Node ID: {data.get('node_id', '--')}")
 
                 # Extract coordinates from CONFIG since they aren't in the sensor data
@@ -218,7 +351,6 @@ class LakewatchGUI:
                     f"Location: {CONFIG.get('latitude', 0)}, {CONFIG.get('longitude', 0)}"
                 )
 
-                # Extract data correctly from payload if available
                 payload = data.get("payload", {})
                 temp = payload.get("temperature", 0)
                 ph = payload.get("ph", 0)
@@ -231,14 +363,11 @@ class LakewatchGUI:
                 current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 self.last_update_var.set(current_time)
 
-                # Add to history data
-                self.sensor_data.add_data({"temperature": temp, "ph": ph})
-
-                # Update plots
+                # One redraw per tick, however many messages arrived
                 self.update_plots()
 
             # Update connection status based on whether we're receiving data
-            if has_received_data:
+            if received:
                 self.connection_var.set("Status: Connected")
                 self.connection_label.configure(foreground="green")
             else:
@@ -250,7 +379,7 @@ class LakewatchGUI:
                     self.connection_label.configure(foreground="red")
 
         except Exception as e:
-            ops_logger.error(f"Error updating GUI data: {e}")
+            ops_logger.error("Error updating GUI data: %s", e)
             self.connection_var.set("Status: Error")
             self.connection_label.configure(foreground="red")
 
@@ -286,7 +415,7 @@ def data_collector(data_queue):
             # Sleep for a short time
             time.sleep(1)
         except Exception as e:
-            ops_logger.error(f"Error in data collector thread: {e}")
+            ops_logger.error("Error in data collector thread: %s", e)
 
 
 def actual_data_collector(data_queue):
@@ -306,24 +435,30 @@ def actual_data_collector(data_queue):
                 # Sleep for a short time
                 await asyncio.sleep(1)
             except Exception as e:
-                ops_logger.error(f"Error in actual data collector: {e}")
+                ops_logger.error("Error in actual data collector: %s", e)
 
     asyncio.run(read_data())
 
 
-def start_gui(use_test_data=False):
-    """Start the GUI application"""
+def start_gui(use_test_data=False, data_queue=None):
+    """Start the GUI application
+
+    ``data_queue`` is a queue the readings arrive on, such as a bus
+    subscription. Without one the GUI collects readings itself.
+    """
+    init_logging()
     ops_logger.info("Starting Lakewatch GUI...")
 
-    # Create queue for thread communication
-    data_queue = queue.Queue()
+    if data_queue is None:
+        # Create queue for thread communication
+        data_queue = queue.Queue()
 
-    # Start data collection in a separate thread
-    collector_func = data_collector if use_test_data else actual_data_collector
-    data_thread = threading.Thread(
-        target=collector_func, args=(data_queue,), daemon=True
-    )
-    data_thread.start()
+        # Start data collection in a separate thread
+        collector_func = data_collector if use_test_data else actual_data_collector
+        data_thread = threading.Thread(
+            target=collector_func, args=(data_queue,), daemon=True
+        )
+        data_thread.start()
 
     # Create root window
     root = tk.Tk()
@@ -343,7 +478,7 @@ def start_gui(use_test_data=False):
     except KeyboardInterrupt:
         ops_logger.info("GUI terminated by user")
     except Exception as e:
-        ops_logger.error(f"Error in GUI main loop: {e}")
+        ops_logger.error("Error in GUI main loop: %s", e)
 
     ops_logger.info("GUI closed")
 
@@ -0,0 +1,44 @@
+import multiprocessing
+
+from node.bus import SharedRing, RingSubscription, RingReader
+from node.logger import ops_logger
+from node.read import SENSORS
+
+
+def _gui_main(ring_name):
+    from .gui import start_gui
+
+    ring = SharedRing.attach(ring_name)
+    try:
+        start_gui(data_queue=RingReader(ring))
+    finally:
+        ring.close()
+
+
+class GuiProcess:
+    """The GUI in a process of its own, fed through a ``SharedRing``.
+
+    Rendering then gets its own interpreter and core, and a GUI that hangs
+    or crashes cannot hold up sampling. Add ``subscription`` to the bus to
+    feed it.
+    """
+
+    def __init__(self, channels=None, capacity=None, config=None):
+        channels = list(SENSORS) if channels is None else channels
+        self.ring = SharedRing.create(channels, capacity, config=config)
+        self.subscription = RingSubscription("gui", self.ring)
+        # A fresh interpreter rather than a fork of this threaded one
+        context = multiprocessing.get_context("spawn")
+        self.process = context.Process(
+            target=_gui_main, args=(self.ring.name,), name="gui", daemon=True
+        )
+
+    def start(self):
+        self.process.start()
+        ops_logger.info("GUI process %d started", self.process.pid)
+
+    def stop(self, timeout=1.0):
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        self.ring.close()
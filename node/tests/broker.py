@@ -0,0 +1,198 @@
+import socket
+import socketserver
+import threading
+
+from pika import frame, spec
+from node.settings import CONFIG
+
+FRAME_MAX = 131072
+
+
+class _Connection(socketserver.BaseRequestHandler):
+    def setup(self):
+        self.server.broker.connections.add(self.request)
+        self.buffer = b""
+        self.confirming = set()
+        self.delivery_tags = {}
+        # channel -> [publish method, header frame, received body parts]
+        self.pending = {}
+
+    def finish(self):
+        self.server.broker.connections.discard(self.request)
+
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        broker = self.server.broker
+        while True:
+            try:
+                data = self.request.recv(65536)
+            except OSError:
+                return
+            if not data:
+                return
+            self.buffer += data
+            replies = []
+            while True:
+                consumed, received = frame.decode_frame(self.buffer)
+                if received is None:
+                    break
+                self.buffer = self.buffer[consumed:]
+                if self._dispatch(broker, received, replies):
+                    self.request.sendall(b"".join(replies))
+                    return
+            if replies:
+                self.request.sendall(b"".join(replies))
+
+    def _dispatch(self, broker, received, replies):
+        """Handle one frame, returns True once the connection is closed."""
+        if isinstance(received, frame.ProtocolHeader):
+            start = spec.Connection.Start(
+                server_properties={
+                    "product": "node fake broker",
+                    "capabilities": {
+                        "publisher_confirms": True,
+                        "basic.nack": True,
+                        "consumer_cancel_notify": True,
+                    },
+                },
+                mechanisms="PLAIN",
+            )
+            replies.append(frame.Method(0, start).marshal())
+            return False
+        if isinstance(received, frame.Header):
+            self.pending[received.channel_number][1] = received
+            self._maybe_complete(broker, received.channel_number, replies)
+            return False
+        if isinstance(received, frame.Body):
+            self.pending[received.channel_number][2].append(received.fragment)
+            self._maybe_complete(broker, received.channel_number, replies)
+            return False
+        if not isinstance(received, frame.Method):
+            # Heartbeats
+            return False
+
+        channel, method = received.channel_number, received.method
+        reply = None
+        if isinstance(method, spec.Connection.StartOk):
+            reply = spec.Connection.Tune(frame_max=FRAME_MAX, heartbeat=0)
+        elif isinstance(method, spec.Connection.Open):
+            reply = spec.Connection.OpenOk()
+        elif isinstance(method, spec.Connection.Close):
+            replies.append(frame.Method(0, spec.Connection.CloseOk()).marshal())
+            return True
+        elif isinstance(method, spec.Channel.Open):
+            reply = spec.Channel.OpenOk()
+        elif isinstance(method, spec.Channel.Close):
+            self.confirming.discard(channel)
+            reply = spec.Channel.CloseOk()
+        elif isinstance(method, spec.Confirm.Select):
+            self.confirming.add(channel)
+            self.delivery_tags[channel] = 0
+            reply = None if method.nowait else spec.Confirm.SelectOk()
+        elif isinstance(method, spec.Queue.Declare):
+            broker.queues.add(method.queue)
+            reply = spec.Queue.DeclareOk(method.queue, 0, 0)
+        elif isinstance(method, spec.Queue.Bind):
+            broker.bindings.add((method.queue, method.exchange, method.routing_key))
+            reply = spec.Queue.BindOk()
+        elif isinstance(method, spec.Exchange.Declare):
+            broker.exchanges[method.exchange] = method.type
+            reply = spec.Exchange.DeclareOk()
+        elif isinstance(method, spec.Basic.Publish):
+            self.pending[channel] = [method, None, []]
+        if reply is not None:
+            replies.append(frame.Method(channel, reply).marshal())
+        return False
+
+    def _maybe_complete(self, broker, channel, replies):
+        method, header, parts = self.pending[channel]
+        if header is None or sum(map(len, parts)) < header.body_size:
+            return
+        del self.pending[channel]
+        broker._received(method.exchange, method.routing_key, header.properties, parts)
+        if channel in self.confirming:
+            self.delivery_tags[channel] += 1
+            ack = spec.Basic.Ack(delivery_tag=self.delivery_tags[channel])
+            replies.append(frame.Method(channel, ack).marshal())
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeBroker:
+    """Minimal in-process AMQP 0-9-1 broker for tests and benchmarks.
+
+    Speaks just enough of the protocol for ``pika.BlockingConnection``:
+    connection and channel setup, queue and exchange declares and bindings,
+    publisher confirms and ``basic_publish``. Published messages are kept in
+    ``messages`` as ``(exchange, routing_key, properties, body)`` unless
+    ``keep=False``, in which case they are only counted. Nothing is ever
+    delivered to consumers.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, keep=True):
+        self.server = _Server((host, port), _Connection)
+        self.server.broker = self
+        self.keep = keep
+        self.messages = []
+        self.published = 0
+        self.bytes = 0
+        self.queues = set()
+        self.exchanges = {}
+        self.bindings = set()
+        self.lock = threading.Lock()
+        self.connections = set()
+        self.thread = None
+
+    @property
+    def host(self):
+        return self.server.server_address[0]
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def config(self, **overrides):
+        """Settings pointing a publisher at this broker."""
+        return {
+            **CONFIG,
+            "rabbitmq_host": self.host,
+            "rabbitmq_port": self.port,
+            **overrides,
+        }
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            args=(0.05,),
+            name="fake-broker",
+            daemon=True,
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Shut down, dropping client connections like a dying broker."""
+        self.server.shutdown()
+        self.server.server_close()
+        for connection in list(self.connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _received(self, exchange, routing_key, properties, parts):
+        body = b"".join(parts)
+        with self.lock:
+            self.published += 1
+            self.bytes += len(body)
+            if self.keep:
+                self.messages.append((exchange, routing_key, properties, body))
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from node.read import SAMPLING_TYPE, AdaptiveSampler, SensorScheduler, sampling_message
+from node.read.adaptive import ChannelActivity
+from node.transmit import decode_message
+
+
+async def constant() -> float:
+    return 7.0
+
+
+def scheduler(period: float = 1.0) -> SensorScheduler:
+    scheduler = SensorScheduler()
+    scheduler.register("ph", constant, period)
+    return scheduler
+
+
+def reading(value: float, timestamp: float = 0.0) -> dict:
+    return {"node_id": "a", "timestamp": timestamp, "payload": {"ph": value}}
+
+
+def test_activity_speeds_up_and_settles_down() -> None:
+    channel = ChannelActivity(0.1, 0.25, 4.0, 1.0, settle=3)
+    reasons = [channel.update(7.0) for _ in range(10)]
+
+    # Steady: doubled every 3 quiet samples, up to max_period
+    assert [r for r in reasons if r] == ["steady", "steady"]
+    assert channel.period == 4.0
+    # A jump, then its spread, halve the period down to min_period
+    reasons = [channel.update(value) for value in (8.0, 7.0, 7.0, 7.0, 7.0)]
+    assert reasons == ["active"] * 4 + [None]
+    assert channel.period == 0.25
+
+
+def test_sampler_applies_changes_and_throttles() -> None:
+    load = [0.0]
+    sched = scheduler()
+    sampler = AdaptiveSampler(
+        sched,
+        {"ph": {"step": 0.1, "min_period": 0.5, "max_period": 8.0}},
+        backlog=lambda: load[0],
+        config={"adaptive_settle": 2, "adaptive_max_throttle": 4},
+    )
+    sampler.observe(reading(7.0))
+    sampler.observe(reading(7.5, 1.0))
+    assert sched.sensors["ph"].period == 0.5
+
+    load[0] = 1.0
+    changes = sampler.observe(reading(7.5, 1.5))
+    assert changes == [
+        {
+            "timestamp": 1.5,
+            "channel": "ph",
+            "period": 2.0,
+            "previous": 0.5,
+            "reason": "backlog",
+        }
+    ]
+    # Held until the backlog has drained well below the threshold
+    load[0] = 0.2
+    assert sampler.observe(reading(7.5, 3.5)) == []
+    load[0] = 0.0
+    assert sampler.observe(reading(7.5, 5.5))[0]["period"] == 0.5
+    assert [change["period"] for change in sampler.history] == [0.5, 2.0, 0.5]
+    assert sampler.periods() == {"ph": 0.5}
+
+    body, properties = sampling_message(list(sampler.history), sampler.periods())
+    (message,) = decode_message(body, properties)
+    assert message["type"] == SAMPLING_TYPE == properties.type
+    assert message["periods"] == {"ph": 0.5}
+
+
+def test_period_change_takes_effect_from_the_last_deadline() -> None:
+    sched = scheduler(0.01)
+    readings: list[dict] = []
+
+    async def emit(reading: dict) -> None:
+        readings.append(reading)
+        if len(readings) == 3:
+            sched.set_period("ph", 0.02)
+        if len(readings) == 6:
+            raise asyncio.CancelledError
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(sched.run(emit))
+
+    start = readings[0]["timestamp"]
+    offsets = [reading["timestamp"] - start for reading in readings]
+    assert offsets == pytest.approx([0.0, 0.01, 0.02, 0.04, 0.06, 0.08], abs=1e-6)
+
+
+def test_backlog_throttles_fixed_rate_channels() -> None:
+    load = [0.0]
+    sched = scheduler()
+    sched.register("temperature", constant, 2.0)
+    sampler = AdaptiveSampler(
+        sched,
+        {"ph": {"step": 0.1, "min_period": 0.5, "max_period": 1.0}},
+        backlog=lambda: load[0],
+        config={"adaptive_max_throttle": 4},
+    )
+    load[0] = 1.0
+    changes = sampler.observe(reading(7.0))
+    assert {change["channel"]: change["period"] for change in changes} == {
+        "temperature": 8.0
+    }
+    # The adaptive channel is already at its max_period
+    assert sampler.periods() == {"ph": 1.0, "temperature": 8.0}
+
+    load[0] = 0.0
+    sampler.observe(reading(7.0, 1.0))
+    assert sched.sensors["temperature"].period == 2.0
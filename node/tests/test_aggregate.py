@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from node.process import RingBuffer, WindowAggregator
+
+
+def reading(timestamp: float, **payload: float) -> dict:
+    return {"node_id": "n", "timestamp": timestamp, "payload": payload}
+
+
+def test_ring_buffer_keeps_newest_in_order() -> None:
+    buffer = RingBuffer(4)
+    for value in range(6):
+        buffer.append(value)
+    np.testing.assert_array_equal(buffer.view(), [2, 3, 4, 5])
+    assert len(buffer) == 4
+
+
+def test_summary_emitted_when_window_closes() -> None:
+    aggregator = WindowAggregator(interval=10, percentiles=[50])
+    for t in range(10):
+        assert aggregator.add(reading(100.0 + t, temperature=float(t), ph=7.0)) == []
+    (summary,) = aggregator.add(reading(110.0, temperature=99.0))
+
+    assert summary["timestamp"] == 100.0
+    assert summary["window"] == 10
+    assert summary["type"] == "summary"
+    temperature = summary["payload"]["temperature"]
+    assert temperature["count"] == 10
+    assert (temperature["min"], temperature["max"]) == (0.0, 9.0)
+    assert temperature["mean"] == pytest.approx(4.5)
+    assert temperature["std"] == pytest.approx(np.std(np.arange(10.0)))
+    assert temperature["p50"] == pytest.approx(4.5)
+    assert summary["payload"]["ph"]["std"] == 0.0
+
+
+def test_flush_skips_channels_without_samples() -> None:
+    aggregator = WindowAggregator(interval=10, percentiles=[])
+    aggregator.add(reading(0.0, temperature=1.0, ph=7.0))
+    aggregator.add(reading(10.0, temperature=2.0))
+
+    (summary,) = aggregator.flush()
+    assert list(summary["payload"]) == ["temperature"]
+    assert aggregator.flush() == []
+
+
+def test_count_includes_values_beyond_capacity() -> None:
+    aggregator = WindowAggregator(interval=10, percentiles=[], capacity=4)
+    for t in range(6):
+        aggregator.add(reading(float(t), temperature=float(t)))
+    (summary,) = aggregator.flush()
+
+    temperature = summary["payload"]["temperature"]
+    assert (temperature["count"], temperature["sampled"]) == (6, 4)
+    assert temperature["min"] == 2.0
+    with pytest.raises(ValueError):
+        WindowAggregator(interval=0, config={})
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+
+from node.transmit import AsyncTransmitter
+
+
+class SlowSender:
+    def __init__(self) -> None:
+        self.release = threading.Event()
+        self.sent: list[str] = []
+
+    def __call__(self, body: str, properties: object = None) -> bool:
+        self.release.wait(5)
+        self.sent.append(body)
+        return True
+
+
+def test_put_does_not_wait_for_send() -> None:
+    async def scenario() -> None:
+        sender = SlowSender()
+        transmitter = AsyncTransmitter(sender, maxsize=10)
+        transmitter.start()
+        await asyncio.wait_for(transmitter.put("a"), 0.1)
+        await asyncio.wait_for(transmitter.put("b"), 0.1)
+
+        sender.release.set()
+        await transmitter.stop(5)
+        assert sender.sent == ["a", "b"]
+        assert transmitter.delivered == 2
+
+    asyncio.run(scenario())
+
+
+def test_drop_oldest_keeps_newest() -> None:
+    async def scenario() -> None:
+        sender = SlowSender()
+        sender.release.set()
+        transmitter = AsyncTransmitter(sender, maxsize=2, policy="drop-oldest")
+        for body in "abcd":
+            await transmitter.put(body)
+        assert transmitter.dropped == 2
+
+        transmitter.start()
+        await transmitter.stop(5)
+        assert sender.sent == ["c", "d"]
+
+    asyncio.run(scenario())
+
+
+def test_spill_hands_overflow_to_target() -> None:
+    async def scenario() -> None:
+        spilled = []
+        threads = set()
+
+        def spill(body: str, properties: object) -> None:
+            threads.add(threading.current_thread())
+            spilled.append(body)
+
+        transmitter = AsyncTransmitter(
+            SlowSender(), maxsize=1, policy="spill", spill=spill
+        )
+        for body in "abc":
+            await transmitter.put(body)
+        assert spilled == ["b", "c"]
+        assert transmitter.spilled == 2
+        # Off the event loop, the outbox writes to disk
+        assert threading.current_thread() not in threads
+        await transmitter.stop()
+
+    asyncio.run(scenario())
+
+
+def test_spill_needs_a_target() -> None:
+    with pytest.raises(ValueError):
+        AsyncTransmitter(print, policy="spill")
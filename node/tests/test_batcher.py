@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+
+from node.transmit import Batcher, JsonSerializer, decode_message
+
+
+def reading(i: int) -> dict:
+    return {"node_id": "n", "timestamp": float(i), "payload": {"temperature": i}}
+
+
+def test_flushes_on_reading_count() -> None:
+    batcher = Batcher(max_readings=3, max_delay_ms=60_000)
+    assert batcher.add(reading(0)) == []
+    assert batcher.add(reading(1)) == []
+    ((body, properties),) = batcher.add(reading(2))
+
+    assert len(batcher) == 0
+    assert decode_message(body, properties) == [reading(0), reading(1), reading(2)]
+    assert json.loads(body)["count"] == 3
+    assert properties.type == "batch.v1"
+
+
+def test_flushes_before_exceeding_byte_limit() -> None:
+    _, size = JsonSerializer().prepare(reading(0))
+    batcher = Batcher(max_readings=100, max_bytes=size * 2 + 1, max_delay_ms=60_000)
+    batcher.add(reading(0))
+    batcher.add(reading(1))
+    ((body, properties),) = batcher.add(reading(2))
+
+    assert decode_message(body, properties) == [reading(0), reading(1)]
+    assert len(batcher) == 1
+
+
+def test_flushes_on_age() -> None:
+    batcher = Batcher(max_readings=100, max_delay_ms=0)
+    ((body, properties),) = batcher.add(reading(0))
+    assert decode_message(body, properties) == [reading(0)]
+    assert batcher.poll() == []
+
+
+def test_flushes_on_age_without_more_readings() -> None:
+    batcher = Batcher(max_readings=100, max_delay_ms=50)
+    sent: list[tuple] = []
+
+    async def put(body: bytes, properties: object) -> None:
+        sent.append((body, properties))
+
+    async def main() -> None:
+        task = asyncio.create_task(batcher.run(put))
+        assert batcher.add(reading(0)) == []
+        await asyncio.sleep(0.02)
+        assert sent == []
+        await asyncio.sleep(0.08)
+        task.cancel()
+
+    asyncio.run(main())
+    ((body, properties),) = sent
+    assert decode_message(body, properties) == [reading(0)]
+    assert len(batcher) == 0
+
+
+@pytest.mark.parametrize("message", [reading(7), {"payload": {}}])
+def test_decode_passes_through_single_readings(message: dict) -> None:
+    assert decode_message(json.dumps(message).encode()) == [message]
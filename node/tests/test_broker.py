@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from node.transmit import RabbitMQPublisher
+from tests.broker import FakeBroker
+
+
+@pytest.fixture
+def broker():
+    with FakeBroker() as broker:
+        yield broker
+
+
+@pytest.mark.parametrize("confirm", [False, True])
+def test_publisher_talks_to_fake_broker(broker: FakeBroker, confirm: bool) -> None:
+    publisher = RabbitMQPublisher(broker.config(), confirm_delivery=confirm)
+    reading = {"node_id": "n1", "timestamp": 1.0, "payload": {"ph": 7.0}}
+    assert publisher.publish(reading)
+    assert publisher.publish_body(b"x" * 300_000)
+    publisher.close()
+
+    assert broker.queues == {broker.config()["rabbitmq_queue"]}
+    exchange, routing_key, properties, body = broker.messages[0]
+    assert routing_key == broker.config()["rabbitmq_queue"]
+    assert properties.content_type == "application/json"
+    assert json.loads(body) == reading
+    # Larger than one frame, so split over several body frames
+    assert broker.messages[1][3] == b"x" * 300_000
+
+
+def test_publisher_reconnects_to_restarted_broker() -> None:
+    with FakeBroker() as broker:
+        publisher = RabbitMQPublisher(broker.config(), confirm_delivery=True)
+        assert publisher.publish_body(b"one")
+        port = broker.port
+    assert not publisher.publish_body(b"lost")
+
+    with FakeBroker(port=port) as broker:
+        publisher.next_attempt = 0.0
+        assert publisher.publish_body(b"two")
+        publisher.close()
+        assert [message[3] for message in broker.messages] == [b"two"]
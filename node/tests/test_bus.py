@@ -0,0 +1,63 @@
+import asyncio
+import queue
+
+import pytest
+
+from node.bus import ReadingBus, consume
+
+
+def test_every_subscriber_gets_every_reading() -> None:
+    async def scenario() -> None:
+        bus = ReadingBus(config={})
+        received: dict[str, list[int]] = {"a": [], "b": []}
+        tasks = []
+        for name in received:
+
+            async def handler(reading: int, name: str = name) -> None:
+                received[name].append(reading)
+
+            tasks.append(asyncio.create_task(consume(bus.subscribe(name), handler)))
+        for i in range(5):
+            await bus.publish(i)
+        await asyncio.sleep(0)
+        for task in tasks:
+            task.cancel()
+        assert received == {"a": list(range(5)), "b": list(range(5))}
+        assert bus.stats()["a"]["delivered"] == 5
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_drops_without_blocking_others() -> None:
+    async def scenario() -> None:
+        bus = ReadingBus(config={})
+        fast = bus.subscribe("fast", maxsize=10, policy="block")
+        slow = bus.subscribe("slow", maxsize=2, policy="drop-oldest")
+        newest = bus.subscribe("newest", maxsize=2, policy="drop-newest")
+        for i in range(5):
+            await asyncio.wait_for(bus.publish(i), 0.1)
+        assert [fast.get_nowait() for _ in range(5)] == [0, 1, 2, 3, 4]
+        assert [slow.get_nowait() for _ in range(2)] == [3, 4]
+        assert [newest.get_nowait() for _ in range(2)] == [0, 1]
+        assert slow.stats()["dropped"] == 3
+
+    asyncio.run(scenario())
+
+
+def test_threaded_subscription_reads_like_a_queue() -> None:
+    async def scenario() -> ReadingBus:
+        bus = ReadingBus(config={"bus_policies": {"gui": "drop-oldest"}})
+        bus.subscribe("gui", threaded=True)
+        await bus.publish({"payload": {"ph": 7.0}})
+        return bus
+
+    subscription = asyncio.run(scenario()).subscriptions[0]
+    assert subscription.get_nowait() == {"payload": {"ph": 7.0}}
+    with pytest.raises(queue.Empty):
+        subscription.get_nowait()
+    assert subscription.stats()["lag"] >= 0
+
+
+def test_threaded_subscription_cannot_block() -> None:
+    with pytest.raises(ValueError):
+        ReadingBus(config={}).subscribe("gui", policy="block", threaded=True)
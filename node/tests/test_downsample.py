@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from node.process import RingBuffer, lttb, minmax
+
+
+def test_ring_buffer_view_is_zero_copy_after_wrapping() -> None:
+    buffer = RingBuffer(5)
+    for value in range(12):
+        buffer.append(value)
+    view = buffer.view()
+
+    np.testing.assert_array_equal(view, [7, 8, 9, 10, 11])
+    assert np.shares_memory(view, buffer.values)
+    assert buffer.last() == 11
+
+
+@pytest.mark.parametrize("downsample", [lttb, minmax])
+def test_downsampling_respects_budget_and_keeps_spike(downsample) -> None:
+    x = np.arange(10_000.0)
+    y = np.sin(x / 500)
+    y[4321] = 50.0
+    dx, dy = downsample(x, y, 200)
+
+    assert len(dx) <= 200
+    assert np.all(np.diff(dx) > 0)
+    assert 50.0 in dy
+    assert dx[0] == 0.0
+
+
+@pytest.mark.parametrize("downsample", [lttb, minmax])
+def test_short_series_pass_through(downsample) -> None:
+    x = np.arange(10.0)
+    dx, dy = downsample(x, x, 200)
+    assert dx is x and dy is x
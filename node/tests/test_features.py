@@ -0,0 +1,143 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from node.process import (
+    FeatureExtractor,
+    WindowAggregator,
+    decode_block,
+    extract_features,
+)
+from node.query import ReadingIndex
+from node.read import BlockSampler, make_reading
+from node.store import HistoryWriter
+
+
+def sine(frequency: float, amplitude: float, size: int, rate: float) -> np.ndarray:
+    return amplitude * np.sin(2 * np.pi * frequency * np.arange(size) / rate)
+
+
+def test_extract_features_of_a_sine() -> None:
+    block = sine(50, 2.0, 1000, 1000)
+    features, body = extract_features(block, 1000, [(0, 40), (40, 60), (60, 500)])
+    assert body is None
+    assert features["rms"] == pytest.approx(2.0 / math.sqrt(2), rel=1e-3)
+    assert features["peak"] == pytest.approx(2.0, rel=1e-3)
+    assert features["peak_frequency"] == 50
+    # The sine's power, amplitude squared over two, is all in its band
+    assert features["band_40_60"] == pytest.approx(2.0, rel=0.01)
+    assert features["band_0_40"] + features["band_60_500"] < 0.01
+
+
+def test_band_powers_add_up_to_the_variance() -> None:
+    block = np.random.default_rng(1).normal(3.0, 0.5, 4096)
+    features, _ = extract_features(block, 1000, [(0, 501)])
+    assert features["mean"] == pytest.approx(3.0, abs=0.05)
+    assert features["band_0_501"] == pytest.approx(block.var(), rel=0.05)
+
+
+def test_raw_block_round_trip() -> None:
+    block = sine(10, 1.0, 256, 100)
+    _, body = extract_features(block, 100, [], {"channel": "hydrophone"})
+    header, samples = decode_block(body)
+    assert header["channel"] == "hydrophone"
+    assert header["samples"] == 256
+    np.testing.assert_allclose(samples, block, atol=1e-6)
+
+
+def test_extractor_runs_in_worker_processes() -> None:
+    extractor = FeatureExtractor(bands=[(0, 100)], workers=1)
+    try:
+        features, _ = asyncio.run(extractor.extract(sine(5, 1.0, 128, 100), 100))
+    finally:
+        extractor.close()
+    assert features["peak_frequency"] == pytest.approx(5, abs=1)
+
+
+def test_block_sampler_emits_features_and_raw_blocks() -> None:
+    readings, raw = [], []
+
+    async def read(size: int, rate: float) -> np.ndarray:
+        return sine(20, 1.0, size, rate)
+
+    async def emit(reading: dict) -> None:
+        readings.append(reading)
+
+    async def put(body: bytes, properties) -> None:
+        raw.append((body, properties))
+
+    async def main() -> None:
+        sampler.origin = time.monotonic()
+        sampler.wall_origin = 0.0
+        for _ in range(3):
+            await sampler.tick(emit, put)
+        await asyncio.gather(*sampler.pending)
+
+    with ThreadPoolExecutor(1) as executor:
+        extractor = FeatureExtractor(bands=[(0, 50)], executor=executor)
+        sampler = BlockSampler(extractor, send_raw=True, config={"node_id": "n"})
+        sampler.register("hydrophone", read, 200, 20)
+        asyncio.run(main())
+
+    assert [r["timestamp"] for r in readings] == pytest.approx([0.1, 0.2, 0.3])
+    assert readings[0]["type"] == "features"
+    assert readings[0]["payload"]["hydrophone_peak"] == pytest.approx(1.0, rel=0.05)
+    assert sampler.stats()["hydrophone"]["blocks"] == 3
+    header, samples = decode_block(*raw[0])
+    assert header["timestamp"] == pytest.approx(0.1 - 19 / 200)
+    assert len(samples) == 20
+    assert raw[0][1].type == "block.raw"
+
+
+class SlowExtractor:
+    async def extract(self, block, rate, header=None):
+        await asyncio.sleep(0.05)
+        return {"mean": float(np.mean(block))}, None
+
+
+def test_features_stay_in_order_with_readings_taken_meanwhile(tmp_path) -> None:
+    readings = []
+
+    async def read(size: int, rate: float) -> np.ndarray:
+        return np.ones(size)
+
+    async def emit(reading: dict) -> None:
+        readings.append(reading)
+
+    async def main() -> None:
+        sampler.origin = time.monotonic()
+        sampler.wall_origin = 9.85
+        ordered = sampler.ordered(emit)
+        await ordered(make_reading({"ph": 7.0}, 9.9))
+        # The block ends at 9.95, these are taken while it is processed
+        await sampler.tick(emit)
+        await ordered(make_reading({"ph": 7.1}, 10.0))
+        await ordered(make_reading({"ph": 7.2}, 10.05))
+        assert [r["timestamp"] for r in readings] == [9.9]
+        await asyncio.gather(*sampler.pending)
+
+    sampler = BlockSampler(SlowExtractor(), config={"node_id": "n"})
+    sampler.register("hydrophone", read, 200, 20)
+    asyncio.run(main())
+
+    assert [r["timestamp"] for r in readings] == pytest.approx([9.9, 9.95, 10.0, 10.05])
+    assert readings[1]["type"] == "features"
+    history = HistoryWriter(str(tmp_path), config={})
+    index = ReadingIndex(100, config={})
+    aggregator = WindowAggregator(1, [], 100, config={})
+    summaries = []
+    for reading in readings:
+        assert history.append(reading)
+        index.append(reading)
+        summaries += aggregator.add(reading)
+    summaries += aggregator.flush()
+    history.close()
+
+    assert index.dropped == 0 and len(index) == 4
+    assert [s["timestamp"] for s in summaries] == [9, 10]
+    assert summaries[0]["payload"]["hydrophone_mean"]["count"] == 1
+    assert summaries[1]["payload"]["ph"]["count"] == 2
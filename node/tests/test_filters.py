@@ -0,0 +1,43 @@
+import random
+
+from node.process import AnomalyDetector, DeadbandFilter
+
+
+def reading(timestamp: float, **payload: float) -> dict:
+    return {"node_id": "n", "timestamp": timestamp, "payload": payload}
+
+
+def test_deadband_suppresses_small_changes() -> None:
+    deadband = DeadbandFilter({"temperature": 0.5}, heartbeat=60)
+    first = reading(0, temperature=20.0, ph=7.0)
+    assert deadband.filter(first) is first
+
+    assert deadband.filter(reading(1, temperature=20.4, ph=7.1)) == reading(1, ph=7.1)
+    assert deadband.filter(reading(2, temperature=20.6)) == reading(2, temperature=20.6)
+    assert deadband.filter(reading(3, temperature=20.7)) is None
+    assert deadband.suppressed == 2
+
+
+def test_deadband_heartbeat() -> None:
+    deadband = DeadbandFilter({"ph": 1.0}, heartbeat=60)
+    deadband.filter(reading(0, ph=7.0))
+    assert deadband.filter(reading(59, ph=7.0)) is None
+    assert deadband.filter(reading(60, ph=7.0)) is not None
+
+
+def test_deadband_force_resets_reference() -> None:
+    deadband = DeadbandFilter({"ph": 1.0}, heartbeat=60)
+    deadband.filter(reading(0, ph=7.0))
+    assert deadband.filter(reading(1, ph=7.5), force=True) is not None
+    assert deadband.filter(reading(2, ph=8.0)) is None
+
+
+def test_anomaly_detector_flags_outliers_after_warmup() -> None:
+    rng = random.Random(1)
+    detector = AnomalyDetector(alpha=0.05, threshold=4.0, warmup=30)
+    for t in range(200):
+        assert detector.score(reading(t, ph=7.0 + rng.gauss(0, 0.05))) == {}
+
+    outliers = detector.score(reading(200, ph=9.0, temperature=20.0))
+    assert list(outliers) == ["ph"]
+    assert outliers["ph"] > 4.0
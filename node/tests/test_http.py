@@ -0,0 +1,38 @@
+import asyncio
+
+from node.http import HttpServer
+
+
+class BrokenServer(HttpServer):
+    def respond(self, method: bytes, target: bytes) -> tuple[str, str, bytes]:
+        if target == b"/fail":
+            raise RuntimeError("boom")
+        return "200 OK", "text/plain", b"ok\n"
+
+
+def test_errors_are_answered_and_closed() -> None:
+    server = BrokenServer("127.0.0.1", 0)
+
+    async def status(request: bytes) -> str:
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(request)
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return response.split(b"\r\n")[0].decode()
+
+    async def main() -> list[str]:
+        await server.start()
+        try:
+            return [
+                await status(b"GET /fail HTTP/1.1\r\n\r\n"),
+                await status(b"GET /" + b"x" * 100_000 + b" HTTP/1.1\r\n\r\n"),
+                await status(b"GET / HTTP/1.1\r\n\r\n"),
+            ]
+        finally:
+            await server.stop()
+
+    assert asyncio.run(main()) == [
+        "HTTP/1.1 500 Internal Server Error",
+        "HTTP/1.1 400 Bad Request",
+        "HTTP/1.1 200 OK",
+    ]
@@ -0,0 +1,44 @@
+import asyncio
+
+from node.loadgen import generate, make_nodes
+from node.loadgen.loadgen import merge
+from tests.broker import FakeBroker
+
+
+def test_nodes_are_distinct_and_reproducible() -> None:
+    nodes = make_nodes(25, periods=(1.0, 5.0))
+    assert len({node.node_id for node in nodes}) == 25
+    assert {node.period for node in nodes} <= {1.0, 5.0}
+    again = make_nodes(25, periods=(1.0, 5.0))
+    assert [(n.latitude, n.longitude) for n in nodes] == [
+        (n.latitude, n.longitude) for n in again
+    ]
+
+
+def test_generate_reports_throughput_and_latency() -> None:
+    nodes = make_nodes(50, periods=(0.1,))
+    result = asyncio.run(generate(nodes, 0.35, connections=2, null=True, config={}))
+    assert result["published"] == result["generated"] > 50
+    assert len(result["latencies"]) == result["published"]
+
+    report = merge([result])
+    assert report["throughput"] > 0
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["max"]
+
+
+def test_outages_silence_nodes() -> None:
+    nodes = make_nodes(20, periods=(0.05,), outage_rate=3600 * 20, outage_mean=10)
+    result = asyncio.run(generate(nodes, 0.3, null=True, config={}))
+    assert result["outages"] >= 20
+    assert result["generated"] < 20 * 3
+
+
+def test_messages_are_routed_by_virtual_node() -> None:
+    nodes = make_nodes(3, periods=(0.1,))
+    with FakeBroker() as broker:
+        config = broker.config(rabbitmq_exchange="lakes", region="south")
+        result = asyncio.run(generate(nodes, 0.25, config=config))
+    assert result["published"] == result["generated"] > 0
+    assert {key for _, key, _, _ in broker.messages} == {
+        f"south.{node.node_id}.readings" for node in nodes
+    }
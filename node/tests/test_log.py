@@ -0,0 +1,41 @@
+import logging
+import queue
+
+from node.logger.log import JsonFormatter, LazyQueueHandler, LogWriter
+
+
+class ListHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.lines: list[str] = []
+        self.flushes = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.lines.append(self.format(record))
+
+    def flush_batch(self) -> None:
+        self.flushes += 1
+
+
+def test_writer_formats_off_thread_and_flushes_per_batch() -> None:
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = ListHandler()
+    handler.setFormatter(JsonFormatter("%(message)s"))
+    writer = LogWriter(log_queue, batch_size=100)
+    writer.add_handler("test_writer", handler)
+
+    logger = logging.getLogger("test_writer")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.handlers = [LazyQueueHandler(log_queue)]
+    for i in range(10):
+        logger.info({"i": i})
+    logger.info("plain %s", "message")
+
+    # Nothing is formatted until the writer picks the records up
+    assert isinstance(log_queue.get_nowait().msg, dict)
+    writer.start()
+    writer.stop()
+
+    assert handler.lines == [f'{{"i": {i}}}' for i in range(1, 10)] + ["plain message"]
+    assert handler.flushes == 1
@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import pytest
+
+from node.metrics import MetricsServer, Registry, metrics_message
+from node.metrics.metrics import REGISTRY
+from node.transmit import RabbitMQPublisher
+from tests.broker import FakeBroker
+
+
+def test_exposition_format() -> None:
+    registry = Registry()
+    reads = registry.counter("reads_total", "Reads", ["sensor"])
+    reads.labels("ph").inc()
+    reads.labels(sensor="ph").inc(2)
+    registry.gauge("depth", "Queue depth").set_function(lambda: 7)
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    assert registry.counter("reads_total", "Reads", ["sensor"]) is reads
+    lines = registry.expose().splitlines()
+    assert "# TYPE reads_total counter" in lines
+    assert 'reads_total{sensor="ph"} 3' in lines
+    assert "depth 7" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "latency_seconds_count 3" in lines
+    assert registry.snapshot()["reads_total"] == {"sensor=ph": 3}
+
+
+def test_server_answers_scrapes() -> None:
+    async def scenario() -> tuple[bytes, bytes]:
+        registry = Registry()
+        registry.counter("up_total", "Up").inc()
+        server = MetricsServer("127.0.0.1", 0, registry=registry)
+        await server.start()
+        responses = []
+        for path in ("/metrics", "/nope"):
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: node\r\n\r\n".encode())
+            responses.append(await reader.read())
+            writer.close()
+        await server.stop()
+        return tuple(responses)
+
+    metrics, missing = asyncio.run(scenario())
+    assert metrics.startswith(b"HTTP/1.1 200 OK")
+    assert metrics.endswith(b"up_total 1\n")
+    assert missing.startswith(b"HTTP/1.1 404")
+
+
+def test_publisher_is_instrumented() -> None:
+    published = REGISTRY.counter("node_published_total", "")
+    before = published.value
+    with FakeBroker() as broker:
+        publisher = RabbitMQPublisher(broker.config())
+        assert publisher.publish_body(b"x")
+        publisher.close()
+    assert published.value == before + 1
+    assert "node_publish_seconds_count" in REGISTRY.expose()
+
+
+def test_metrics_message() -> None:
+    registry = Registry()
+    registry.gauge("depth", "Queue depth").set(3)
+    body, properties = metrics_message(registry, {"node_id": "n1"})
+    message = json.loads(body)
+    assert message["node_id"] == "n1"
+    assert message["type"] == properties.type == "metrics"
+    assert message["metrics"] == {"depth": 3}
+
+
+def test_failed_gauges_snapshot_as_null() -> None:
+    registry = Registry()
+    registry.gauge("broken", "Raises").set_function(lambda: 1 / 0)
+    registry.gauge("unknown", "Not a number").set(float("nan"))
+    body, _ = metrics_message(registry, {"node_id": "n1"})
+    message = json.loads(body, parse_constant=lambda name: pytest.fail(name))
+    assert message["metrics"] == {"broken": None, "unknown": None}
+
+
+def test_counter_reads_a_total_kept_elsewhere() -> None:
+    registry = Registry()
+    total = [0]
+    registry.counter("events_total", "Events").set_function(lambda: total[0])
+    total[0] = 5
+    assert "# TYPE events_total counter\nevents_total 5" in registry.expose()
+    assert registry.snapshot() == {"events_total": 5}
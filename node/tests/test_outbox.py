@@ -0,0 +1,116 @@
+import time
+from pathlib import Path
+
+import pika
+
+from node.transmit import REJECTED, Outbox, OutboxDrainer
+
+
+class FlakyPublisher:
+    def __init__(self) -> None:
+        self.up = True
+        self.sent: list[bytes] = []
+
+    def publish_body(
+        self, body: bytes, properties: pika.BasicProperties | None = None
+    ) -> bool:
+        if not self.up:
+            return False
+        self.sent.append(body)
+        return True
+
+
+def test_messages_survive_reopen(tmp_path: Path) -> None:
+    path = str(tmp_path / "outbox.db")
+    outbox = Outbox(path)
+    outbox.append("one")
+    outbox.append(b"two", pika.BasicProperties(type="batch.v1"))
+    outbox.close()
+
+    outbox = Outbox(path)
+    assert len(outbox) == 2
+    (_, first, props), (_, second, batch_props) = outbox.peek(10)
+    assert (first, props) == (b"one", None)
+    assert second == b"two"
+    assert batch_props.type == "batch.v1"
+
+
+def test_ack_removes_messages(tmp_path: Path) -> None:
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    for i in range(5):
+        outbox.append(str(i))
+    outbox.ack([id for id, _, _ in outbox.peek(3)])
+
+    assert len(outbox) == 2
+    assert outbox.size == 2
+    assert [body for _, body, _ in outbox.peek(10)] == [b"3", b"4"]
+
+
+def test_drops_oldest_when_full(tmp_path: Path) -> None:
+    outbox = Outbox(str(tmp_path / "outbox.db"), max_bytes=30)
+    for i in range(10):
+        outbox.append(f"{i:09d}")
+
+    assert outbox.size <= 30
+    assert outbox.dropped == 7
+    assert [body for _, body, _ in outbox.peek(10)][0] == b"000000007"
+
+
+def test_drainer_replays_backlog_in_order(tmp_path: Path) -> None:
+    publisher = FlakyPublisher()
+    drainer = OutboxDrainer(
+        Outbox(str(tmp_path / "outbox.db")), publisher, chunk_size=4, rate=0
+    )
+    publisher.up = False
+    for i in range(10):
+        drainer.submit(str(i))
+    assert drainer.drain_once() == 0
+    assert len(drainer.outbox) == 10
+
+    publisher.up = True
+    while drainer.drain_once():
+        pass
+    assert publisher.sent == [str(i).encode() for i in range(10)]
+    assert len(drainer.outbox) == 0
+
+
+def test_replay_rate_spares_live_messages(tmp_path: Path) -> None:
+    publisher = FlakyPublisher()
+    drainer = OutboxDrainer(
+        Outbox(str(tmp_path / "outbox.db")), publisher, chunk_size=2, rate=10
+    )
+    drainer.submit("live")
+    started = time.monotonic()
+    assert drainer.drain_once() == 1
+    assert time.monotonic() - started < 0.05
+
+    for i in range(3):
+        drainer.submit(str(i))
+    started = time.monotonic()
+    assert drainer.drain_once() == 2
+    # Two messages at 10 per second while one is still waiting
+    assert time.monotonic() - started >= 0.19
+
+
+def test_rejected_message_is_dropped_after_retries(tmp_path: Path) -> None:
+    class PickyPublisher(FlakyPublisher):
+        def publish_body(
+            self, body: bytes, properties: pika.BasicProperties | None = None
+        ) -> bool:
+            if body == b"bad":
+                return REJECTED
+            return super().publish_body(body, properties)
+
+    publisher = PickyPublisher()
+    drainer = OutboxDrainer(
+        Outbox(str(tmp_path / "outbox.db")), publisher, rate=0, max_rejections=2
+    )
+    for body in ("one", "bad", "two"):
+        drainer.submit(body)
+    assert drainer.drain_once() == 0
+    assert publisher.sent == [b"one"]
+    assert not drainer._unavailable
+
+    assert drainer.drain_once() == 1
+    assert publisher.sent == [b"one", b"two"]
+    assert len(drainer.outbox) == 0
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+
+from node.profiling import LoopMonitor, ProfileOutput, Profiler, SamplingProfiler
+
+
+def test_output_stays_within_budget(tmp_path: Path) -> None:
+    output = ProfileOutput(str(tmp_path), max_bytes=4096)
+    for _ in range(10):
+        output.write("cpu", "x" * 1000)
+    sizes = [f.stat().st_size for f in tmp_path.iterdir()]
+    assert sum(sizes) <= 4096
+    assert len(sizes) == 4
+
+
+def busy_wait(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampling_profiler_sees_other_threads() -> None:
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_wait, args=(stop,), name="busy")
+    worker.start()
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    time.sleep(0.1)
+    profiler.stop()
+    stop.set()
+    worker.join()
+    assert profiler.samples > 0
+    assert any(
+        stack.startswith("busy;") and "busy_wait" in stack for stack in profiler.stacks
+    )
+
+
+def block_the_loop() -> None:
+    time.sleep(0.3)
+
+
+def test_loop_monitor_catches_blocking_callback() -> None:
+    stalls = []
+
+    async def scenario() -> None:
+        monitor = LoopMonitor(threshold=0.1, on_stall=lambda s, st: stalls.append(st))
+        monitor.start()
+        await asyncio.sleep(0.05)
+        block_the_loop()
+        await asyncio.sleep(0.05)
+        monitor.stop()
+
+    asyncio.run(scenario())
+    assert len(stalls) == 1
+    assert any("block_the_loop" in frame for frame in stalls[0])
+
+
+def test_control_socket(tmp_path: Path) -> None:
+    async def scenario() -> list[bytes]:
+        profiler = Profiler(
+            path=str(tmp_path / "profiles"), socket_path=str(tmp_path / "ctl.sock")
+        )
+        await profiler.start()
+        reader, writer = await asyncio.open_unix_connection(str(tmp_path / "ctl.sock"))
+        replies = []
+        for command in ("cpu start", "status", "cpu stop", "memory snapshot", "bad"):
+            writer.write(command.encode() + b"\n")
+            replies.append(await reader.readline())
+            await asyncio.sleep(0.02)
+        writer.close()
+        await profiler.stop()
+        return replies
+
+    replies = asyncio.run(scenario())
+    assert replies[0] == b"cpu profiler started\n"
+    assert replies[1].startswith(b"cpu on, memory off")
+    assert replies[2].startswith(b"wrote ") and replies[2].strip().endswith(b".folded")
+    assert replies[3].startswith(b"wrote ")
+    assert replies[4].startswith(b"unknown command")
+    kinds = sorted(name.split("-")[0] for name in os.listdir(tmp_path / "profiles"))
+    assert kinds == ["cpu", "memory"]
+    assert not (tmp_path / "ctl.sock").exists()
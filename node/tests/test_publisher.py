@@ -0,0 +1,102 @@
+import pika
+import pytest
+
+from node.settings import CONFIG
+from node.transmit import RabbitMQPublisher
+
+
+class FakeChannel:
+    def __init__(self, connection):
+        self.connection = connection
+        self.is_open = True
+        self.declared = []
+        self.published = []
+        self.confirming = False
+
+    def confirm_delivery(self) -> None:
+        self.confirming = True
+
+    def queue_declare(self, queue: str, durable: bool) -> None:
+        self.declared.append(queue)
+
+    def basic_publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        body: bytes,
+        properties: pika.BasicProperties | None = None,
+    ) -> None:
+        if self.connection.broken:
+            raise pika.exceptions.StreamLostError("gone")
+        self.published.append((routing_key, body))
+
+
+class FakeConnection:
+    opened: list["FakeConnection"] = []
+    refuse = False
+
+    def __init__(self, parameters: pika.ConnectionParameters) -> None:
+        if FakeConnection.refuse:
+            raise pika.exceptions.AMQPConnectionError("refused")
+        self.is_open = True
+        self.broken = False
+        self.fake_channel = FakeChannel(self)
+        FakeConnection.opened.append(self)
+
+    def channel(self) -> FakeChannel:
+        return self.fake_channel
+
+    def close(self) -> None:
+        self.is_open = False
+
+
+@pytest.fixture(autouse=True)
+def fake_pika(monkeypatch: pytest.MonkeyPatch) -> None:
+    FakeConnection.opened = []
+    FakeConnection.refuse = False
+    monkeypatch.setattr(pika, "BlockingConnection", FakeConnection)
+
+
+def test_reuses_one_connection_and_declares_once() -> None:
+    publisher = RabbitMQPublisher()
+    for i in range(5):
+        assert publisher.publish({"i": i})
+
+    assert len(FakeConnection.opened) == 1
+    channel = FakeConnection.opened[0].fake_channel
+    assert channel.declared == ["node_data"]
+    assert len(channel.published) == 5
+
+
+def test_reconnects_once_on_stale_connection() -> None:
+    publisher = RabbitMQPublisher()
+    assert publisher.publish({"i": 0})
+    FakeConnection.opened[0].broken = True
+
+    assert publisher.publish({"i": 1})
+    assert len(FakeConnection.opened) == 2
+    assert FakeConnection.opened[1].fake_channel.published[0][1] == b'{"i": 1}'
+
+
+def test_backs_off_while_broker_is_down() -> None:
+    publisher = RabbitMQPublisher(
+        config={**CONFIG, "rabbitmq_reconnect_initial_delay": 30}
+    )
+    FakeConnection.refuse = True
+    assert not publisher.publish({"i": 0})
+    assert publisher.failures == 1
+
+    # The broker is back, but the backoff window has not elapsed yet.
+    FakeConnection.refuse = False
+    publisher.next_attempt = float("inf")
+    assert not publisher.publish({"i": 1})
+    assert FakeConnection.opened == []
+
+    publisher.next_attempt = 0.0
+    assert publisher.publish({"i": 2})
+    assert publisher.reconnects == 1
+
+
+def test_confirm_delivery_is_optional() -> None:
+    RabbitMQPublisher(confirm_delivery=True).publish({})
+    assert FakeConnection.opened[0].fake_channel.confirming
@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from node.query import QueryServer, ReadingIndex
+
+
+def reading(timestamp: float, **payload: float) -> dict:
+    return {"node_id": "n", "timestamp": timestamp, "payload": payload}
+
+
+def filled(count: int = 100, capacity: int = 64) -> ReadingIndex:
+    index = ReadingIndex(capacity, config={"node_id": "n"})
+    for t in range(count):
+        index.append(reading(t, temperature=float(t)))
+        if t >= 50:
+            index.append(reading(t + 0.5, ph=7.0 + t % 2))
+    return index
+
+
+def test_range_after_wrapping() -> None:
+    index = filled()
+    assert len(index) == 64
+    data = index.range(90, 92)
+    assert data["timestamp"].tolist() == [90, 90.5, 91, 91.5]
+    assert data["temperature"][::2].tolist() == [90, 91]
+    assert np.isnan(data["ph"][::2]).all()
+    assert data["ph"][1::2].tolist() == [7.0, 8.0]
+
+
+def test_aggregate_matches_direct_computation() -> None:
+    index = filled()
+    result = index.aggregate(70, 100, 10)
+    assert result["window_start"].tolist() == [70, 80, 90]
+    temperature = result["temperature"]
+    assert temperature["count"].tolist() == [10, 10, 10]
+    assert temperature["mean"].tolist() == [74.5, 84.5, 94.5]
+    assert temperature["min"].tolist() == [70, 80, 90]
+    assert temperature["std"] == pytest.approx([np.arange(10).std()] * 3)
+    assert result["ph"]["mean"].tolist() == [7.5, 7.5, 7.5]
+    # Older than anything still held
+    assert len(index.aggregate(0, 10, 5)["window_start"]) == 0
+
+
+def test_backwards_timestamps_are_dropped() -> None:
+    index = filled(10)
+    index.append(reading(3, temperature=1.0))
+    assert index.dropped == 1
+    assert index.latest["temperature"] == (9, 9.0)
+
+
+def test_server_answers_queries() -> None:
+    index = filled()
+    server = QueryServer(index, host="127.0.0.1", port=0, config={"node_id": "n"})
+
+    async def get(path: str) -> tuple[str, dict]:
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: node\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        head, body = response.split(b"\r\n\r\n", 1)
+        return head.split(b"\r\n")[0].decode(), json.loads(body)
+
+    async def main() -> list[tuple[str, dict]]:
+        await server.start()
+        try:
+            return [
+                await get("/latest?channel=ph"),
+                await get("/range?start=95&end=97&channel=temperature,ph"),
+                await get("/aggregate?start=80&end=100&window=10&channel=ph"),
+                await get("/aggregate?start=100&end=90"),
+                await get("/nothing"),
+            ]
+        finally:
+            await server.stop()
+
+    latest, data, aggregate, bad, missing = asyncio.run(main())
+    assert latest == (
+        "HTTP/1.1 200 OK",
+        {"node_id": "n", "channels": {"ph": {"timestamp": 99.5, "value": 8.0}}},
+    )
+    assert data[1]["channels"]["temperature"] == {
+        "timestamp": [95, 96],
+        "value": [95, 96],
+    }
+    assert data[1]["channels"]["ph"]["value"] == [8.0, 7.0]
+    assert aggregate[1]["window_start"] == [80, 90]
+    assert aggregate[1]["channels"]["ph"]["count"] == [10, 10]
+    assert bad[0] == "HTTP/1.1 400 Bad Request"
+    assert missing[0] == "HTTP/1.1 404 Not Found"
+
+
+def test_range_points_cannot_bypass_the_cap() -> None:
+    server = QueryServer(filled(), config={"node_id": "n", "query_max_points": 10})
+    span = {"start": ["0"], "end": ["100"], "channel": ["temperature"]}
+
+    for points in ("0", "2", "-5"):
+        status, document = server.query("/range", {**span, "points": [points]})
+        assert status == "400 Bad Request"
+    status, document = server.query("/range", {**span, "points": ["5000"]})
+    assert status == "200 OK"
+    assert len(document["channels"]["temperature"]["value"]) == 10
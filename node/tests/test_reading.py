@@ -0,0 +1,53 @@
+import json
+import logging
+import pickle
+
+from node.logger.log import JsonFormatter
+from node.process import DeadbandFilter
+from node.read import make_reading
+from node.reading import Reading
+from node.transmit import BinarySerializer, JsonSerializer, decode_message
+
+
+def test_reading_behaves_like_the_dict() -> None:
+    reading = make_reading({"ph": 7.25}, 1_700_000_000.5, type="features")
+    expected = {
+        "node_id": reading["node_id"],
+        "timestamp": 1_700_000_000.5,
+        "payload": {"ph": 7.25},
+        "type": "features",
+    }
+
+    assert isinstance(reading, Reading)
+    assert reading == expected
+    assert list(reading) == list(expected)
+    assert {**reading} == expected
+    assert reading.get("channel") is None and "type" in reading
+    assert json.loads(reading.json()) == expected
+    assert pickle.loads(pickle.dumps(reading)) == expected
+
+
+def test_reading_is_encoded_once() -> None:
+    reading = make_reading({"temperature": 20.5, "ph": 7.25}, 1_700_000_000.0)
+    record = logging.LogRecord("sensor", logging.INFO, "", 0, reading, None, None)
+    logged = JsonFormatter("%(message)s").format(record)
+
+    serializer = JsonSerializer()
+    body, properties = serializer.encode(reading)
+
+    assert serializer.prepare(reading)[0] is logged
+    assert body.decode() == logged
+    assert decode_message(body, properties) == [reading]
+    body, properties = BinarySerializer().encode(reading)
+    assert decode_message(body, properties) == [reading]
+
+
+def test_filtered_readings_stay_readings() -> None:
+    deadband = DeadbandFilter({"ph": 0.1}, heartbeat=60)
+    deadband.filter(make_reading({"temperature": 20.0, "ph": 7.0}, 0.0))
+
+    reading = deadband.filter(make_reading({"temperature": 20.5, "ph": 7.05}, 1.0))
+
+    assert isinstance(reading, Reading)
+    assert reading["payload"] == {"temperature": 20.5}
+    assert reading.json() == json.dumps(reading.as_dict())
@@ -0,0 +1,109 @@
+import json
+import os
+import time
+
+import pytest
+
+from node.replay import LogReader, Replayer, Watermark, log_files, paced
+from node.transmit import RabbitMQPublisher, decode_message
+from tests.broker import FakeBroker
+
+
+def write_log(path: str, timestamps: list[float], junk: bool = False) -> None:
+    with open(path, "w") as f:
+        f.write("2026-10-01 00:00:00,000 - Sensor logger initialized.\n")
+        for timestamp in timestamps:
+            reading = {"node_id": "n", "timestamp": timestamp, "payload": {"ph": 7.0}}
+            f.write(f"2026-10-01 00:00:00,000 - {json.dumps(reading)}\n")
+        if junk:
+            f.write('2026-10-01 00:00:00,000 - {"node_id": "n", "timestamp": "x"}\n')
+            f.write('2026-10-01 00:00:00,000 - {"node_id": "n", "timest')
+
+
+def make_logs(directory: str) -> None:
+    write_log(os.path.join(directory, "sensor_data.log.2026-10-02"), [10, 11, 12])
+    write_log(os.path.join(directory, "sensor_data.log.2026-10-01"), [0, 1, 2])
+    write_log(os.path.join(directory, "sensor_data.log"), [12, 20, 19, 21], junk=True)
+
+
+def replay(broker: FakeBroker, directory: str, watermark: str) -> dict:
+    publisher = RabbitMQPublisher(broker.config(), confirm_delivery=True)
+    replayer = Replayer(publisher, Watermark(watermark), batch_readings=4)
+    try:
+        return replayer.run(LogReader(log_files(directory)))
+    finally:
+        publisher.close()
+
+
+def test_log_reader_streams_rotated_logs_in_order(tmp_path) -> None:
+    make_logs(str(tmp_path))
+    reader = LogReader(log_files(str(tmp_path)))
+    timestamps = [reading["timestamp"] for reading in reader]
+    assert timestamps == [0, 1, 2, 10, 11, 12, 12, 20, 19, 21]
+    assert reader.malformed == 2
+    assert reader.lines == 15
+
+
+def test_replay_skips_duplicates_and_resumes(tmp_path) -> None:
+    make_logs(str(tmp_path))
+    watermark = str(tmp_path / "watermark.json")
+    with FakeBroker() as broker:
+        stats = replay(broker, str(tmp_path), watermark)
+        assert stats["published"] == 9
+        assert stats["duplicates"] == 1
+        assert stats["batches"] == 3
+        sent = [
+            reading["timestamp"]
+            for _, _, properties, body in broker.messages
+            for reading in decode_message(body, properties)
+        ]
+        # The late reading at 19 is still sent, the repeated 12 is not
+        assert sent == [0, 1, 2, 10, 11, 12, 20, 19, 21]
+
+        write_log(os.path.join(tmp_path, "sensor_data.log"), [12, 20, 19, 21, 22])
+        stats = replay(broker, str(tmp_path), watermark)
+    assert stats["published"] == 1
+    with open(watermark) as f:
+        assert json.load(f) == {"n": 22}
+
+
+def test_dry_run_sends_nothing(tmp_path) -> None:
+    make_logs(str(tmp_path))
+    watermark = Watermark(str(tmp_path / "watermark.json"))
+    stats = Replayer(None, watermark).run(LogReader(log_files(str(tmp_path))))
+    assert stats["published"] == 9
+    assert not os.path.exists(watermark.path)
+
+
+def test_paced_speed() -> None:
+    readings = [{"timestamp": t} for t in (0.0, 1.0, 2.0)]
+    started = time.monotonic()
+    assert list(paced(readings, speed=20)) == readings
+    assert 0.09 <= time.monotonic() - started < 0.5
+
+
+def test_watermark_only_saves_sent_readings(tmp_path) -> None:
+    class Crash(Exception):
+        pass
+
+    class CrashingPublisher:
+        def __init__(self) -> None:
+            self.sent = 0
+            self.next_attempt = 0.0
+
+        def publish_body(self, body, properties=None) -> bool:
+            self.sent += 1
+            if self.sent > 1:
+                raise Crash
+            return True
+
+    path = str(tmp_path / "watermark.json")
+    readings = [
+        {"node_id": "n", "timestamp": float(t), "payload": {"ph": 7.0}}
+        for t in range(10)
+    ]
+    with pytest.raises(Crash):
+        Replayer(CrashingPublisher(), Watermark(path), batch_readings=4).run(readings)
+    # The first batch went out in full, and was saved with its last reading
+    with open(path) as f:
+        assert json.load(f) == {"n": 3.0}
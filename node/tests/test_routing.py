@@ -0,0 +1,79 @@
+import collections
+import time
+
+from node.metrics import metrics_message
+from node.settings import CONFIG
+from node.transmit import BrokerSelector, Endpoint, RabbitMQPublisher
+from tests.broker import FakeBroker
+
+
+def brokers_config(*brokers: FakeBroker, **overrides: object) -> dict:
+    return {
+        **CONFIG,
+        "rabbitmq_brokers": [
+            {"host": broker.host, "port": broker.port} for broker in brokers
+        ],
+        **overrides,
+    }
+
+
+def test_topic_exchange_routing_keys() -> None:
+    with FakeBroker() as broker:
+        publisher = RabbitMQPublisher(
+            broker.config(rabbitmq_exchange="lakes", region="south"),
+            confirm_delivery=True,
+        )
+        assert publisher.publish({"node_id": "madiwala_01", "payload": {}})
+        assert publisher.publish_body(*metrics_message())
+        publisher.close()
+
+    assert broker.exchanges == {"lakes": "topic"}
+    assert ("node_data", "lakes", "#") in broker.bindings
+    assert [(m[0], m[1]) for m in broker.messages] == [
+        ("lakes", "south.madiwala_01.readings"),
+        ("lakes", "south.madiwala_01.metrics"),
+    ]
+
+
+def test_hash_selection_spreads_nodes_and_is_stable() -> None:
+    endpoints = [Endpoint(f"mq{i}") for i in range(4)]
+
+    def first(nodes: list[Endpoint], key: str) -> str:
+        return BrokerSelector(nodes, "hash", key).order[0].host
+
+    keys = [f"lake_{i}" for i in range(400)]
+    before = {key: first(endpoints, key) for key in keys}
+    counts = collections.Counter(before.values())
+    assert len(counts) == 4 and min(counts.values()) > 50
+
+    # Dropping a broker only moves the nodes that were on it
+    after = {key: first(endpoints[:3], key) for key in keys}
+    moved = [key for key in keys if before[key] != after[key]]
+    assert moved and all(before[key] == "mq3" for key in moved)
+
+
+def test_priority_selection_fails_over_and_back() -> None:
+    with FakeBroker() as primary, FakeBroker() as secondary:
+        config = brokers_config(
+            primary,
+            secondary,
+            rabbitmq_failback_interval=0.2,
+            rabbitmq_reconnect_initial_delay=0.01,
+        )
+        config["rabbitmq_brokers"][0]["priority"] = 1
+        config["rabbitmq_brokers"][1]["priority"] = 2
+        publisher = RabbitMQPublisher(config, confirm_delivery=True)
+        assert publisher.publish({"i": 0})
+        assert primary.published == 1
+
+        port = primary.port
+        primary.stop()
+        assert publisher.publish({"i": 1})
+        assert secondary.published == 1
+
+        with FakeBroker(port=port) as restarted:
+            time.sleep(0.25)
+            assert publisher.publish({"i": 2})
+            assert restarted.published == 1
+            assert publisher.endpoint.port == port
+        publisher.close()
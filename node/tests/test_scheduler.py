@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from node.read import SensorScheduler
+
+
+def constant(value: float):
+    async def read() -> float:
+        return value
+
+    return read
+
+
+def run_ticks(scheduler: SensorScheduler, count: int) -> list[dict]:
+    readings: list[dict] = []
+
+    async def emit(reading: dict) -> None:
+        readings.append(reading)
+        if len(readings) == count:
+            raise asyncio.CancelledError
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(scheduler.run(emit))
+    return readings
+
+
+def test_sensors_run_at_their_own_rates() -> None:
+    scheduler = SensorScheduler()
+    scheduler.register("fast", constant(1.0), 0.01)
+    scheduler.register("slow", constant(2.0), 0.03)
+    readings = run_ticks(scheduler, 7)
+
+    assert [sorted(r["payload"]) for r in readings] == [
+        ["fast", "slow"],
+        ["fast"],
+        ["fast"],
+        ["fast", "slow"],
+        ["fast"],
+        ["fast"],
+        ["fast", "slow"],
+    ]
+    # Stamped on the nominal grid, not when the read finished
+    start = readings[0]["timestamp"]
+    for i, reading in enumerate(readings):
+        assert reading["timestamp"] == pytest.approx(start + i * 0.01, abs=1e-9)
+
+
+def test_overrun_skips_missed_slots() -> None:
+    async def slow_read() -> float:
+        await asyncio.sleep(0.035)
+        return 0.0
+
+    scheduler = SensorScheduler()
+    scheduler.register("slow", slow_read, 0.01)
+    readings = run_ticks(scheduler, 2)
+
+    stats = scheduler.stats()["slow"]
+    assert stats["overruns"] >= 1
+    assert stats["missed"] >= 3
+    assert readings[1]["timestamp"] - readings[0]["timestamp"] == pytest.approx(
+        0.01 * (1 + stats["missed"] // stats["overruns"]), abs=0.011
+    )
+
+
+def test_failed_read_is_left_out() -> None:
+    async def broken() -> float:
+        raise OSError("bus error")
+
+    scheduler = SensorScheduler()
+    scheduler.register("ok", constant(1.0), 0.01)
+    scheduler.register("broken", broken, 0.01)
+    (reading,) = run_ticks(scheduler, 1)
+
+    assert reading["payload"] == {"ok": 1.0}
+    assert scheduler.stats()["broken"]["errors"] == 1
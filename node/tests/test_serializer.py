@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from node.transmit import BinarySerializer, JsonSerializer, decode_message
+from node.transmit.serializer import get_serializer
+
+
+def readings(count: int) -> list[dict]:
+    return [
+        {
+            "node_id": "madiwala_01",
+            "timestamp": 1_700_000_000.25 + i,
+            "payload": {"temperature": 20.5 + i / 8, "ph": 7.25},
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize(
+    "serializer",
+    [
+        JsonSerializer(),
+        JsonSerializer(compression="zlib", compress_min_bytes=0),
+        BinarySerializer(),
+        BinarySerializer(compression="lzma", compress_min_bytes=0),
+        BinarySerializer(float64=True),
+    ],
+)
+def test_batches_round_trip(serializer: JsonSerializer) -> None:
+    batch = readings(20)
+    items = [serializer.prepare(reading)[0] for reading in batch]
+    body, properties = serializer.encode_batch(items)
+
+    assert decode_message(body, properties) == batch
+
+
+def test_binary_round_trips_irregular_readings() -> None:
+    batch = [
+        {"node_id": "a", "timestamp": 1.5, "payload": {"temperature": 0.5}},
+        {"node_id": "b", "payload": {"ph": 7.0, "status": "ok", "count": 3}},
+        {"timestamp": "not a number", "payload": {}, "anomaly": True},
+        {"node_id": None, "timestamp": 0.75},
+    ]
+    body, properties = BinarySerializer(float64=True).encode_batch(batch)
+
+    assert decode_message(body, properties) == batch
+
+
+def test_binary_is_much_smaller_than_json() -> None:
+    batch = readings(50)
+    json_body, _ = JsonSerializer().encode_batch([json.dumps(r) for r in batch])
+    binary_body, _ = BinarySerializer().encode_batch(batch)
+
+    assert len(binary_body) * 3 < len(json_body)
+
+
+def test_single_reading_without_compression_stays_plain() -> None:
+    body, properties = get_serializer().encode(readings(1)[0])
+
+    assert properties.content_type == "application/json"
+    assert properties.content_encoding is None
+    assert json.loads(body) == readings(1)[0]
+
+
+def test_rejects_unknown_compression() -> None:
+    with pytest.raises(ValueError):
+        JsonSerializer(compression="snappy")
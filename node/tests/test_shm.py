@@ -0,0 +1,62 @@
+import asyncio
+import multiprocessing
+import queue
+
+import pytest
+
+from node.bus import ReadingBus, RingReader, RingSubscription, SharedRing
+
+
+def reading(i: int) -> dict:
+    return {"node_id": "n1", "timestamp": float(i), "payload": {"ph": i / 10}}
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRing.create(["temperature", "ph"], capacity=8, node_id="n1")
+    yield ring
+    ring.close()
+
+
+def test_reader_sees_written_readings(ring: SharedRing) -> None:
+    reader = RingReader(SharedRing.attach(ring.name))
+    with pytest.raises(queue.Empty):
+        reader.get_nowait()
+    ring.write(reading(1))
+    ring.write({"timestamp": 2.0, "payload": {"temperature": 20.5, "ph": "bad"}})
+    assert reader.get_nowait() == reading(1)
+    assert reader.get_nowait() == {
+        "node_id": "n1",
+        "timestamp": 2.0,
+        "payload": {"temperature": 20.5},
+    }
+    reader.ring.close()
+
+
+def test_slow_reader_loses_the_oldest(ring: SharedRing) -> None:
+    reader = RingReader(ring)
+    for i in range(20):
+        ring.write(reading(i))
+    received = [reader.get_nowait()["timestamp"] for _ in range(8)]
+    assert received == [float(i) for i in range(12, 20)]
+    assert reader.lost == 12
+
+
+def _read_in_child(name: str, results) -> None:
+    ring = SharedRing.attach(name)
+    results.put(RingReader(ring).get_nowait())
+    ring.close()
+
+
+def test_bus_feeds_another_process(ring: SharedRing) -> None:
+    bus = ReadingBus(config={})
+    bus.add(RingSubscription("gui", ring))
+    asyncio.run(bus.publish(reading(3)))
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    child = context.Process(target=_read_in_child, args=(ring.name, results))
+    child.start()
+    assert results.get(timeout=30) == reading(3)
+    child.join(10)
+    assert child.exitcode == 0
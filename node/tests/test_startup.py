@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT = Path(__file__).resolve().parent.parent
+
+CHECK = """
+import sys
+import node.app, node.logger, node.bus, node.transmit, node.read, node.ui
+heavy = [name for name in ("matplotlib", "tkinter", "numpy") if name in sys.modules]
+print(",".join(heavy))
+"""
+
+
+def test_import_has_no_side_effects(tmp_path: Path) -> None:
+    result = subprocess.run(
+        [sys.executable, "-c", CHECK],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": str(PROJECT)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # A headless node never loads the GUI stack just by importing
+    assert result.stdout.strip() == ""
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_init_logging_creates_log_files(tmp_path: Path) -> None:
+    code = (
+        "from node.logger import init_logging, ops_logger\n"
+        "init_logging()\n"
+        "init_logging()\n"
+        "ops_logger.info('hello')\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": str(PROJECT)},
+        check=True,
+    )
+    lines = (tmp_path / "logs/operations/operations.log").read_text().splitlines()
+    assert lines[-1].endswith("INFO - hello")
+    assert sum("initialized" in line for line in lines) == 1
+    assert (tmp_path / "logs/sensor/sensor_data.log").exists()
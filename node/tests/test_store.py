@@ -0,0 +1,73 @@
+import math
+from pathlib import Path
+
+import numpy as np
+
+from node.store import HistoryStore, HistoryWriter
+from node.store import store as store_module
+from node.store.cli import main
+
+
+def fill(path: Path, count: int, segment_seconds: int = 100) -> None:
+    writer = HistoryWriter(str(path), segment_seconds=segment_seconds, flush_rows=7)
+    for i in range(count):
+        payload = {"temperature": 20.0 + i, "ph": 7.0}
+        if i >= count // 2:
+            payload["do"] = float(i)
+        writer.append({"node_id": "n", "timestamp": float(i), "payload": payload})
+    writer.close()
+
+
+def test_range_spans_segments(tmp_path: Path) -> None:
+    fill(tmp_path, 350)
+    store = HistoryStore(str(tmp_path))
+
+    assert store.segments() == [0, 100, 200, 300]
+    assert store.channels() == ["do", "ph", "temperature"]
+    data = store.range(95.0, 205.0)
+    np.testing.assert_array_equal(data["timestamp"], np.arange(95.0, 205.0))
+    np.testing.assert_array_equal(data["temperature"], np.arange(115.0, 225.0))
+    # "do" only shows up halfway through the 100-200 segment
+    assert math.isnan(data["do"][0]) and data["do"][-1] == 204.0
+
+
+def test_sparse_index_lookup(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(store_module, "INDEX_STRIDE", 8)
+    fill(tmp_path, 100, segment_seconds=1000)
+    store = HistoryStore(str(tmp_path))
+
+    for start in (0.0, 7.5, 8.0, 63.0, 99.0):
+        data = store.range(start, start + 10, ["ph"])
+        assert data["timestamp"][0] == math.ceil(start)
+
+
+def test_reopen_appends_to_existing_segment(tmp_path: Path) -> None:
+    fill(tmp_path, 10)
+    writer = HistoryWriter(str(tmp_path), segment_seconds=100)
+    assert not writer.append({"timestamp": 5.0, "payload": {"ph": 1.0}})
+    assert writer.append({"timestamp": 10.0, "payload": {"ph": 1.0}})
+    writer.close()
+
+    data = HistoryStore(str(tmp_path)).range(0, 100)
+    assert len(data["timestamp"]) == 11
+    assert math.isnan(data["temperature"][-1])
+
+
+def test_aggregate_windows(tmp_path: Path) -> None:
+    fill(tmp_path, 120)
+    result = HistoryStore(str(tmp_path)).aggregate(0, 120, 60, ["temperature", "do"])
+
+    np.testing.assert_array_equal(result["window_start"], [0, 60])
+    np.testing.assert_array_equal(result["temperature"]["min"], [20, 80])
+    np.testing.assert_array_equal(result["temperature"]["max"], [79, 139])
+    np.testing.assert_array_equal(result["temperature"]["mean"], [49.5, 109.5])
+    np.testing.assert_array_equal(result["do"]["count"], [0, 60])
+
+
+def test_cli_csv(tmp_path: Path, capsys) -> None:
+    fill(tmp_path, 10)
+    main(["--path", str(tmp_path), "--start", "0", "--end", "3", "--format", "csv"])
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "timestamp,do,ph,temperature"
+    assert lines[1:] == ["0.0,,7.0,20.0", "1.0,,7.0,21.0", "2.0,,7.0,22.0"]